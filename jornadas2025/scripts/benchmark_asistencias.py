@@ -0,0 +1,104 @@
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import importlib.util
+import pandas as pd
+from ingesta import leer_csv
+from benchmark_bloques import generar_asistencias
+
+# Compara el formato anterior de las asistencias (astype(str) y capitalize fila por fila) contra
+# formatear_asistencias de limpieza-asistencias.py: duración y que los nombres queden iguales,
+# salvo las celdas vacías, que antes quedaban como 'nan'/'Nan' y ahora quedan vacías.
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Nombres con casos raros: apóstrofo, guion, diéresis, tabulaciones y espacios no separables
+NOMBRES_RAROS = ["  d'angelo\tmaría ", 'GÜEMES\xa0martín', 'pérez-garcía  LUCÍA', '\tñuñez   ÍÑIGO\t']
+
+
+def _limpieza_asistencias():
+    spec = importlib.util.spec_from_file_location('limpieza_asistencias', os.path.join(SCRIPTS_DIR, 'limpieza-asistencias.py'))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def formatear_asistencias_anterior(df):
+    """
+    Pasos 2 y 3 de formatear_asistencias como estaban antes (un objeto str por celda). Con pandas 2
+    las columnas de texto se leían como object y astype(str) convertía los nulos en 'nan'; acá se
+    hace lo mismo con map(str), para que el resultado no dependa de la versión de pandas.
+    """
+    for col in df.columns:
+        if df[col].dtype == object or isinstance(df[col].dtype, pd.StringDtype):
+            df[col] = df[col].astype(object).map(str).str.strip()
+    df['Apellido y Nombres'] = df['Apellido y Nombres'].apply(
+        lambda x: ' '.join([name.capitalize() for name in x.split()]) if isinstance(x, str) else x
+    )
+    return df
+
+
+def agregar_nombres_raros(path_csv, semilla):
+    """Reemplaza uno de cada 20 nombres del CSV por uno de NOMBRES_RAROS."""
+    aleatorio = random.Random(semilla)
+    with open(path_csv, encoding='utf-8') as f:
+        lineas = f.read().splitlines()
+    for i in range(1, len(lineas)):
+        if aleatorio.random() < 0.05:
+            campos = lineas[i].split(';')
+            campos[0] = aleatorio.choice(NOMBRES_RAROS)
+            lineas[i] = ';'.join(campos)
+    with open(path_csv, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lineas) + '\n')
+
+
+def cronometrar(funcion, repeticiones):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark del formato de nombres de las asistencias")
+    parser.add_argument('--filas', type=int, default=50000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    modulo = _limpieza_asistencias()
+    directorio = tempfile.mkdtemp(prefix='benchmark_asistencias_')
+    try:
+        path_csv = os.path.join(directorio, 'asistencia.csv')
+        generar_asistencias(path_csv, args.filas, 2025)
+        agregar_nombres_raros(path_csv, 2025)
+        df = leer_csv(path_csv, modulo.SINONIMOS_ASISTENCIA)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    t_anterior, anterior = cronometrar(lambda: formatear_asistencias_anterior(df.copy()), args.repeticiones)
+    t_nuevo, nuevo = cronometrar(lambda: modulo.formatear_asistencias(df.copy(), 'asistencia.csv', avisar=False),
+                                 args.repeticiones)
+
+    print(f"{len(df)} filas")
+    print(f"{'anterior':>10} {t_anterior:8.3f} s")
+    print(f"{'vectorial':>10} {t_nuevo:8.3f} s {t_anterior / t_nuevo:6.1f}x")
+
+    todo_bien = True
+    for columna in nuevo.columns:
+        if not isinstance(nuevo[columna].dtype, pd.StringDtype):
+            continue
+        vacias = df[columna].isna()
+        # Donde había texto, el resultado es el mismo que antes
+        iguales = nuevo[columna][~vacias].astype(object).equals(anterior[columna][~vacias].astype(object))
+        # Donde no había nada, queda vacío (antes quedaba 'nan')
+        sin_nan = bool(nuevo[columna][vacias].isna().all())
+        todo_bien = todo_bien and iguales and sin_nan
+        print(f"{columna:>24}: {int(vacias.sum()):6} vacías, igual al anterior: {'sí' if iguales else 'NO'}, "
+              f"vacías sin 'nan': {'sí' if sin_nan else 'NO'} (antes {int(anterior[columna][vacias].isin(['nan', 'Nan']).sum())})")
+
+    print(f"Resultado correcto: {'sí' if todo_bien else 'NO'}")
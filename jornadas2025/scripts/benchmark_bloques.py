@@ -0,0 +1,143 @@
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import importlib.util
+import multiprocessing
+from benchmark_limpieza import generar_exportacion
+
+# Compara la limpieza de un archivo entero contra el modo por bloques (--filas-por-bloque):
+# pico de memoria de cada modo (en un proceso aparte) y que los archivos generados sean idénticos.
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+APELLIDOS = ['gómez', 'PÉREZ', "o'brien", 'núñez', 'DE LA FUENTE', 'rodríguez', 'lópez-garcía', 'ibáñez']
+NOMBRES = ['maría josé', 'JUAN', 'lucía', 'josé luis', 'ÁNGELES', 'martín', 'sofía', 'íñigo']
+
+
+def generar_asistencias(path_csv, filas, semilla):
+    """
+    Genera un CSV de asistencias separado por ';', con espacios sueltos, mayúsculas mezcladas, celdas
+    vacías y documentos vacíos o con ceros a la izquierda.
+    """
+    aleatorio = random.Random(semilla)
+    with open(path_csv, 'w', encoding='utf-8') as f:
+        f.write(' Apellido y Nombres ;Documento;Mail;Mail UTN;Apellido y Nombre legal;Comisión\n')
+        for i in range(filas):
+            nombre = f"  {aleatorio.choice(APELLIDOS)}   {aleatorio.choice(NOMBRES)} "
+            if aleatorio.random() < 0.01:
+                nombre = ''
+            mail = f" persona.{i}@gmail.com " if aleatorio.random() < 0.8 else ''
+            mail_utn = f"persona.{i}@frlp.utn.edu.ar" if aleatorio.random() < 0.5 else ''
+            comision = aleatorio.choice(['S1', ' S2 ', '', 'Q1'])
+            # Algunos documentos vacíos y otros con ceros a la izquierda (deben quedar tal cual)
+            documento = aleatorio.choices([f"{30000000 + i}", f"00{5000000 + i}", ''], [0.97, 0.02, 0.01])[0]
+            f.write(f"{nombre};{documento};{mail};{mail_utn};{nombre.upper()};{comision}\n")
+
+
+def _pico_memoria_mb():
+    import resource
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def _limpiar(tipo, directorio, filas_por_bloque, resultado):
+    """Corre la limpieza en este proceso (hijo) y devuelve duración y pico de memoria."""
+    sys.path.insert(0, SCRIPTS_DIR)
+    sys.stdout = open(os.devnull, 'w')
+    if tipo == 'inscripciones':
+        from limpieza import procesar_csv
+        base = _pico_memoria_mb()
+        inicio = time.perf_counter()
+        procesar_csv(os.path.join(directorio, 'depto'), 'charla.csv', filas_por_bloque)
+    else:
+        spec = importlib.util.spec_from_file_location('limpieza_asistencias', os.path.join(SCRIPTS_DIR, 'limpieza-asistencias.py'))
+        modulo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(modulo)
+        base = _pico_memoria_mb()
+        inicio = time.perf_counter()
+        modulo.limpiar_y_formatear_csv(os.path.join(directorio, 'asistencias'), filas_por_bloque=filas_por_bloque)
+    resultado.put({'duracion': time.perf_counter() - inicio, 'base_mb': base, 'pico_mb': _pico_memoria_mb()})
+
+
+def correr(tipo, directorio, filas_por_bloque):
+    """Limpia en un proceso nuevo (para medir su pico de memoria) y devuelve los bytes de cada salida."""
+    if tipo == 'inscripciones':
+        salida_dir = os.path.join(directorio, 'depto', 'procesadas')
+    else:
+        salida_dir = os.path.join(directorio, 'asistencias', 'procesadas')
+    shutil.rmtree(salida_dir, ignore_errors=True)
+
+    resultado = multiprocessing.Queue()
+    proceso = multiprocessing.Process(target=_limpiar, args=(tipo, directorio, filas_por_bloque, resultado))
+    proceso.start()
+    medidas = resultado.get()
+    proceso.join()
+
+    salidas = {}
+    for raiz, _, archivos in os.walk(salida_dir):
+        for archivo in archivos:
+            with open(os.path.join(raiz, archivo), 'rb') as f:
+                salidas[archivo] = f.read()
+    return medidas, salidas
+
+
+def iguales(salidas_a, salidas_b):
+    """Compara las salidas; las .feather se comparan por contenido (la división en bloques puede variar)."""
+    from pyarrow import ipc
+    import pyarrow as pa
+    if salidas_a.keys() != salidas_b.keys():
+        return False
+    for archivo, datos in salidas_a.items():
+        if archivo.endswith('.feather'):
+            tabla_a = ipc.open_file(pa.BufferReader(datos)).read_all()
+            tabla_b = ipc.open_file(pa.BufferReader(salidas_b[archivo])).read_all()
+            if not tabla_a.equals(tabla_b):
+                return False
+        elif datos != salidas_b[archivo]:
+            return False
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Memoria y resultado de la limpieza entera vs. por bloques")
+    parser.add_argument('--filas', type=int, nargs='+', default=[100000, 400000])
+    parser.add_argument('--filas-por-bloque', type=int, default=20000)
+    parser.add_argument('--tipos', nargs='+', choices=['inscripciones', 'asistencias'],
+                        default=['inscripciones', 'asistencias'])
+    args = parser.parse_args()
+
+    encabezados = ['Marca temporal', 'Apellido', 'Nombre', 'DNI', 'Legajo', 'Mail']
+    print(f"{'tipo':>13} {'filas':>8} {'MB csv':>7} {'entero s':>9} {'entero MB':>10} "
+          f"{'bloques s':>10} {'bloques MB':>11} {'idénticos':>10}")
+    todo_igual = True
+    for tipo in args.tipos:
+        for filas in args.filas:
+            directorio = tempfile.mkdtemp(prefix='benchmark_bloques_')
+            try:
+                if tipo == 'inscripciones':
+                    path_csv = os.path.join(directorio, 'depto', 'originales', 'charla.csv')
+                    os.makedirs(os.path.dirname(path_csv))
+                    generar_exportacion(path_csv, filas, 2025, encabezados)
+                else:
+                    path_csv = os.path.join(directorio, 'asistencias', 'asistencia.csv')
+                    os.makedirs(os.path.dirname(path_csv))
+                    generar_asistencias(path_csv, filas, 2025)
+
+                entero, salidas_entero = correr(tipo, directorio, None)
+                bloques, salidas_bloques = correr(tipo, directorio, args.filas_por_bloque)
+                identicos = iguales(salidas_entero, salidas_bloques)
+                todo_igual = todo_igual and identicos
+                # Memoria que agrega la limpieza sobre lo que ocupa el proceso con las bibliotecas cargadas
+                print(f"{tipo:>13} {filas:>8} {os.path.getsize(path_csv) / 1e6:7.1f} "
+                      f"{entero['duracion']:9.2f} {entero['pico_mb'] - entero['base_mb']:10.0f} "
+                      f"{bloques['duracion']:10.2f} {bloques['pico_mb'] - bloques['base_mb']:11.0f} "
+                      f"{'sí' if identicos else 'NO':>10}")
+            finally:
+                shutil.rmtree(directorio, ignore_errors=True)
+
+    sys.exit(0 if todo_igual else 1)
@@ -0,0 +1,290 @@
+import os
+import sys
+import json
+import queue
+import time
+import shutil
+import random
+import logging
+import tempfile
+import argparse
+import multiprocessing
+from servidor_smtp_prueba import ServidorSMTPPrueba
+
+# Benchmark de los scripts de envío contra un servidor SMTP local (nunca contra Office 365).
+# Cada corrida se ejecuta en un proceso nuevo para medir el pico de memoria por separado.
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+EMISORES = ['correos', 'certificados', 'reprogramacion']
+
+DEPARTAMENTOS = ['sistemas', 'quimica', 'civil', 'electrica', 'mecanica']
+CHARLAS_POR_DEPARTAMENTO = 4
+
+# Tamaño aproximado del PDF de prueba (los certificados reales rondan este tamaño)
+TAMANIO_PDF = 60 * 1024
+
+
+def _codigo_charla(departamento, numero):
+    return f"{departamento[:3]}-{numero:02d}"
+
+
+def generar_inscripciones(base_dir, filas):
+    """
+    Genera un árbol inscripciones/<depto>/procesadas/<charla>/<charla>.csv sintético,
+    con el mismo formato que deja limpieza.py, y su tabla de referencias.
+
+    Args:
+        base_dir (str): Directorio donde se crea la carpeta 'inscripciones'.
+        filas (int): Cantidad total de inscripciones, repartidas entre todas las charlas.
+
+    Returns:
+        str: Ruta a la carpeta 'inscripciones' generada.
+    """
+    inscripciones_dir = os.path.join(base_dir, 'inscripciones')
+    charlas = [(depto, _codigo_charla(depto, n)) for depto in DEPARTAMENTOS for n in range(1, CHARLAS_POR_DEPARTAMENTO + 1)]
+
+    os.makedirs(inscripciones_dir, exist_ok=True)
+    with open(os.path.join(inscripciones_dir, 'tabla-de-referencias.csv'), 'w', encoding='utf-8') as f:
+        for depto, charla in charlas:
+            f.write(f"{charla};Charla de prueba {charla};Aula {depto[:1].upper()}{charla[-2:]}\n")
+
+    for indice, (depto, charla) in enumerate(charlas):
+        charla_dir = os.path.join(inscripciones_dir, depto, 'procesadas', charla)
+        os.makedirs(charla_dir, exist_ok=True)
+        # Reparte las filas en forma pareja entre las charlas
+        desde = filas * indice // len(charlas)
+        hasta = filas * (indice + 1) // len(charlas)
+        with open(os.path.join(charla_dir, f"{charla}.csv"), 'w', encoding='utf-8') as f:
+            f.write("Apellido,Nombre,DNI,Legajo,Mail\n")
+            for i in range(desde, hasta):
+                # Un 30% de las personas se repite en otra charla, como en las inscripciones reales
+                persona = i if random.random() > 0.3 else random.randrange(filas)
+                f.write(f"Apellido{persona},Nombre{persona},{30000000 + persona},{10000 + persona},"
+                        f"persona{persona}@prueba.utn.edu.ar\n")
+
+    return inscripciones_dir
+
+
+def generar_certificados(base_dir, filas):
+    """
+    Genera la carpeta 'certificados' con un PDF por asistente (enlaces duros a un
+    único archivo para no ocupar disco) y su certificados_a_enviar.json.
+
+    Returns:
+        str: Ruta a la carpeta 'certificados' generada.
+    """
+    certificados_dir = os.path.join(base_dir, 'certificados')
+    os.makedirs(certificados_dir, exist_ok=True)
+
+    pdf_modelo = os.path.join(certificados_dir, 'modelo.pdf')
+    with open(pdf_modelo, 'wb') as f:
+        f.write(b"%PDF-1.4\n" + os.urandom(TAMANIO_PDF) + b"\n%%EOF\n")
+
+    entradas = []
+    for i in range(filas):
+        subcarpeta = f"dia{i % 3 + 1}"
+        nombre_pdf = f"apellido{i}-nombre{i}-{30000000 + i}-certificado.pdf"
+        ruta_pdf = os.path.join(certificados_dir, subcarpeta, nombre_pdf)
+        os.makedirs(os.path.dirname(ruta_pdf), exist_ok=True)
+        try:
+            os.link(pdf_modelo, ruta_pdf)
+        except OSError:
+            shutil.copyfile(pdf_modelo, ruta_pdf)
+        entradas.append({
+            'nombre_completo': f"Apellido{i} Nombre{i}",
+            'documento': str(30000000 + i),
+            'correo_destinatario': f"persona{i}@prueba.utn.edu.ar",
+            'nombre_pdf_generado': nombre_pdf,
+            'subcarpeta_dia': subcarpeta,
+        })
+
+    with open(os.path.join(certificados_dir, 'certificados_a_enviar.json'), 'w', encoding='utf-8') as f:
+        json.dump(entradas, f, ensure_ascii=False)
+
+    return certificados_dir
+
+
+def _pico_memoria_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def _ejecutar_emisor(emisor, directorio, puerto, conexiones, espera_throttling, con_metricas, resultado):
+    """Corre un script de envío en este proceso (hijo) y devuelve duración y memoria."""
+    # La configuración SMTP se lee al importar, así que se fija antes de importar los scripts
+    os.environ.update({
+        'SMTP_SERVER': '127.0.0.1',
+        'SMTP_PORT': str(puerto),
+        'SMTP_STARTTLS': '0',
+        'SMTP_LIMITE_POR_MINUTO': str(10 ** 9),
+        'SMTP_LIMITE_POR_DIA': str(10 ** 9),
+        'EMAIL_SENDER': 'benchmark@prueba.utn.edu.ar',
+        'EMAIL_PASSWORD': 'benchmark',
+        'EMAIL_ALIAS': 'Benchmark',
+    })
+    sys.path.insert(0, SCRIPTS_DIR)
+
+    # Los logs y el registro de cada corrida quedan en el directorio temporal, no en scripts/logs
+    log_path = os.path.join(directorio, f"{emisor}.log")
+    logging.basicConfig(filename=log_path, level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s', encoding='utf-8')
+    import registro_envios
+    registro_envios.RUTA_REGISTRO = os.path.join(directorio, f"{emisor}.sqlite3")
+    import conexion_smtp
+    conexion_smtp.ESPERA_THROTTLING = espera_throttling
+    import reintentos
+    reintentos.ESPERA_REINTENTO = espera_throttling
+    reintentos.FALLIDOS_DIR = os.path.join(directorio, 'fallidos')
+    # Cache de QR vacío por corrida: se mide el render, no los QR de corridas anteriores
+    import cache_qr
+    cache_qr.QR_DIR = os.path.join(directorio, 'qr_generados')
+    import referencias
+    referencias.RUTA_TABLA = os.path.join(directorio, 'inscripciones', 'tabla-de-referencias.csv')
+    import indice_inscripciones
+    indice_inscripciones.BASE_DIR = os.path.join(directorio, 'inscripciones')
+
+    # Los scripts imprimen avisos por consola
+    sys.stdout = open(os.devnull, 'w')
+
+    # Permite comparar el costo de la instrumentación con y sin métricas activas
+    from metricas import metricas
+    if con_metricas:
+        metricas.configurar(emisor, archivo=os.path.join(directorio, f"{emisor}.prom"))
+
+    inicio = time.perf_counter()
+    if emisor == 'correos':
+        import envio_de_correos
+        envio_de_correos.log_file_path = log_path
+        envio_de_correos.recorrer_y_enviar(conexiones=conexiones)
+    elif emisor == 'certificados':
+        import envio_de_certificados
+        envio_de_certificados.CERTIFICADOS_DIR = os.path.join(directorio, 'certificados')
+        envio_de_certificados.MAP_FILE = os.path.join(directorio, 'certificados', 'certificados_a_enviar.json')
+        envio_de_certificados.log_path = log_path
+        envio_de_certificados.recorrer_y_enviar()
+    elif emisor == 'reprogramacion':
+        import envio_reprogramacion
+        envio_reprogramacion.log_file_path = log_path
+        envio_reprogramacion.recorrer_y_enviar_reprogramacion()
+    duracion = time.perf_counter() - inicio
+    metricas.finalizar()
+
+    resultado.put({'duracion': duracion, 'pico_mb': _pico_memoria_mb()})
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def correr(emisor, directorio, servidor, conexiones, espera_throttling, con_metricas=False):
+    """
+    Corre un emisor contra el servidor de prueba y devuelve las métricas de la corrida.
+
+    Returns:
+        dict: mensajes, mensajes/s, p50/p99 de latencia por mensaje (ms), pico de RSS (MB),
+        respuestas 451 y desconexiones simuladas.
+    """
+    servidor.estadisticas.reiniciar()
+
+    contexto = multiprocessing.get_context('spawn')
+    resultado = contexto.Queue()
+    proceso = contexto.Process(
+        target=_ejecutar_emisor,
+        args=(emisor, directorio, servidor.puerto, conexiones, espera_throttling, con_metricas, resultado),
+    )
+    proceso.start()
+    while True:
+        try:
+            datos = resultado.get(timeout=1)
+            break
+        except queue.Empty:
+            if not proceso.is_alive():
+                raise RuntimeError(f"La corrida de '{emisor}' terminó sin resultados (código {proceso.exitcode})")
+    proceso.join()
+
+    e = servidor.estadisticas
+    with e.lock:
+        latencias = list(e.latencias)
+        mensajes = e.aceptados
+        throttling = e.throttling
+        rechazos = e.rechazos
+        desconexiones = e.desconexiones
+
+    return {
+        'emisor': emisor,
+        'mensajes': mensajes,
+        'mensajes_por_segundo': mensajes / datos['duracion'] if datos['duracion'] else 0.0,
+        'p50_ms': _percentil(latencias, 50) * 1000,
+        'p99_ms': _percentil(latencias, 99) * 1000,
+        'pico_mb': datos['pico_mb'],
+        'throttling': throttling,
+        'rechazos': rechazos,
+        'desconexiones': desconexiones,
+        'duracion': datos['duracion'],
+    }
+
+
+def _imprimir(filas, resultado):
+    pico = f"{resultado['pico_mb']:.0f}" if resultado['pico_mb'] is not None else '-'
+    print(f"{filas:>8} {resultado['emisor']:<15} {resultado['mensajes']:>8} {resultado['mensajes_por_segundo']:>9.1f} "
+          f"{resultado['p50_ms']:>9.1f} {resultado['p99_ms']:>9.1f} {pico:>8} "
+          f"{resultado['throttling']:>6} {resultado['rechazos']:>6} {resultado['desconexiones']:>6}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark de los envíos contra un servidor SMTP local")
+    parser.add_argument('--filas', type=int, nargs='+', default=[1000],
+                        help="Tamaños de los datos sintéticos, por ejemplo: --filas 1000 10000 100000")
+    parser.add_argument('--emisores', nargs='+', choices=EMISORES, default=EMISORES)
+    parser.add_argument('--conexiones', type=int, default=4, help="Conexiones SMTP del envío de QR.")
+    parser.add_argument('--latencia', type=float, default=0.0, help="Segundos de demora del servidor por mensaje.")
+    parser.add_argument('--prob-throttling', type=float, default=0.0, help="Probabilidad de responder 451.")
+    parser.add_argument('--prob-desconexion', type=float, default=0.0, help="Probabilidad de cortar la sesión.")
+    parser.add_argument('--prob-rechazo', type=float, default=0.0, help="Probabilidad de responder 550.")
+    parser.add_argument('--espera-throttling', type=float, default=0.5,
+                        help="Espera inicial ante un 451 y antes de cada reintento (en producción son 15 y 30 segundos).")
+    parser.add_argument('--con-metricas', action='store_true',
+                        help="Activa las métricas de los scripts (para medir su costo).")
+    parser.add_argument('--semilla', type=int, default=2025)
+    parser.add_argument('--salida-json', help="Guarda los resultados en este archivo.")
+    args = parser.parse_args()
+
+    random.seed(args.semilla)
+    servidor = ServidorSMTPPrueba(latencia=args.latencia, prob_throttling=args.prob_throttling,
+                                  prob_desconexion=args.prob_desconexion, prob_rechazo=args.prob_rechazo)
+    servidor.iniciar_en_segundo_plano()
+
+    print(f"{'filas':>8} {'emisor':<15} {'mensajes':>8} {'msg/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'RSS MB':>8} "
+          f"{'451':>6} {'550':>6} {'desc.':>6}")
+    resultados = []
+    try:
+        for filas in args.filas:
+            with tempfile.TemporaryDirectory(prefix='benchmark_envios_') as directorio:
+                if 'correos' in args.emisores or 'reprogramacion' in args.emisores:
+                    generar_inscripciones(directorio, filas)
+                if 'certificados' in args.emisores:
+                    generar_certificados(directorio, filas)
+
+                for emisor in args.emisores:
+                    resultado = correr(emisor, directorio, servidor, args.conexiones, args.espera_throttling,
+                                       args.con_metricas)
+                    resultado['filas'] = filas
+                    resultados.append(resultado)
+                    _imprimir(filas, resultado)
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+    if args.salida_json:
+        with open(args.salida_json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
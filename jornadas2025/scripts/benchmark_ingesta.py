@@ -0,0 +1,73 @@
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import importlib.util
+import pandas as pd
+from ingesta import detectar_formato, leer_csv
+from benchmark_bloques import generar_asistencias
+
+# Compara la lectura anterior de las asistencias (sep=';' con el motor de Python) contra
+# ingesta.leer_csv, y verifica que leer_csv lea igual la misma planilla exportada con otros
+# separadores y codificaciones.
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# (nombre, separador, codificación) de cada variante de la exportación
+VARIANTES = [
+    ('punto y coma utf-8', ';', 'utf-8'),
+    ('coma cp1252', ',', 'cp1252'),
+    ('tab utf-8 con BOM', '\t', 'utf-8-sig'),
+]
+
+
+def _sinonimos_asistencia():
+    spec = importlib.util.spec_from_file_location('limpieza_asistencias', os.path.join(SCRIPTS_DIR, 'limpieza-asistencias.py'))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo.SINONIMOS_ASISTENCIA
+
+
+def cronometrar(funcion, repeticiones):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark de ingesta.leer_csv con planillas de asistencia")
+    parser.add_argument('--filas', type=int, default=100000)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    sinonimos = _sinonimos_asistencia()
+    directorio = tempfile.mkdtemp(prefix='benchmark_ingesta_')
+    try:
+        original = os.path.join(directorio, 'asistencia.csv')
+        generar_asistencias(original, args.filas, 2025)
+
+        t_anterior, anterior = cronometrar(lambda: pd.read_csv(original, sep=';', engine='python', dtype=str),
+                                           args.repeticiones)
+        anterior.columns = anterior.columns.str.strip()
+        print(f"{'variante':>20} {'separador':>9} {'codificación':>12} {'s':>7} {'vs anterior':>11} {'igual':>6}")
+        print(f"{'anterior (python)':>20} {';':>9} {'utf-8':>12} {t_anterior:7.3f} {'':>11} {'':>6}")
+
+        todo_igual = True
+        for nombre, separador, codificacion in VARIANTES:
+            path = os.path.join(directorio, f"{nombre}.csv")
+            # Misma planilla con otro separador y codificación
+            anterior.to_csv(path, sep=separador, encoding=codificacion, index=False)
+            formato = detectar_formato(path, sinonimos.values())
+            t_nuevo, nuevo = cronometrar(lambda: leer_csv(path, sinonimos, dtype=str), args.repeticiones)
+            igual = nuevo.equals(anterior)
+            todo_igual = todo_igual and igual
+            print(f"{nombre:>20} {repr(formato.separador):>9} {formato.codificacion:>12} {t_nuevo:7.3f} "
+                  f"{t_anterior / t_nuevo:10.1f}x {'sí' if igual else 'NO':>6}")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    print(f"Todas las variantes se leen igual: {'sí' if todo_igual else 'NO'}")
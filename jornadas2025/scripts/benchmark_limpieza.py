@@ -0,0 +1,154 @@
+import os
+import re
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import pandas as pd
+from limpieza import validar_y_limpiar_csv
+
+# Compara validar_y_limpiar_csv contra la implementación anterior (fila por fila con iterrows)
+# sobre una exportación sintética de Google Forms, y verifica que los CSV generados sean idénticos.
+
+APELLIDOS = ['gómez', 'PÉREZ', ' rodríguez ', 'fernández', "o'brien", 'de la peña', 'núñez', 'lópez-garcía']
+NOMBRES = ['juan', 'MARÍA JOSÉ', ' ana ', 'josé luis', 'iñaki', 'lucía', 'martín', '']
+DOMINIOS = ['gmail.com', 'frlp.utn.edu.ar', 'hotmail.com', 'yahoo.com.ar', 'alu.frlp.utn.edu.ar']
+
+
+def validar_y_limpiar_csv_anterior(path_csv):
+    """Versión anterior de limpieza.validar_y_limpiar_csv."""
+    df = pd.read_csv(path_csv, dtype=str).fillna('')
+    df.columns = [col.strip().lower() for col in df.columns]
+    if 'marca temporal' in df.columns:
+        df = df.drop(columns=['marca temporal'])
+    sinonimos_columnas = {
+        'correo': 'mail',
+        'email': 'mail',
+        'e-mail': 'mail',
+        'correo electronico': 'mail',
+        'correo electrónico': 'mail',
+        'apellido y nombre': 'nombre',
+        'apellido y  nombre': 'nombre',
+        'Apellido ': 'apellido',
+    }
+    df.columns = [sinonimos_columnas.get(col, col) for col in df.columns]
+
+    clean_rows = []
+    error_rows = []
+    email_pattern = re.compile(r'^[^@]+@[^@]+\.[^@]+$')
+    for idx, row in df.iterrows():
+        errors = []
+        apellido = row.get('apellido', '').strip().title()
+        nombre = row.get('nombre', '').strip().title()
+        dni = row.get('dni', '').strip().replace('.', '')
+        legajo = row.get('legajo', '').strip().replace('.', '')
+        mail = row.get('mail', '').strip()
+        if dni and not dni.isnumeric():
+            errors.append("DNI no numérico")
+        if mail and not email_pattern.match(mail):
+            errors.append("Mail formato inválido")
+        if errors:
+            error_rows.append({
+                'Fila': idx + 1,
+                'Apellido': row.get('apellido', ''),
+                'Nombre': row.get('nombre', ''),
+                'DNI': row.get('dni', ''),
+                'Legajo': row.get('legajo', ''),
+                'Mail': row.get('mail', ''),
+                'Errores': "; ".join(errors)
+            })
+        else:
+            clean_rows.append({
+                'Apellido': apellido,
+                'Nombre': nombre,
+                'DNI': dni if dni else None,
+                'Legajo': legajo if legajo else None,
+                'Mail': mail if mail else None,
+            })
+    columnas = ['Apellido', 'Nombre', 'DNI', 'Legajo', 'Mail']
+    return pd.DataFrame(clean_rows, columns=columnas), pd.DataFrame(error_rows)
+
+
+def _valor(aleatorio, correcto, variantes, prob_error):
+    return aleatorio.choice(variantes) if aleatorio.random() < prob_error else correcto
+
+
+def generar_exportacion(path_csv, filas, semilla, encabezados):
+    """Genera un CSV con la forma de las exportaciones de Google Forms, con errores y espacios sueltos."""
+    aleatorio = random.Random(semilla)
+    registros = []
+    for i in range(filas):
+        dni = f"{30000000 + i:,}".replace(',', '.') if aleatorio.random() < 0.3 else str(30000000 + i)
+        dni = _valor(aleatorio, dni, ['', ' 3O.123.456', '30123456a', 'no tengo', f" {dni} "], 0.05)
+        legajo = _valor(aleatorio, str(10000 + i), ['', '12.345', ' 9876 ', 'A-12'], 0.1)
+        usuario = f"persona.{i}"
+        mail = _valor(aleatorio, f"{usuario}@{aleatorio.choice(DOMINIOS)}",
+                      ['', f"{usuario}gmail.com", f"{usuario}@gmail", f" {usuario}@GMAIL.COM ", 'a@b@c.com'], 0.05)
+        registros.append([
+            f"2025/05/{1 + i % 28:02d} 10:{i % 60:02d}:00",
+            aleatorio.choice(APELLIDOS),
+            aleatorio.choice(NOMBRES),
+            dni,
+            legajo,
+            mail,
+        ])
+    pd.DataFrame(registros, columns=encabezados).to_csv(path_csv, index=False)
+
+
+def escribir(df_clean, df_errors, directorio):
+    """Escribe las salidas igual que procesar_csv y devuelve sus bytes."""
+    os.makedirs(directorio, exist_ok=True)
+    limpio = os.path.join(directorio, 'charla.csv')
+    errores = os.path.join(directorio, 'errores.csv')
+    df_clean.to_csv(limpio, index=False)
+    df_errors.to_csv(errores, index=False)
+    with open(limpio, 'rb') as f1, open(errores, 'rb') as f2:
+        return f1.read(), f2.read()
+
+
+def cronometrar(funcion, path_csv, repeticiones):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(path_csv)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark de validar_y_limpiar_csv")
+    parser.add_argument('--filas', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--semilla', type=int, default=2025)
+    args = parser.parse_args()
+
+    # Encabezados de distintas versiones del formulario (con sinónimos y espacios)
+    variantes_encabezados = [
+        ['Marca temporal', 'Apellido', 'Nombre', 'DNI', 'Legajo', 'Mail'],
+        ['Marca temporal', ' Apellido ', 'Apellido y nombre', 'DNI', 'Legajo', 'Correo electrónico'],
+        ['Marca temporal', 'APELLIDO', 'NOMBRE', 'Dni', 'Legajo', 'E-mail'],
+    ]
+
+    directorio = tempfile.mkdtemp(prefix='benchmark_limpieza_')
+    iguales = True
+    try:
+        print(f"{'filas':>8} {'anterior s':>11} {'vectorizado s':>14} {'mejora':>7} {'idénticos':>10}")
+        for filas in args.filas:
+            for numero, encabezados in enumerate(variantes_encabezados):
+                path_csv = os.path.join(directorio, f"export_{filas}_{numero}.csv")
+                generar_exportacion(path_csv, filas, args.semilla + numero, encabezados)
+
+                t_anterior, anterior = cronometrar(validar_y_limpiar_csv_anterior, path_csv, args.repeticiones)
+                t_nuevo, nuevo = cronometrar(validar_y_limpiar_csv, path_csv, args.repeticiones)
+                identicos = (escribir(*anterior, os.path.join(directorio, 'anterior')) ==
+                             escribir(*nuevo, os.path.join(directorio, 'nuevo')))
+                iguales = iguales and identicos
+                if numero == 0:
+                    print(f"{filas:>8} {t_anterior:11.3f} {t_nuevo:14.3f} {t_anterior / t_nuevo:6.1f}x "
+                          f"{'sí' if identicos else 'NO':>10}")
+                elif not identicos:
+                    print(f"{filas:>8} encabezados {encabezados}: salidas distintas")
+        print(f"Todas las salidas idénticas (incluidas las variantes de encabezados): {'sí' if iguales else 'NO'}")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
@@ -0,0 +1,103 @@
+import time
+import random
+import argparse
+import textwrap
+from PIL import ImageFont
+import maquetado_texto
+from maquetado_texto import ajustar_lineas, ajustar_tamanio
+from generar_qr_asistencia import FUENTE_PATH, TEXTO_CONFIG
+
+# Compara el maquetado anterior del encabezado del QR (ajustar_texto) y del título del
+# certificado (generar_certificado) contra maquetado_texto, verificando que den las mismas líneas.
+
+PALABRAS = ("introducción a la ingeniería civil desafíos del siglo XXI taller de programación "
+            "en Python sistemas embebidos energías renovables gestión industrial química verde "
+            "mecánica de fluidos inteligencia artificial aplicada: casos reales, herramientas y "
+            "buenas prácticas para estudiantes y graduados").split()
+
+
+def ajustar_texto_anterior(texto, fuente_path, box_width, box_height, font_size):
+    """Versión anterior de generar_qr_asistencia.ajustar_texto."""
+    try:
+        font = ImageFont.truetype(fuente_path, font_size)
+    except:
+        font = ImageFont.load_default()
+
+    wrap_width = 30
+    lines = textwrap.wrap(texto, width=wrap_width)
+    total_height = sum([font.getbbox(line)[3] - font.getbbox(line)[1] + 10 for line in lines])
+    max_line_width = max([font.getbbox(line)[2] - font.getbbox(line)[0] for line in lines])
+    while (total_height > box_height or max_line_width > box_width) and wrap_width > 10:
+        wrap_width -= 1
+        lines = textwrap.wrap(texto, width=wrap_width)
+        total_height = sum([font.getbbox(line)[3] - font.getbbox(line)[1] + 10 for line in lines])
+        max_line_width = max([font.getbbox(line)[2] - font.getbbox(line)[0] for line in lines])
+    return lines, font
+
+
+def tamanio_certificado_anterior(texto, font_path, ancho, alto):
+    """Búsqueda anterior de generar_certificado: de 60 a 10, recargando la fuente en cada paso."""
+    for font_size in range(60, 9, -1):
+        font = ImageFont.truetype(font_path, font_size)
+        lines = textwrap.wrap(texto, width=40)
+        fits = True
+        total_height = 0
+        for line in lines:
+            bbox = font.getbbox(line)
+            if bbox[2] - bbox[0] > ancho:
+                fits = False
+                break
+            total_height += bbox[3] - bbox[1] + 5
+        if fits and total_height <= alto:
+            return lines, font_size, total_height
+    return [], None, 0
+
+
+def textos_de_prueba(cantidad, semilla):
+    aleatorio = random.Random(semilla)
+    return [f"QR de asistencia a:\n{' '.join(aleatorio.choices(PALABRAS, k=aleatorio.randint(1, 30)))}"
+            for _ in range(cantidad)]
+
+
+def cronometrar(funcion, textos):
+    inicio = time.perf_counter()
+    resultados = [funcion(texto) for texto in textos]
+    return (time.perf_counter() - inicio) / len(textos) * 1000, resultados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark del maquetado de textos")
+    parser.add_argument('--cantidad', type=int, default=500, help="Textos distintos a maquetar.")
+    parser.add_argument('--semilla', type=int, default=2025)
+    args = parser.parse_args()
+
+    textos = textos_de_prueba(args.cantidad, args.semilla)
+    ancho, alto = TEXTO_CONFIG['box_size']
+    tamanio = TEXTO_CONFIG['font_size']
+    ancho_cert, alto_cert = 600, 200
+
+    ms_qr_anterior, qr_anterior = cronometrar(
+        lambda t: ajustar_texto_anterior(t, FUENTE_PATH, ancho, alto, tamanio)[0], textos)
+    ms_qr_nuevo, qr_nuevo = cronometrar(
+        lambda t: list(ajustar_lineas(t, FUENTE_PATH, tamanio, ancho, alto)[0]), textos)
+    ms_qr_memo, _ = cronometrar(lambda t: ajustar_lineas(t, FUENTE_PATH, tamanio, ancho, alto), textos)
+
+    ms_cert_anterior, cert_anterior = cronometrar(
+        lambda t: tamanio_certificado_anterior(t, FUENTE_PATH, ancho_cert, alto_cert), textos)
+
+    def cert_nuevo(texto):
+        lineas, fuente, alto_total = ajustar_tamanio(texto, FUENTE_PATH, ancho_cert, alto_cert, 60, 10)
+        return list(lineas), fuente.size if fuente else None, alto_total
+    ms_cert_nuevo, cert_nuevo_res = cronometrar(cert_nuevo, textos)
+    ms_cert_memo, _ = cronometrar(cert_nuevo, textos)
+
+    distintos_qr = sum(a != b for a, b in zip(qr_anterior, qr_nuevo))
+    distintos_cert = sum(a != b for a, b in zip(cert_anterior, cert_nuevo_res))
+    medidor = maquetado_texto.medidor(FUENTE_PATH, tamanio)
+
+    print(f"Encabezado del QR:  anterior {ms_qr_anterior:.3f} ms | nuevo {ms_qr_nuevo:.3f} ms "
+          f"({ms_qr_anterior / ms_qr_nuevo:.0f}x) | memorizado {ms_qr_memo * 1000:.1f} µs")
+    print(f"Título certificado: anterior {ms_cert_anterior:.3f} ms | nuevo {ms_cert_nuevo:.3f} ms "
+          f"({ms_cert_anterior / ms_cert_nuevo:.0f}x) | memorizado {ms_cert_memo * 1000:.1f} µs")
+    print(f"Medición por glifos: {'sí' if medidor.por_glifos else 'no (fuente con kerning)'}")
+    print(f"Maquetados distintos al anterior: QR {distintos_qr}/{len(textos)}, certificado {distintos_cert}/{len(textos)}")
@@ -0,0 +1,127 @@
+import io
+import sys
+import time
+import argparse
+import numpy as np
+import qrcode
+from PIL import Image
+from referencias import referencias
+from generar_qr_asistencia import QR_TAMANIO, rasterizar_qr, componer_qr_asistencia
+
+# Compara, por imagen, el rasterizado anterior del QR (imagen de qrcode con box_size=10
+# reescalada a 700x700) contra rasterizar_qr, que amplía la matriz de módulos con NumPy.
+
+
+def _matriz(info):
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
+    qr.add_data(info)
+    qr.make(fit=True)
+    return qr
+
+
+def rasterizar_anterior(qr):
+    """Camino anterior: imagen de qrcode y reescalado a QR_TAMANIO."""
+    img_qr = qr.make_image(fill_color="black", back_color="white")
+    if not isinstance(img_qr, Image.Image):
+        img_qr = img_qr.get_image()
+    return img_qr.resize(QR_TAMANIO, Image.Resampling.LANCZOS)
+
+
+def rasterizar_nuevo(qr):
+    return rasterizar_qr(qr.get_matrix(), QR_TAMANIO[0], qr.border)[0]
+
+
+def verificar(qr, imagen):
+    """
+    Relee la imagen tomando el píxel central de cada módulo y la compara con la matriz.
+
+    Returns:
+        bool: True si todos los módulos tienen el color de la matriz.
+    """
+    matriz = np.array(qr.get_matrix(), dtype=bool)
+    pixeles = ~np.array(imagen.convert('1'), dtype=bool)  # True = negro
+    lado = matriz.shape[0]
+    px_modulo = imagen.size[0] // lado
+    relleno = (imagen.size[0] - px_modulo * lado) // 2
+    centros = relleno + np.arange(lado) * px_modulo + px_modulo // 2
+    return bool(np.array_equal(pixeles[np.ix_(centros, centros)], matriz))
+
+
+def anchos_anterior(qr, imagen):
+    """
+    Ancho en píxeles de cada módulo en el camino anterior. Pillow reescala las imágenes 1-bit
+    con vecino más cercano aunque se pida LANCZOS, así que cada columna de salida toma la
+    columna de origen floor((x + 0.5) * origen / destino); se verifica contra la imagen real.
+
+    Returns:
+        set: Anchos distintos de los módulos, o None si la imagen no responde a ese mapeo.
+    """
+    matriz = np.array(qr.get_matrix(), dtype=bool)
+    lado = matriz.shape[0]
+    destino = imagen.size[0]
+    modulo = ((np.arange(destino) + 0.5) * lado / destino).astype(int)
+    esperada = matriz[np.ix_(modulo, modulo)]
+    if not np.array_equal(~np.array(imagen.convert('1'), dtype=bool), esperada):
+        return None
+    return set(np.bincount(modulo, minlength=lado).tolist())
+
+
+def uniforme(qr, imagen):
+    """True si cada módulo es un bloque cuadrado de un solo color del mismo tamaño entero."""
+    pixeles = np.array(imagen.convert('1'), dtype=bool)
+    lado = len(qr.get_matrix())
+    px_modulo = imagen.size[0] // lado
+    relleno = (imagen.size[0] - px_modulo * lado) // 2
+    fin = relleno + px_modulo * lado
+    bloques = pixeles[relleno:fin, relleno:fin].reshape(lado, px_modulo, lado, px_modulo)
+    return bool((bloques == bloques[:, :1, :, :1]).all() and pixeles[:relleno].all() and pixeles[fin:].all())
+
+
+def medir(funcion, qrs, repeticiones):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for qr in qrs:
+            funcion(qr)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor / len(qrs) * 1000
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark del rasterizado del QR")
+    parser.add_argument('--cantidad', type=int, default=500, help="QR distintos a rasterizar.")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--charla', default='civ-01', help="Charla usada para medir la imagen completa.")
+    parser.add_argument('--referencias', help="Tabla de referencias a usar (por defecto, la de inscripciones).")
+    args = parser.parse_args()
+    referencias.ruta = args.referencias
+
+    infos = [f"{args.charla};{10000 + i};{30000000 + i};" for i in range(args.cantidad)]
+    inicio = time.perf_counter()
+    qrs = [_matriz(info) for info in infos]
+    ms_matriz = (time.perf_counter() - inicio) / len(qrs) * 1000
+
+    ms_anterior = medir(rasterizar_anterior, qrs, args.repeticiones)
+    ms_nuevo = medir(rasterizar_nuevo, qrs, args.repeticiones)
+
+    ok, anchos = True, set()
+    for qr in qrs:
+        anchos |= anchos_anterior(qr, rasterizar_anterior(qr)) or set()
+        imagen = rasterizar_nuevo(qr)
+        ok = ok and verificar(qr, imagen) and uniforme(qr, imagen)
+
+    # Imagen completa (fondo + QR + PNG), para ver qué parte del total es el rasterizado
+    componer_qr_asistencia(infos[0], args.charla)
+    inicio = time.perf_counter()
+    for info in infos[:50]:
+        componer_qr_asistencia(info, args.charla).save(io.BytesIO(), format='PNG')
+    ms_total = (time.perf_counter() - inicio) / min(50, len(infos)) * 1000
+
+    print(f"Matriz del QR (qrcode, igual en ambos caminos): {ms_matriz:.3f} ms/QR")
+    detalle = f" (módulos de {min(anchos)} a {max(anchos)} px)" if anchos else ""
+    print(f"Rasterizado anterior (box_size=10 + resize):    {ms_anterior:.3f} ms/QR{detalle}")
+    print(f"Rasterizado NumPy (módulos enteros):            {ms_nuevo:.3f} ms/QR "
+          f"({ms_anterior / ms_nuevo:.1f}x más rápido, módulos de {QR_TAMANIO[0] // len(qrs[0].get_matrix())} px)")
+    print(f"Imagen completa con PNG:                        {ms_total:.1f} ms/QR")
+    print(f"Módulos iguales a la matriz y de ancho uniforme: {'sí' if ok else 'NO'}")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,172 @@
+import os
+import hashlib
+import logging
+import argparse
+import threading
+from functools import lru_cache
+
+# Directorio de QR ya generados, direccionados por contenido: <clave[:2]>/<clave>.<extension>
+QR_DIR = os.path.join(os.path.dirname(__file__), 'qr_generados')
+
+MANIFIESTO = 'manifiesto.jsonl'
+
+# Subir este número al cambiar el código que dibuja la imagen. Los cambios en template.jpg,
+# la fuente o las constantes de disposición ya cambian la clave por sí solos (ver huella_disenio).
+VERSION_DISENIO = 2
+
+# Tamaño máximo del directorio de QR. Al superarlo se borran los QR usados hace más tiempo.
+TAMANIO_MAXIMO_MB = int(os.getenv('QR_CACHE_MAXIMO_MB', 2048))
+
+# Al podar se baja hasta este porcentaje del máximo, para no podar en cada QR nuevo
+PORCENTAJE_PODA = 0.9
+
+_lock = threading.Lock()
+_tamanio_actual = None  # bytes ocupados, se calcula al guardar el primer QR
+
+
+@lru_cache(maxsize=None)
+def _hash_archivo(ruta):
+    try:
+        with open(ruta, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return 'ausente'
+
+
+def huella_disenio(rutas, disposicion=''):
+    """
+    Resume en un hash todo lo que define el aspecto del QR además de sus datos: la versión
+    del diseño, el contenido de los archivos usados (template, fuente) y la disposición.
+    Los archivos se leen una sola vez por proceso.
+
+    Args:
+        rutas (tuple): Archivos de los que depende la imagen.
+        disposicion (str): Representación de las posiciones, tamaños y colores usados.
+
+    Returns:
+        str: Hash hexadecimal.
+    """
+    partes = [str(VERSION_DISENIO), disposicion] + [_hash_archivo(ruta) for ruta in rutas]
+    return hashlib.sha256('\0'.join(partes).encode('utf-8')).hexdigest()
+
+
+def clave_qr(info, titulo, huella=''):
+    """
+    Clave de contenido de un QR: depende solo de los datos del QR, del título
+    de la charla dibujado en el fondo y de la huella del diseño.
+    """
+    contenido = f"{huella}\0{titulo}\0{info}"
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def ruta_qr(clave, extension='png'):
+    return os.path.join(QR_DIR, clave[:2], f"{clave}.{extension}")
+
+
+def leer_qr(clave, extension='png'):
+    """Devuelve los bytes del QR ya generado, o None si no existe. Marca el QR como usado."""
+    ruta = ruta_qr(clave, extension)
+    try:
+        with open(ruta, 'rb') as f:
+            png = f.read()
+    except FileNotFoundError:
+        return None
+
+    # La fecha de modificación indica el último uso, para podar los menos usados
+    try:
+        os.utime(ruta)
+    except OSError:
+        pass
+    return png
+
+
+def guardar_qr(clave, datos, podar=True, extension='png'):
+    """
+    Guarda el QR de forma atómica (varios procesos pueden escribir a la vez).
+
+    Args:
+        clave (str): Clave de contenido (ver clave_qr).
+        datos (bytes): Imagen codificada.
+        podar (bool): Si al guardar se supera TAMANIO_MAXIMO_MB, borra los QR usados hace más tiempo.
+        extension (str): Extensión del formato de la imagen.
+    """
+    global _tamanio_actual
+    ruta = ruta_qr(clave, extension)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    ruta_tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(ruta_tmp, 'wb') as f:
+        f.write(datos)
+    os.replace(ruta_tmp, ruta)
+
+    if not podar:
+        return
+
+    maximo = TAMANIO_MAXIMO_MB * 1024 * 1024
+    with _lock:
+        if _tamanio_actual is None:
+            _tamanio_actual = sum(tamanio for _, _, tamanio in _listar_qr())
+        else:
+            _tamanio_actual += len(datos)
+        if _tamanio_actual > maximo:
+            _tamanio_actual = podar_cache(int(maximo * PORCENTAJE_PODA))
+
+
+def _listar_qr():
+    """Devuelve (ruta, ultimo_uso, tamanio) de cada QR guardado."""
+    archivos = []
+    if not os.path.isdir(QR_DIR):
+        return archivos
+    for subdir in os.scandir(QR_DIR):
+        if not subdir.is_dir():
+            continue
+        for entrada in os.scandir(subdir.path):
+            if entrada.name.endswith('.tmp'):
+                continue
+            try:
+                stat = entrada.stat()
+            except FileNotFoundError:
+                continue
+            archivos.append((entrada.path, stat.st_mtime, stat.st_size))
+    return archivos
+
+
+def podar_cache(maximo_bytes=None):
+    """
+    Borra los QR usados hace más tiempo hasta que el directorio ocupe como mucho 'maximo_bytes'.
+
+    Returns:
+        int: Bytes ocupados al terminar.
+    """
+    if maximo_bytes is None:
+        maximo_bytes = TAMANIO_MAXIMO_MB * 1024 * 1024
+
+    archivos = _listar_qr()
+    total = sum(tamanio for _, _, tamanio in archivos)
+    borrados = 0
+    for ruta, _, tamanio in sorted(archivos, key=lambda a: a[1]):
+        if total <= maximo_bytes:
+            break
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        total -= tamanio
+        borrados += 1
+
+    if borrados:
+        logging.info(f"Cache de QR: se borraron {borrados} QR usados hace más tiempo ({total / 1024 / 1024:.1f} MB ocupados)")
+    return total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Muestra el tamaño del directorio de QR generados y lo poda")
+    parser.add_argument('--directorio', default=QR_DIR, help="Carpeta de QR generados.")
+    parser.add_argument('--maximo-mb', type=int, default=TAMANIO_MAXIMO_MB,
+                        help="Tamaño máximo; se borran los QR usados hace más tiempo.")
+    args = parser.parse_args()
+
+    QR_DIR = os.path.abspath(args.directorio)
+    archivos = _listar_qr()
+    print(f"QR guardados: {len(archivos)} | {sum(a[2] for a in archivos) / 1024 / 1024:.1f} MB")
+    total = podar_cache(args.maximo_mb * 1024 * 1024)
+    print(f"Después de podar: {total / 1024 / 1024:.1f} MB")
@@ -1,11 +1,6 @@
 import qrcode
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
-
-
-import qrcode
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
+from PIL import Image, ImageDraw
+from maquetado_texto import ajustar_tamanio
 
 
 def generar_certificado(dni, apellido, nombre_charla, template_path, output_path,
@@ -16,50 +11,34 @@ def generar_certificado(dni, apellido, nombre_charla, template_path, output_path
     qr_data = f"{dni}-{apellido}"
     qr_img = qrcode.make(qr_data)
     qr_img = qr_img.resize((600, 600))  # tamaño del QR
-    
+
     # Cargar template
     template = Image.open(template_path).convert("RGB")
     # Obtener dimensiones del template
     template_width, template_height = template.size
     # Ajustar posición del QR si es necesario
     qr_position = (template_width // 2 - qr_img.size[0] // 2, (template_height - qr_img.size[1])//2+100)
-    
+
     # Pegar QR en el template
     template.paste(qr_img, qr_position)
 
-    # Preparar fuente y dibujo
+    # Preparar dibujo
     draw = ImageDraw.Draw(template)
-    font = ImageFont.truetype(font_path, font_size)
 
-    # Ajustar texto al tamaño de caja
-    max_width, max_height = text_box_size
+    # Caja del texto
+    text_box = {
+        "x": text_position[0],
+        "y": text_position[1],
+        "width": text_box_size[0],
+        "height": text_box_size[1],
+    }
 
-
-    # Probar tamaños de fuente desde grande a menor hasta que entre
+    # Mayor tamaño de fuente (de 60 a 10) con el que el texto entra en la caja
     max_font_size = 60
     min_font_size = 10
-    final_font = None
-    final_lines = []
-
-    for font_size in range(max_font_size, min_font_size - 1, -1):
-        font = ImageFont.truetype(font_path, font_size)
-        lines = textwrap.wrap(nombre_charla, width=40)
-
-        # Medir si cada línea entra en ancho, y el total en alto
-        fits = True
-        total_height = 0
-        for line in lines:
-            bbox = draw.textbbox((0, 0), line, font=font)
-            line_width = bbox[2] - bbox[0]
-            line_height = bbox[3] - bbox[1]
-            if line_width > text_box["width"]:
-                fits = False
-                break
-            total_height += line_height + 5
-        if fits and total_height <= text_box["height"]:
-            final_font = font
-            final_lines = lines
-            break
+    final_lines, final_font, total_height = ajustar_tamanio(
+        nombre_charla, font_path, text_box["width"], text_box["height"], max_font_size, min_font_size
+    )
 
     # Dibujar el texto centrado verticalmente
     if final_font:
@@ -71,17 +50,17 @@ def generar_certificado(dni, apellido, nombre_charla, template_path, output_path
             draw.text((x, y), line, font=final_font, fill="black")
             y += bbox[3] - bbox[1] + 5
 
-     # Guardar imagen final
+    # Guardar imagen final
     template.save(output_path)
 
 
-
-generar_certificado(
-    dni="12345678",
-    apellido="Pérez",
-    nombre_charla="Introducción a la Ingeniería Civil: desafíos del siglo XXI",
-    template_path="template.png",
-    output_path="cert_final.png",
-    # Ajustalo según tu sistema
-    font_path="C:/Users/Usuario/Desktop/GitHub/cneisi/src/static/fonts/Planc_wfx/Planc-SemiBold.otf",
-)
+if __name__ == '__main__':
+    generar_certificado(
+        dni="12345678",
+        apellido="Pérez",
+        nombre_charla="Introducción a la Ingeniería Civil: desafíos del siglo XXI",
+        template_path="template.png",
+        output_path="cert_final.png",
+        # Ajustalo según tu sistema
+        font_path="C:/Users/Usuario/Desktop/GitHub/cneisi/src/static/fonts/Planc_wfx/Planc-SemiBold.otf",
+    )
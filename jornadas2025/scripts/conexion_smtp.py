@@ -0,0 +1,228 @@
+import os
+import time
+import random
+import logging
+import smtplib
+import threading
+from datetime import date
+from dotenv import load_dotenv
+from metricas import metricas
+
+load_dotenv()
+
+# Configuración del servidor (puede sobrescribirse desde el .env, por ejemplo para un servidor local de prueba)
+SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.office365.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', 587))
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', '1') != '0'  # '0' para servidores locales de prueba sin TLS
+
+# Cupos del proveedor (Office 365: 30 mensajes por minuto y 10.000 destinatarios por día)
+LIMITE_POR_MINUTO = int(os.getenv('SMTP_LIMITE_POR_MINUTO', 30))
+LIMITE_POR_DIA = int(os.getenv('SMTP_LIMITE_POR_DIA', 10000))
+
+# Segundos de inactividad tras los cuales se verifica la sesión con un NOOP antes de enviar
+INTERVALO_NOOP = 30
+
+# Reintentos ante respuestas 4xx de throttling y espera inicial (se duplica en cada intento)
+REINTENTOS_THROTTLING = 4
+ESPERA_THROTTLING = 15
+
+
+class CupoDiarioAgotado(Exception):
+    """Se alcanzó el cupo diario de envíos del proveedor."""
+
+
+class LimitadorEnvios:
+    """
+    Token bucket compartido entre todas las conexiones para respetar
+    los cupos por minuto y por día del proveedor. Al cupo diario solo
+    cuentan los mensajes que el servidor aceptó (ver devolver_envio).
+
+    El día es el del calendario. Con 'registro' (RegistroEnvios) el conteo del día arranca
+    con los envíos exitosos que ya tiene el registro (ejecuciones anteriores y otros scripts);
+    sin registro arranca en cero.
+    """
+
+    def __init__(self, por_minuto=LIMITE_POR_MINUTO, por_dia=LIMITE_POR_DIA, registro=None):
+        self.por_minuto = por_minuto
+        self.por_dia = por_dia
+        self.registro = registro
+        self.tokens = float(por_minuto)
+        self.ultima_recarga = time.monotonic()
+        self.pausado_hasta = 0.0
+        self.dia = date.today()
+        self.enviados_hoy = self._enviados_registrados(self.dia)
+        self.lock = threading.Lock()
+
+    def _enviados_registrados(self, dia):
+        if self.registro is None:
+            return 0
+        enviados = self.registro.enviados_en_el_dia(dia)
+        if enviados:
+            logging.info(f"Cupo diario: {enviados} envios ya registrados el {dia.isoformat()}")
+        return enviados
+
+    def _recargar(self, ahora):
+        transcurrido = ahora - self.ultima_recarga
+        self.tokens = min(self.por_minuto, self.tokens + transcurrido * self.por_minuto / 60)
+        self.ultima_recarga = ahora
+
+        hoy = date.today()
+        if hoy != self.dia:
+            self.dia = hoy
+            self.enviados_hoy = self._enviados_registrados(hoy)
+
+    def esperar_turno(self):
+        """
+        Bloquea hasta que haya un token disponible y reserva un envío del cupo diario.
+        Lanza CupoDiarioAgotado si ya se alcanzó el cupo diario.
+        """
+        while True:
+            with self.lock:
+                ahora = time.monotonic()
+                self._recargar(ahora)
+
+                if self.enviados_hoy >= self.por_dia:
+                    raise CupoDiarioAgotado(f"Se alcanzo el cupo diario de {self.por_dia} envios")
+
+                if ahora >= self.pausado_hasta and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.enviados_hoy += 1
+                    return
+
+                espera = max(self.pausado_hasta - ahora, (1 - self.tokens) * 60 / self.por_minuto)
+            time.sleep(espera)
+
+    def devolver_envio(self):
+        """
+        Devuelve al cupo diario el envío reservado por esperar_turno cuando el servidor no
+        aceptó el mensaje (throttling 4xx, desconexión o error): los reintentos no gastan cupo.
+        """
+        with self.lock:
+            self.enviados_hoy = max(0, self.enviados_hoy - 1)
+
+    def frenar(self, segundos):
+        """Pausa los envíos de todas las conexiones durante 'segundos'."""
+        with self.lock:
+            self.pausado_hasta = max(self.pausado_hasta, time.monotonic() + segundos)
+            self.tokens = 0
+
+
+def es_throttling(error):
+    """Indica si el error es una respuesta temporal 4xx del servidor."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codigos = [codigo for codigo, _ in error.recipients.values()]
+        return bool(codigos) and all(400 <= codigo < 500 for codigo in codigos)
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return False
+
+
+class ConexionSMTP:
+    """
+    Mantiene viva una sesión SMTP autenticada y la reutiliza entre envíos.
+    Solo reconecta cuando el servidor cierra la sesión, verifica con NOOP
+    las sesiones inactivas y se frena ante respuestas 4xx de throttling.
+    """
+
+    def __init__(self, usuario, password, limitador=None, servidor=SMTP_SERVER, puerto=SMTP_PORT,
+                 starttls=SMTP_STARTTLS):
+        self.usuario = usuario
+        self.password = password
+        self.limitador = limitador or LimitadorEnvios()
+        self.servidor = servidor
+        self.puerto = puerto
+        self.starttls = starttls
+        self.smtp = None
+        self.ultimo_uso = 0.0
+
+    def conectar(self):
+        """Abre la conexión con TLS y autenticación. Sin contraseña no se autentica."""
+        self.cerrar()
+        logging.info("Estableciendo conexion SMTP...")
+        with metricas.medir('reconexion'):
+            smtp = smtplib.SMTP(self.servidor, self.puerto)
+            if self.starttls:
+                smtp.starttls()
+            if self.password:
+                smtp.login(self.usuario, self.password)
+        self.smtp = smtp
+        self.ultimo_uso = time.monotonic()
+
+    def _verificar_sesion(self):
+        """Reconecta si no hay sesión o si una sesión inactiva no responde al NOOP."""
+        if self.smtp is None:
+            self.conectar()
+            return
+
+        if time.monotonic() - self.ultimo_uso < INTERVALO_NOOP:
+            return
+
+        try:
+            codigo, _ = self.smtp.noop()
+            if codigo == 250:
+                return
+        except (smtplib.SMTPException, OSError):
+            pass
+        logging.info("La sesion SMTP no responde, reconectando...")
+        self.conectar()
+
+    def enviar(self, msg, from_addr=None, to_addrs=None):
+        """
+        Envía un mensaje respetando el limitador.
+        'msg' puede ser un objeto Message o los bytes de un mensaje ya armado
+        (en ese caso 'from_addr' y 'to_addrs' son obligatorios).
+        """
+        espera = ESPERA_THROTTLING
+        reconectado = False
+        intento = 0
+
+        while True:
+            self.limitador.esperar_turno()
+            aceptado = False
+            try:
+                self._verificar_sesion()
+                with metricas.medir('smtp'):
+                    if isinstance(msg, (bytes, str)):
+                        self.smtp.sendmail(from_addr, to_addrs, msg)
+                    else:
+                        self.smtp.send_message(msg, from_addr, to_addrs)
+                aceptado = True
+                self.ultimo_uso = time.monotonic()
+                return
+            except smtplib.SMTPServerDisconnected:
+                # El servidor cerró la sesión: se reconecta una sola vez por mensaje
+                self._descartar_sesion()
+                if reconectado:
+                    raise
+                reconectado = True
+            except smtplib.SMTPException as e:
+                if isinstance(e, smtplib.SMTPResponseException) and e.smtp_code == 421:
+                    # 421 implica que el servidor cierra el canal
+                    self._descartar_sesion()
+                if not es_throttling(e) or intento >= REINTENTOS_THROTTLING:
+                    raise
+                intento += 1
+                pausa = espera + random.uniform(0, espera / 2)
+                logging.warning(f"Throttling del servidor ({e}), pausando {pausa:.0f} segundos")
+                self.limitador.frenar(pausa)
+                espera *= 2
+            finally:
+                if not aceptado:
+                    self.limitador.devolver_envio()
+
+    def _descartar_sesion(self):
+        """Cierra el socket de una sesión que el servidor ya dio por terminada (sin QUIT)."""
+        if self.smtp is not None:
+            try:
+                self.smtp.close()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.smtp = None
+
+    def cerrar(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.smtp = None
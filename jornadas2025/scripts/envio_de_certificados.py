@@ -1,24 +1,27 @@
 import os
 import json
 import logging
-import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
-from jinja2 import Template
+from plantillas import renderizar
 from dotenv import load_dotenv
-import re
 from email.header import Header
 from email.utils import formataddr
+from conexion_smtp import ConexionSMTP, LimitadorEnvios
+from registro_envios import RegistroEnvios
+from pool_envio import enviar_en_paralelo, enviar_mensaje
+from reintentos import PlanificadorReintentos
+from spool import construir_spool, entregar_spool
+from metricas import metricas
+import argparse
 
 # --- Configuración inicial ---
 load_dotenv()
 
 REINTENTAR_TODOS = False  # Cambiar a True para reenviar a todos, incluso a los exitosos
 
-SMTP_SERVER = 'smtp.office365.com'
-SMTP_PORT = 587
 EMAIL_SENDER = os.getenv('EMAIL_SENDER')
 EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')
 EMAIL_ALIAS = os.getenv('EMAIL_ALIAS')
@@ -27,10 +30,8 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 CERTIFICADOS_DIR = os.path.join(BASE_DIR, 'certificados')
 MAP_FILE = os.path.join(CERTIFICADOS_DIR, 'certificados_a_enviar.json')
 
-# --- Template HTML ---
-template_path = os.path.join(os.path.dirname(__file__), 'template-certificados.html')
-with open(template_path, encoding='utf-8') as f:
-    HTML_TEMPLATE = f.read()
+# --- Template HTML (se compila una sola vez en plantillas.py) ---
+TEMPLATE_CORREO = 'template-certificados.html'
 
 # --- Logging ---
 logs_dir = os.path.join(os.path.dirname(__file__), 'logs')
@@ -40,78 +41,63 @@ log_path = os.path.join(logs_dir, 'enviar-certificados.log')
 logging.basicConfig(
     filename=log_path,
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    encoding='utf-8',
 )
 
-# --- Funciones ---
-
-def obtener_registros_log():
-    exitosos = set()
-    fallidos = set()
-    if os.path.exists(log_path):
-        try:
-            with open(log_path, 'r', encoding='latin-1') as f:
-                for linea in f:
-                    # Captura destinatario, nombre y subcarpeta en el log
-                    match_ok = re.search(r'Correo enviado a (.+?) \((.+?)\) \[subcarpeta: (.+?)\]', linea)
-                    match_error = re.search(r'Error al enviar correo a (.+?) \((.+?)\) \[subcarpeta: (.+?)\]', linea)
-                    if match_ok:
-                        clave = (match_ok.group(1), match_ok.group(2), match_ok.group(3))
-                        fallidos.discard(clave)
-                        exitosos.add(clave)
-                    elif match_error:
-                        clave = (match_error.group(1), match_error.group(2), match_error.group(3))
-                        fallidos.add(clave)
-        except Exception as e:
-            # Captura si hay un problema al abrir o leer el log por alguna otra razón
-            logging.error(f"Error al leer el archivo de log '{log_path}': {e}")
-    return exitosos, fallidos
-
-def enviar_certificado(destinatario, nombre, subcarpeta, pdf_path, smtp):
-    try:
-        msg = MIMEMultipart()
-        msg['Subject'] = "Certificado de asistencia y encuesta - Jornadas de Formación Profesional"
-        msg['From'] = formataddr((str(Header(EMAIL_ALIAS, 'utf-8')), EMAIL_SENDER))
-        msg['To'] = destinatario
-        msg['Reply-To'] = EMAIL_SENDER
-
-        # Cuerpo HTML
-        template = Template(HTML_TEMPLATE)
-        html_content = template.render(nombre=nombre)
-        msg.attach(MIMEText(html_content, 'html'))
-
-        # Adjuntar PDF
-        with open(pdf_path, 'rb') as f:
-            part = MIMEBase('application', 'pdf')
-            part.set_payload(f.read())
-            encoders.encode_base64(part)
-            part.add_header(
-                'Content-Disposition',
-                f'attachment; filename="{os.path.basename(pdf_path)}"'
-            )
-            msg.attach(part)
-
-        smtp.send_message(msg)
-        logging.info(f"Correo enviado a {destinatario} ({nombre}) [subcarpeta: {subcarpeta}]")
-        return True
-    except Exception as e:
-        logging.error(f"Error al enviar correo a {destinatario} ({nombre}) [subcarpeta: {subcarpeta}]: {e}")
-        return False
+# Registro indexado de envíos (reemplaza la lectura del log para reanudar envíos)
+registro = RegistroEnvios('certificados')
 
-def recorrer_y_enviar():
-    if not os.path.exists(MAP_FILE):
-        logging.error(f"No se encontro el archivo de mapeo: {MAP_FILE}")
-        return
+# Reintentos en la misma ejecución; los fallos definitivos van a fallidos/certificados/
+reintentos = PlanificadorReintentos('certificados')
 
-    with open(MAP_FILE, encoding='utf-8') as f: 
-        certificados = json.load(f)
-
-    envios_ok, envios_fallidos = obtener_registros_log()
-
-    smtp = None
-    intentos = 0
-    max_por_conexion = 10
+# --- Funciones ---
 
+def clave_certificado(subcarpeta, nombre):
+    """Clave del registro para un certificado: subcarpeta del día y nombre del asistente."""
+    return f"{subcarpeta}/{nombre}"
+
+def contexto_tarea(tarea):
+    """Variables de TEMPLATE_CORREO para una tarea (la usa el spool para renderizar de a lotes)."""
+    return {'nombre': tarea['nombre']}
+
+def armar_certificado(destinatario, nombre, pdf_path, html_content=None):
+    """Arma el correo con el certificado en PDF adjunto ('html_content': cuerpo ya renderizado, opcional)."""
+    msg = MIMEMultipart()
+    msg['Subject'] = "Certificado de asistencia y encuesta - Jornadas de Formación Profesional"
+    msg['From'] = formataddr((str(Header(EMAIL_ALIAS, 'utf-8')), EMAIL_SENDER))
+    msg['To'] = destinatario
+    msg['Reply-To'] = EMAIL_SENDER
+
+    # Cuerpo HTML
+    if html_content is None:
+        html_content = renderizar(TEMPLATE_CORREO, nombre=nombre)
+    msg.attach(MIMEText(html_content, 'html'))
+
+    # Adjuntar PDF
+    with open(pdf_path, 'rb') as f:
+        part = MIMEBase('application', 'pdf')
+        part.set_payload(f.read())
+        encoders.encode_base64(part)
+        part.add_header(
+            'Content-Disposition',
+            f'attachment; filename="{os.path.basename(pdf_path)}"'
+        )
+        msg.attach(part)
+
+    return msg
+
+def enviar_tarea(tarea, smtp):
+    """Arma y envía el certificado de una tarea (los fallos se reintentan o van a fallidos/certificados/)."""
+    return enviar_mensaje(tarea, smtp, construir_mensaje, registro, reintentos)
+
+def construir_mensaje(tarea):
+    """Arma el mensaje de una tarea (envío directo o fase "construir" del spool)."""
+    return EMAIL_SENDER, armar_certificado(tarea['destinatario'], tarea['nombre'], tarea['pdf_path'],
+                                         tarea.get('cuerpo_html'))
+
+def obtener_pendientes(certificados):
+    """Genera las tareas de los certificados que todavía no se enviaron con éxito."""
     for entry in certificados:
         email = entry['correo_destinatario']
         nombre = entry['nombre_completo']
@@ -123,34 +109,86 @@ def recorrer_y_enviar():
             logging.error(f"Certificado no encontrado para {nombre}: {pdf_path}")
             continue
 
-        clave = (email, nombre, subcarpeta)
-
+        clave = clave_certificado(subcarpeta, nombre)
         if not REINTENTAR_TODOS:
-            if clave in envios_ok:
+            if registro.ya_enviado(email, clave):
+                metricas.contar('salteados')
                 continue
-            # No se saltea si está en fallidos o no está en ninguno (para intentar enviar)
-        
-        if smtp is None:
-            try:
-                smtp = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-                smtp.starttls()
-                smtp.login(EMAIL_SENDER, EMAIL_PASSWORD)
-                logging.info("Conexion SMTP establecida.")
-            except Exception as e:
-                logging.error(f"Fallo al conectar al servidor SMTP: {e}")
-                return
-
-        if enviar_certificado(email, nombre, subcarpeta, pdf_path, smtp):
-            intentos += 1
-
-        if intentos >= max_por_conexion:
-            smtp.quit()
-            smtp = None
-            intentos = 0
-
-    if smtp:
-        smtp.quit()
+            # No se saltea si falló o si nunca se intentó enviar
+
+        yield {
+            'destinatario': email,
+            'nombre': nombre,
+            'subcarpeta': subcarpeta,
+            'pdf_path': pdf_path,
+            # Datos usados por el spool y el registro
+            'clave': clave,
+            'descripcion': f"({nombre}) [subcarpeta: {subcarpeta}]",
+        }
+
+def recorrer_y_enviar(modo='directo'):
+    """
+    Envía los certificados pendientes.
+
+    Modos:
+        directo: arma y envía cada correo en el mismo paso.
+        construir: solo arma los correos pendientes en el spool, usando todos los núcleos.
+        entregar: envía los correos del spool sin volver a armarlos.
+    """
+    # Migra (una sola vez) el historial del log de texto de versiones anteriores
+    registro.importar_log(
+        log_path,
+        r'Correo enviado a (.+?) \((.+?)\) \[subcarpeta: (.+?)\]',
+        r'Error al enviar correo a (.+?) \((.+?)\) \[subcarpeta: (.+?)\]',
+        lambda match: (match.group(1), clave_certificado(match.group(3), match.group(2))),
+    )
+
+    # Cupo del proveedor compartido por todas las conexiones; el del día arranca con lo ya registrado
+    limitador = LimitadorEnvios(registro=registro)
+
+    if modo == 'entregar':
+        entregar_spool('certificados', lambda: ConexionSMTP(EMAIL_SENDER, EMAIL_PASSWORD, limitador), registro,
+                       reintentar_todos=REINTENTAR_TODOS, reintentos=reintentos)
+        return
+
+    if not os.path.exists(MAP_FILE):
+        logging.error(f"No se encontro el archivo de mapeo: {MAP_FILE}")
+        return
+
+    with open(MAP_FILE, encoding='utf-8') as f: 
+        certificados = json.load(f)
+
+    if modo == 'construir':
+        total = construir_spool('certificados', obtener_pendientes(certificados), construir_mensaje,
+                                plantilla=(TEMPLATE_CORREO, contexto_tarea))
+        logging.info(f"Spool construido: {total} certificados listos para entregar")
+        return
+
+    # La sesión se mantiene abierta durante todo el envío y solo se reconecta si el servidor la cierra
+    smtp = ConexionSMTP(EMAIL_SENDER, EMAIL_PASSWORD, limitador)
+    try:
+        smtp.conectar()
+        logging.info("Conexion SMTP establecida.")
+    except Exception as e:
+        logging.error(f"Fallo al conectar al servidor SMTP: {e}")
+        return
+
+    # Un solo worker: los reintentos programados vuelven a la misma cola
+    enviar_en_paralelo(obtener_pendientes(certificados), enviar_tarea, lambda: smtp,
+                       cantidad_conexiones=1, reintentos=reintentos)
 
 # --- Main ---
 if __name__ == '__main__':
-    recorrer_y_enviar()
+    parser = argparse.ArgumentParser(description="Envío de certificados UTN FRLP")
+    parser.add_argument('--modo', choices=['directo', 'construir', 'entregar'], default='directo',
+                        help="directo: arma y envía; construir: arma los correos en el spool; entregar: envía el spool.")
+    parser.add_argument('--metricas', metavar='ARCHIVO',
+                        help="Escribe métricas en formato Prometheus (textfile) en ARCHIVO.")
+    parser.add_argument('--progreso', action='store_true', help="Muestra el progreso y el ETA en la terminal.")
+    args = parser.parse_args()
+
+    metricas.configurar('certificados', archivo=args.metricas, progreso=args.progreso)
+    try:
+        recorrer_y_enviar(modo=args.modo)
+    finally:
+        metricas.finalizar()
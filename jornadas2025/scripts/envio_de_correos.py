@@ -1,35 +1,39 @@
 import os
 import pandas as pd
-import smtplib
 import logging
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.image import MIMEImage
 from dotenv import load_dotenv
-from jinja2 import Template
-from generar_qr_asistencia import generar_qr_asistencia
-import csv
-from email.mime.base import MIMEBase
-from email import encoders
-import re
+from plantillas import renderizar
+from generar_qr_asistencia import generar_qr_asistencia_bytes, armar_info_qr, FORMATOS
+import generar_qr_asistencia
+import argparse
+from pool_envio import enviar_en_paralelo, enviar_mensaje
+from conexion_smtp import ConexionSMTP, LimitadorEnvios
+from registro_envios import RegistroEnvios
+from reintentos import PlanificadorReintentos
+from spool import construir_spool, entregar_spool
+from metricas import metricas
+from referencias import referencias
+from indice_inscripciones import inscripciones
 
 load_dotenv()
 
 REINTENTAR_TODOS = False  # Cambiar a True para reenviar a todos, incluso a los exitosos // util para reenvio sin sin tener que eliminar el logs
 
 
-SMTP_SERVER = 'smtp.office365.com'
-SMTP_PORT = 587
 EMAIL_SENDER = os.getenv('EMAIL_SENDER')
 EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')
 EMAIL_ALIAS = os.getenv('EMAIL_SENDER')
 
-# Ruta al template
-template_path = os.path.join(os.path.dirname(__file__), 'template.html')
+# Cantidad de conexiones SMTP simultáneas (cada una con su propio worker)
+CONEXIONES_SMTP = int(os.getenv('CONEXIONES_SMTP', 4))
 
-# Lee el contenido del archivo HTML una sola vez
-with open(template_path, 'r', encoding='utf-8') as f:
-    HTML_TEMPLATE = f.read()
+# Template del cuerpo del correo (se compila una sola vez en plantillas.py)
+TEMPLATE_CORREO = 'template.html'
+# Template del modo resumen (un correo por persona con todas sus charlas)
+TEMPLATE_RESUMEN = 'template-resumen.html'
 
 # Configuración de logging
 log_dir = os.path.join(os.path.dirname(__file__), 'logs')
@@ -42,228 +46,286 @@ logging.basicConfig(
     filename=log_file_path,
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
+    encoding='utf-8',
 )
 
-# Directorio base donde están los departamentos
-BASE_DIR = os.path.join(os.path.dirname(__file__), '..', 'inscripciones')
-BASE_DIR = os.path.abspath(BASE_DIR)
+# Registro indexado de envíos (reemplaza la lectura del log para reanudar envíos)
+registro = RegistroEnvios('qr')
 
-def transformar_codigo_charla_a_nombre_charla(codigo_charla):
-    """
-    Transforma un código de charla en el nombre legible de la charla, 
-    buscando en el archivo CSV de referencias.
-    """
-    ruta_csv = os.path.join(os.path.dirname(__file__), '..', 'inscripciones', 'tabla-de-referencias.csv')
-    try:
-        with open(ruta_csv, encoding='utf-8') as archivo:
-            lector = csv.reader(archivo, delimiter=';')
-            for fila in lector:
-                if len(fila) < 3:
-                    continue
-                codigo, nombre_charla, _ = fila
-                if codigo.strip() == codigo_charla:
-                    return nombre_charla.strip()
-    except FileNotFoundError:
-        print(f"Archivo no encontrado: {ruta_csv}")
-    except Exception as e:
-        print(f"Error al leer el archivo CSV: {e}")
-    return codigo_charla
-
-
-def obtener_aula_por_codigo_charla(codigo_charla):
+# Reintentos en la misma ejecución; los fallos definitivos van a fallidos/qr/
+reintentos = PlanificadorReintentos('qr')
+
+def adjuntar_qr(msg, qr, formato, nombre_archivo):
+    """Adjunta la imagen del QR con su tipo MIME (image/png, image/jpeg, image/webp)."""
+    datos_formato = FORMATOS[formato]
+    adjunto = MIMEImage(qr, _subtype=datos_formato['mime'])
+    adjunto.add_header(
+        'Content-Disposition',
+        f'attachment; filename="{nombre_archivo}.{datos_formato["extension"]}"'
+    )
+    msg.attach(adjunto)
+
+
+def contexto_correo(nombre, charla):
+    """Variables de TEMPLATE_CORREO para una charla."""
+    return {'nombre': nombre, 'charla': referencias.nombre(charla), 'aula': referencias.aula(charla)}
+
+
+def contexto_resumen(nombre, charlas):
+    """Variables de TEMPLATE_RESUMEN para una lista de códigos de charla."""
+    return {
+        'nombre': nombre,
+        'charlas': [{'nombre': referencias.nombre(charla), 'aula': referencias.aula(charla)} for charla in charlas],
+    }
+
+
+def contexto_tarea(tarea):
+    """Variables del template de una tarea (la usa el spool para renderizar los cuerpos de a lotes)."""
+    if 'inscripciones' in tarea:
+        return contexto_resumen(tarea['nombre'], [inscripcion['charla'] for inscripcion in tarea['inscripciones']])
+    return contexto_correo(tarea['nombre'], tarea['charla'])
+
+
+def armar_correo(destinatario, nombre, qr, charla, formato='png', html_content=None):
     """
-    Dado un código de charla, retorna el aula correspondiente
-    según el archivo 'tabla-de-referencias.csv'.
+    Arma el correo con el qr de asistencia adjunto.
+
+    Args:
+        destinatario (str): Dirección de correo electrónico del destinatario.
+        nombre (str): Nombre del participante.
+        qr (bytes): Imagen del qr (ver generar_qr_asistencia_bytes).
+        charla (str): Código de la charla.
+        formato (str): Formato de la imagen (ver FORMATOS en generar_qr_asistencia).
+        html_content (str): Cuerpo ya renderizado; por defecto se renderiza TEMPLATE_CORREO.
 
     Returns:
-        str: Aula de la charla, o el código si no se encuentra.
+        MIMEMultipart: Mensaje listo para enviar.
     """
-    ruta_csv = os.path.join(os.path.dirname(__file__), '..', 'inscripciones', 'tabla-de-referencias.csv')
-    try:
-        with open(ruta_csv, encoding='utf-8') as archivo:
-            lector = csv.reader(archivo, delimiter=';')
-            for fila in lector:
-                if len(fila) < 3:
-                    continue
-                codigo, _, aula = fila
-                if codigo.strip() == codigo_charla:
-                    return aula.strip()
-    except FileNotFoundError:
-        print(f"Archivo no encontrado: {ruta_csv}")
-    except Exception as e:
-        print(f"Error al leer el archivo CSV: {e}")
-    return codigo_charla
-
-
-def obtener_emails_fallidos_desde_log(log_path):
-    """
-    Obtiene la lista de (email, charla) exitosos y fallidos del log.
-    """
-    emails_fallidos = set()
-    emails_exitosos = set()
-
-    if os.path.exists(log_path):
-        with open(log_path, 'r', encoding='latin-1') as log_file:
-            for linea in log_file:
-                match_error = re.search(r'Error al enviar correo a (.+?) para la charla (\S+)', linea)
-                if match_error:
-                    email = match_error.group(1).strip()
-                    charla = match_error.group(2).strip()
-                    emails_fallidos.add((email, charla))
-                    continue
-
-                match_ok = re.search(r'Correo enviado a (.+?) para la charla: (\S+)', linea)
-                if match_ok:
-                    email = match_ok.group(1).strip()
-                    charla = match_ok.group(2).strip()
-                    emails_exitosos.add((email, charla))
-    return emails_fallidos, emails_exitosos
-
-
-def enviar_correo(destinatario, nombre, qr_path, charla, smtp):
+    # Transformo el código de charla a nombre legible
+    charla_nombre = referencias.nombre(charla)
+
+    msg = MIMEMultipart()
+    msg['Subject'] = f"QR de asistencia: {charla_nombre}"
+    msg['From'] = EMAIL_ALIAS
+    msg['To'] = destinatario
+    msg['Reply-To'] = EMAIL_SENDER
+    msg['X-Mailer'] = 'UTN FRLP Script'
+
+    # Cuerpo del mensaje
+    if html_content is None:
+        html_content = renderizar(TEMPLATE_CORREO, **contexto_correo(nombre, charla))
+    msg.attach(MIMEText(html_content, 'html'))
+
+    # Adjunta el QR
+    adjuntar_qr(msg, qr, formato, "qr_asistencia")
+
+    return msg
+
+
+def armar_correo_resumen(destinatario, nombre, qrs, formato='png', html_content=None):
     """
-    Envía un correo electrónico con el qr de asistencia.
+    Arma un único correo con los QR de todas las charlas de una persona.
 
     Args:
         destinatario (str): Dirección de correo electrónico del destinatario.
         nombre (str): Nombre del participante.
-        qr_path (str): Ruta al archivo del qr.
-        charla (str): Nombre de la charla.
-        smtp (smtplib.SMTP): Conexión SMTP.
+        qrs (list): Lista de (codigo_charla, qr).
+        formato (str): Formato de las imágenes (ver FORMATOS en generar_qr_asistencia).
+        html_content (str): Cuerpo ya renderizado; por defecto se renderiza TEMPLATE_RESUMEN.
 
     Returns:
-        bool: True si el correo se envió correctamente, False en caso contrario.
+        MIMEMultipart: Mensaje listo para enviar.
     """
-    try:
-        # Transformo el código de charla a nombre legible
-        charla_nombre = transformar_codigo_charla_a_nombre_charla(charla)
-
-        msg = MIMEMultipart()
-        msg['Subject'] = f"QR de asistencia: {charla_nombre}"
-        msg['From'] = EMAIL_ALIAS
-        msg['To'] = destinatario
-        msg['Reply-To'] = EMAIL_SENDER
-        msg['X-Mailer'] = 'UTN FRLP Script'
-
-        # Cuerpo del mensaje
-        template = Template(HTML_TEMPLATE)
-
-        aula = obtener_aula_por_codigo_charla(charla)
-
-        html_content = template.render(nombre=nombre, charla=charla_nombre, aula=aula)
-        msg.attach(MIMEText(html_content, 'html'))
-
-        # Adjunta el QR
-        with open(qr_path, 'rb') as f:
-            adjunto = MIMEBase('application', 'octet-stream')
-            adjunto.set_payload(f.read())
-            encoders.encode_base64(adjunto)
-            adjunto.add_header(
-                'Content-Disposition',
-                f'attachment; filename="qr_asistencia.png"'
-            )
-            msg.attach(adjunto)
-
-        smtp.send_message(msg)
-        logging.info(f"Correo enviado a {destinatario} para la charla: {charla}")
-        return True
-    except Exception as e:
-        logging.error(f"Error al enviar correo a {destinatario} para la charla {charla}: {e}")
-        return False
-
-def recorrer_y_enviar():
-    k = 0
-    k_max = 10
-    smtp = None
-
-    # Obtiene emails fallidos y exitosos del log
-    emails_fallidos, emails_exitosos = obtener_emails_fallidos_desde_log(log_file_path)
-    
-    # Determina si es el primer envio (cuando no hay logs o esta vacio)
-    primer_envio = not os.path.exists(log_file_path) or os.path.getsize(log_file_path) == 0
-        
-    for departamento in os.listdir(BASE_DIR):
-        depto_path = os.path.join(BASE_DIR, departamento)
-        if not os.path.isdir(depto_path):
-            continue
+    msg = MIMEMultipart()
+    msg['Subject'] = f"QR de asistencia: {len(qrs)} charlas"
+    msg['From'] = EMAIL_ALIAS
+    msg['To'] = destinatario
+    msg['Reply-To'] = EMAIL_SENDER
+    msg['X-Mailer'] = 'UTN FRLP Script'
 
-        procesadas_path = os.path.join(depto_path, 'procesadas')
-        if not os.path.exists(procesadas_path):
-            continue
+    if html_content is None:
+        html_content = renderizar(TEMPLATE_RESUMEN, **contexto_resumen(nombre, [charla for charla, _ in qrs]))
+    msg.attach(MIMEText(html_content, 'html'))
 
-        for charla_dir in os.listdir(procesadas_path):
-            charla_path = os.path.join(procesadas_path, charla_dir)
-            if not os.path.isdir(charla_path):
-                continue
+    # Adjunta un QR por charla
+    for charla, qr in qrs:
+        adjuntar_qr(msg, qr, formato, f"qr_asistencia_{charla}")
+
+    return msg
+
+
+def enviar_tarea(tarea, smtp):
+    """
+    Genera el QR (o los QR, en modo resumen) de una tarea, arma el correo y lo envía.
+    Pensada para ejecutarse desde los workers del pool de envío; en modo resumen
+    el resultado se registra por cada (email, charla), para que los reenvíos parciales sigan funcionando.
+    """
+    return enviar_mensaje(tarea, smtp, construir_mensaje, registro, reintentos)
+
+
+def _armar_resumen_con_qrs(tarea):
+    """Genera en memoria los QR de todas las charlas de una tarea de resumen y arma el correo."""
+    formato = tarea.get('formato_qr', 'png')
+    qrs = [
+        (inscripcion['charla'], generar_qr_asistencia_bytes(inscripcion['info_qr'], inscripcion['charla'], formato))
+        for inscripcion in tarea['inscripciones']
+    ]
+    return armar_correo_resumen(tarea['destinatario'], tarea['nombre'], qrs, formato, tarea.get('cuerpo_html'))
+
+
+def construir_mensaje(tarea):
+    """
+    Arma el mensaje completo de una tarea: lo usan los workers del envío directo
+    y los procesos de la fase "construir" del spool.
+    """
+    if 'inscripciones' in tarea:
+        return EMAIL_SENDER, _armar_resumen_con_qrs(tarea)
 
-            charla = charla_dir
-            archivo_csv = f"{charla}.csv"
-            path_csv = os.path.join(charla_path, archivo_csv)
+    formato = tarea.get('formato_qr', 'png')
+    qr = generar_qr_asistencia_bytes(tarea['info_qr'], tarea['charla'], formato)
+    return EMAIL_SENDER, armar_correo(tarea['destinatario'], tarea['nombre'], qr, tarea['charla'], formato,
+                                      tarea.get('cuerpo_html'))
 
-            if not os.path.exists(path_csv):
-                logging.warning(f"No se encontro el archivo CSV esperado: {path_csv}")
+
+def obtener_tareas():
+    """
+    Recorre las inscripciones procesadas (índice global) y genera las tareas de envío pendientes.
+    """
+    # Migra (una sola vez) el historial del log de texto de versiones anteriores
+    registro.importar_log(
+        log_file_path,
+        r'Correo enviado a (.+?) para la charla: (\S+)',
+        r'Error al enviar correo a (.+?) para la charla:? (\S+)',
+        lambda match: (match.group(1).strip(), match.group(2).strip().rstrip(':')),
+    )
+
+    for charla, df in inscripciones.todas().groupby('Charla', sort=False, observed=True):
+        logging.info(f"Procesando charla: {charla} ({len(df)} participantes encontrados)")
+
+        for fila in df.to_dict('records'):
+            email = fila.get('Mail')
+            if pd.isna(email) or not email:
+                logging.warning(f"Fila sin email: {fila}")
                 continue
 
-            logging.info(f"Procesando: {path_csv} (charla: {charla})")
-
-            try:
-                df = pd.read_csv(path_csv)
-                logging.info(f"{len(df)} participantes encontrados")
-
-                for _, fila in df.iterrows():
-                    email = fila.get('Mail')
-                    if not email or pd.isna(email):
-                        logging.warning(f"Fila sin email: {fila}")
-                        continue
-
-                    # verifica: si es el primer envio, si la combinación email+charla está en fallidos, si es un nuevo mail, o si reintentar todos es true
-                    if (REINTENTAR_TODOS or
-                        primer_envio or 
-                        (email, charla) in emails_fallidos or 
-                        ((email, charla) not in emails_exitosos and (email, charla) not in emails_fallidos)):
-                        
-                        nombre = fila.get('Nombre', 'Asistente')
-                        legajo = fila.get('Legajo', '')
-                        dni = fila.get('DNI', '')
-
-                        info_qr = f"{charla};{legajo};{dni};"
-
-                        # Genera QR
-                        qr_path = generar_qr_asistencia(info_qr, charla)
-                        
-                        # Maneja conexión SMTP
-                        if smtp is None:
-                            logging.info("Estableciendo conexion SMTP...")
-                            smtp = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-                            smtp.starttls()
-                            smtp.login(EMAIL_SENDER, EMAIL_PASSWORD)
-                        
-                        # Envia correo
-                        if enviar_correo(email, nombre, qr_path, charla, smtp):
-                            k += 1
-                            os.remove(qr_path)
-
-                            if k >= k_max:
-                                logging.info(f"Reiniciando conexion despues de {k_max} correos")
-                                smtp.quit()
-                                smtp = None
-                                k = 0
-            except Exception as e:
-                logging.error(f"Error procesando {path_csv}: {e}")
-                if smtp:
-                    try:
-                        smtp.quit()
-                    except:
-                        pass
-                    smtp = None
-                    k = 0
-
-    if smtp:
-        logging.info("Cerrando conexion SMTP final")
-        try:
-            smtp.quit()
-        except:
-            pass
+            # Envía si reintentar todos es true o si la combinación email+charla no se envió con éxito
+            if REINTENTAR_TODOS or not registro.ya_enviado(email, charla):
+
+                nombre = fila.get('Nombre', 'Asistente')
+                legajo = fila.get('Legajo')
+                dni = fila.get('DNI')
+
+                yield {
+                    'destinatario': email,
+                    'nombre': nombre,
+                    'charla': charla,
+                    'info_qr': armar_info_qr(charla, '' if pd.isna(legajo) else legajo, '' if pd.isna(dni) else dni),
+                    # Viaja con la tarea para que los procesos del spool usen el mismo formato
+                    'formato_qr': generar_qr_asistencia.FORMATO_QR,
+                    # Datos usados por el spool y el registro
+                    'clave': charla,
+                    'descripcion': f"para la charla: {charla}",
+                }
+            else:
+                metricas.contar('salteados')
+
+
+def verificar_referencias():
+    """
+    Verifica, antes de enviar, que todas las charlas con inscripciones procesadas estén en la
+    tabla de referencias. Si falta alguna se corta el envío sin mandar ningún correo.
+
+    Raises:
+        CharlaDesconocida: Con los códigos que faltan.
+    """
+    codigos = inscripciones.charlas()
+    referencias.verificar(codigos)
+
+
+def agrupar_por_destinatario(tareas):
+    """
+    Agrupa las tareas pendientes por email normalizado en todo el árbol de inscripciones.
+    Las personas con una sola charla pendiente conservan la tarea individual.
+    """
+    grupos = {}
+    for tarea in tareas:
+        email = tarea['destinatario'].strip().lower()
+        grupos.setdefault(email, []).append(tarea)
+
+    for email, grupo in grupos.items():
+        if len(grupo) == 1:
+            yield grupo[0]
+            continue
+
+        charlas = [tarea['charla'] for tarea in grupo]
+        yield {
+            'destinatario': email,
+            'nombre': grupo[0]['nombre'],
+            'inscripciones': [{'charla': tarea['charla'], 'info_qr': tarea['info_qr']} for tarea in grupo],
+            'formato_qr': grupo[0]['formato_qr'],
+            # Datos usados por el spool y el registro (un registro por charla)
+            'clave': '+'.join(charlas),
+            'claves': charlas,
+            'descripcion': f"para las charlas: {', '.join(charlas)}",
+        }
+
+
+def recorrer_y_enviar(conexiones=CONEXIONES_SMTP, modo='directo', resumen=False):
+    """
+    Envía los QR pendientes repartiendo los correos entre 'conexiones' conexiones SMTP simultáneas.
+
+    Modos:
+        directo: arma y envía cada correo en el mismo paso.
+        construir: solo arma los correos pendientes en el spool, usando todos los núcleos.
+        entregar: envía los correos del spool sin volver a armarlos.
+
+    Con 'resumen' se envía un único correo por persona con los QR de todas sus charlas.
+    """
+    if modo != 'entregar':
+        verificar_referencias()
+
+    tareas = obtener_tareas()
+    if resumen:
+        tareas = agrupar_por_destinatario(tareas)
+
+    if modo == 'construir':
+        plantilla = (TEMPLATE_RESUMEN if resumen else TEMPLATE_CORREO, contexto_tarea)
+        total = construir_spool('qr', tareas, construir_mensaje, plantilla=plantilla)
+        logging.info(f"Spool construido: {total} correos listos para entregar")
+        return
+
+    # El limitador es compartido para que todas las conexiones respeten el mismo cupo
+    limitador = LimitadorEnvios(registro=registro)
+
+    def conectar():
+        return ConexionSMTP(EMAIL_SENDER, EMAIL_PASSWORD, limitador)
+
+    if modo == 'entregar':
+        total = entregar_spool('qr', conectar, registro, conexiones, reintentar_todos=REINTENTAR_TODOS,
+                               reintentos=reintentos)
+    else:
+        total = enviar_en_paralelo(tareas, enviar_tarea, conectar, cantidad_conexiones=conexiones,
+                                   reintentos=reintentos)
+    logging.info(f"Envio finalizado: {total} correos procesados con {conexiones} conexiones")
 
 if __name__ == '__main__':
-    recorrer_y_enviar()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Envío de QR de asistencia UTN FRLP")
+    parser.add_argument('--conexiones', type=int, default=CONEXIONES_SMTP, help="Cantidad de conexiones SMTP simultáneas.")
+    parser.add_argument('--modo', choices=['directo', 'construir', 'entregar'], default='directo',
+                        help="directo: arma y envía; construir: arma los correos en el spool; entregar: envía el spool.")
+    parser.add_argument('--resumen', action='store_true',
+                        help="Envía un único correo por persona con los QR de todas sus charlas.")
+    parser.add_argument('--metricas', metavar='ARCHIVO',
+                        help="Escribe métricas en formato Prometheus (textfile) en ARCHIVO.")
+    parser.add_argument('--progreso', action='store_true', help="Muestra el progreso y el ETA en la terminal.")
+    parser.add_argument('--formato-qr', choices=list(FORMATOS), default=generar_qr_asistencia.FORMATO_QR,
+                        help="Formato de la imagen adjunta (ver reporte_formatos_qr.py).")
+    args = parser.parse_args()
+
+    generar_qr_asistencia.FORMATO_QR = args.formato_qr
+
+    metricas.configurar('qr', archivo=args.metricas, progreso=args.progreso)
+    try:
+        recorrer_y_enviar(conexiones=args.conexiones, modo=args.modo, resumen=args.resumen)
+    finally:
+        metricas.finalizar()
@@ -1,27 +1,29 @@
 import os
 import pandas as pd
-import smtplib
 import logging
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from dotenv import load_dotenv
-from jinja2 import Template
-import re
+from plantillas import renderizar
+from conexion_smtp import ConexionSMTP, LimitadorEnvios
+from registro_envios import RegistroEnvios
+from pool_envio import enviar_en_paralelo, enviar_mensaje
+from reintentos import PlanificadorReintentos
+from spool import construir_spool, entregar_spool
+from metricas import metricas
+from indice_inscripciones import inscripciones
+import argparse
 
 load_dotenv()
 
 REINTENTAR_TODOS = False
 
-SMTP_SERVER = 'smtp.office365.com'
-SMTP_PORT = 587
 EMAIL_SENDER = os.getenv('EMAIL_SENDER')
 EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')
 EMAIL_ALIAS = os.getenv('EMAIL_SENDER')
 
-# Template de reprogramacion
-template_path = os.path.join(os.path.dirname(__file__), 'template2.html')
-with open(template_path, 'r', encoding='utf-8') as f:
-    HTML_TEMPLATE = f.read()
+# Template de reprogramacion (se compila una sola vez en plantillas.py)
+TEMPLATE_CORREO = 'template2.html'
 
 # Log específico para reprogramacion
 log_dir = os.path.join(os.path.dirname(__file__), 'logs')
@@ -32,127 +34,120 @@ logging.basicConfig(
     filename=log_file_path,
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
+    encoding='utf-8',
 )
 
-# Ruta especifica al directorio de inscripciones de quimica
-QUIMICA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'inscripciones', 'quimica'))
-
-def obtener_emails_fallidos_desde_log(log_path):
-    emails_fallidos = set()
-    emails_exitosos = set()
-
-    if os.path.exists(log_path):
-        with open(log_path, 'r', encoding='latin-1') as log_file:
-            for linea in log_file:
-                match_error = re.search(r'Error al enviar correo a (.+?) para la charla (\S+)', linea)
-                if match_error:
-                    email = match_error.group(1).strip()
-                    charla = match_error.group(2).strip()
-                    emails_fallidos.add((email, charla))
-                    continue
-
-                match_ok = re.search(r'Correo enviado a (.+?) para la charla: (\S+)', linea)
-                if match_ok:
-                    email = match_ok.group(1).strip()
-                    charla = match_ok.group(2).strip()
-                    emails_exitosos.add((email, charla))
-    return emails_fallidos, emails_exitosos
-
-def enviar_correo_reprogramacion(destinatario, nombre, charla, smtp):
-    try:
-        msg = MIMEMultipart()
-        msg['Subject'] = f"Aviso importante - Cambios en la asignación de aulas"
-        msg['From'] = EMAIL_ALIAS
-        msg['To'] = destinatario
-        msg['Reply-To'] = EMAIL_SENDER
-        msg['X-Mailer'] = 'UTN FRLP Script'
-
-        template = Template(HTML_TEMPLATE)
-        html_content = template.render(nombre=nombre, charla=charla)
-        msg.attach(MIMEText(html_content, 'html'))
-
-        smtp.send_message(msg)
-        logging.info(f"Correo enviado a {destinatario} para la charla: {charla}")
-        return True
-    except Exception as e:
-        logging.error(f"Error al enviar correo a {destinatario} para la charla {charla}: {e}")
-        return False
-
-def recorrer_y_enviar_reprogramacion():
-    smtp = None
-    k = 0
-    k_max = 10
-
-    emails_fallidos, emails_exitosos = obtener_emails_fallidos_desde_log(log_file_path)
-    primer_envio = not os.path.exists(log_file_path) or os.path.getsize(log_file_path) == 0
-
-    procesadas_path = os.path.join(QUIMICA_DIR, 'procesadas')
-    if not os.path.exists(procesadas_path):
-        logging.warning(f"No existe la carpeta 'procesadas' en quimica: {procesadas_path}")
+# Registro indexado de envíos (reemplaza la lectura del log para reanudar envíos)
+registro = RegistroEnvios('reprogramacion')
+
+# Reintentos en la misma ejecución; los fallos definitivos van a fallidos/reprogramacion/
+reintentos = PlanificadorReintentos('reprogramacion')
+
+# Departamento cuyas charlas se reprogramaron
+DEPARTAMENTO = 'quimica'
+
+def contexto_tarea(tarea):
+    """Variables de TEMPLATE_CORREO para una tarea (la usa el spool para renderizar de a lotes)."""
+    return {'nombre': tarea['nombre'], 'charla': tarea['charla']}
+
+def armar_correo_reprogramacion(destinatario, nombre, charla, html_content=None):
+    msg = MIMEMultipart()
+    msg['Subject'] = f"Aviso importante - Cambios en la asignación de aulas"
+    msg['From'] = EMAIL_ALIAS
+    msg['To'] = destinatario
+    msg['Reply-To'] = EMAIL_SENDER
+    msg['X-Mailer'] = 'UTN FRLP Script'
+
+    if html_content is None:
+        html_content = renderizar(TEMPLATE_CORREO, nombre=nombre, charla=charla)
+    msg.attach(MIMEText(html_content, 'html'))
+    return msg
+
+def enviar_tarea(tarea, smtp):
+    """Arma y envía el aviso de una tarea (los fallos se reintentan o van a fallidos/reprogramacion/)."""
+    return enviar_mensaje(tarea, smtp, construir_mensaje, registro, reintentos)
+
+def construir_mensaje(tarea):
+    """Arma el mensaje de una tarea (envío directo o fase "construir" del spool)."""
+    return EMAIL_SENDER, armar_correo_reprogramacion(tarea['destinatario'], tarea['nombre'], tarea['charla'],
+                                                     tarea.get('cuerpo_html'))
+
+def obtener_tareas():
+    """Recorre las inscripciones procesadas de quimica (índice global) y genera los envíos pendientes."""
+    df_departamento = inscripciones.todas(DEPARTAMENTO)
+    if df_departamento.empty:
+        logging.warning(f"No hay inscripciones procesadas en {DEPARTAMENTO}")
+        return
+
+    for charla, df in df_departamento.groupby('Charla', sort=False, observed=True):
+        logging.info(f"Procesando charla: {charla} ({len(df)} participantes encontrados)")
+
+        for fila in df.to_dict('records'):
+            email = fila.get('Mail')
+            if pd.isna(email) or not email:
+                logging.warning(f"Fila sin email: {fila}")
+                continue
+
+            if REINTENTAR_TODOS or not registro.ya_enviado(email, charla):
+                yield {
+                    'destinatario': email,
+                    'nombre': fila.get('Nombre', 'Asistente'),
+                    'charla': charla,
+                    # Datos usados por el spool y el registro
+                    'clave': charla,
+                    'descripcion': f"para la charla: {charla}",
+                }
+            else:
+                metricas.contar('salteados')
+
+def recorrer_y_enviar_reprogramacion(modo='directo'):
+    """
+    Envía el aviso de reprogramación a los inscriptos de quimica.
+
+    Modos:
+        directo: arma y envía cada correo en el mismo paso.
+        construir: solo arma los correos pendientes en el spool, usando todos los núcleos.
+        entregar: envía los correos del spool sin volver a armarlos.
+    """
+    # Migra (una sola vez) el historial del log de texto de versiones anteriores
+    registro.importar_log(
+        log_file_path,
+        r'Correo enviado a (.+?) para la charla: (\S+)',
+        r'Error al enviar correo a (.+?) para la charla:? (\S+)',
+        lambda match: (match.group(1).strip(), match.group(2).strip().rstrip(':')),
+    )
+
+    if modo == 'construir':
+        total = construir_spool('reprogramacion', obtener_tareas(), construir_mensaje,
+                                plantilla=(TEMPLATE_CORREO, contexto_tarea))
+        logging.info(f"Spool construido: {total} correos listos para entregar")
+        return
+
+    # Cupo del proveedor compartido por todas las conexiones; el del día arranca con lo ya registrado
+    limitador = LimitadorEnvios(registro=registro)
+
+    if modo == 'entregar':
+        entregar_spool('reprogramacion', lambda: ConexionSMTP(EMAIL_SENDER, EMAIL_PASSWORD, limitador), registro,
+                       reintentar_todos=REINTENTAR_TODOS, reintentos=reintentos)
         return
 
-    for charla_dir in os.listdir(procesadas_path):
-        charla_path = os.path.join(procesadas_path, charla_dir)
-        if not os.path.isdir(charla_path):
-            continue
-
-        charla = charla_dir
-        archivo_csv = f"{charla}.csv"
-        path_csv = os.path.join(charla_path, archivo_csv)
-
-        if not os.path.exists(path_csv):
-            logging.warning(f"No se encontro el archivo CSV esperado: {path_csv}")
-            continue
-
-        logging.info(f"Procesando: {path_csv} (charla: {charla})")
-
-        try:
-            df = pd.read_csv(path_csv)
-            logging.info(f"{len(df)} participantes encontrados")
-
-            for _, fila in df.iterrows():
-                email = fila.get('Mail')
-                if not email or pd.isna(email):
-                    logging.warning(f"Fila sin email: {fila}")
-                    continue
-
-                if (REINTENTAR_TODOS or
-                    primer_envio or 
-                    (email, charla) in emails_fallidos or 
-                    ((email, charla) not in emails_exitosos and (email, charla) not in emails_fallidos)):
-                    
-                    nombre = fila.get('Nombre', 'Asistente')
-
-                    if smtp is None:
-                        logging.info("Estableciendo conexion SMTP...")
-                        smtp = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-                        smtp.starttls()
-                        smtp.login(EMAIL_SENDER, EMAIL_PASSWORD)
-
-                    if enviar_correo_reprogramacion(email, nombre, charla, smtp):
-                        k += 1
-                        if k >= k_max:
-                            logging.info(f"Reiniciando conexion despues de {k_max} correos")
-                            smtp.quit()
-                            smtp = None
-                            k = 0
-
-        except Exception as e:
-            logging.error(f"Error procesando {path_csv}: {e}")
-            if smtp:
-                try:
-                    smtp.quit()
-                except:
-                    pass
-                smtp = None
-                k = 0
-
-    if smtp:
-        logging.info("Cerrando conexion SMTP final")
-        try:
-            smtp.quit()
-        except:
-            pass
+    # La sesión se mantiene abierta durante todo el envío y solo se reconecta si el servidor la cierra
+    smtp = ConexionSMTP(EMAIL_SENDER, EMAIL_PASSWORD, limitador)
+
+    # Un solo worker: los reintentos programados vuelven a la misma cola
+    enviar_en_paralelo(obtener_tareas(), enviar_tarea, lambda: smtp, cantidad_conexiones=1, reintentos=reintentos)
 
 if __name__ == '__main__':
-    recorrer_y_enviar_reprogramacion()
+    parser = argparse.ArgumentParser(description="Envío de avisos de reprogramación UTN FRLP")
+    parser.add_argument('--modo', choices=['directo', 'construir', 'entregar'], default='directo',
+                        help="directo: arma y envía; construir: arma los correos en el spool; entregar: envía el spool.")
+    parser.add_argument('--metricas', metavar='ARCHIVO',
+                        help="Escribe métricas en formato Prometheus (textfile) en ARCHIVO.")
+    parser.add_argument('--progreso', action='store_true', help="Muestra el progreso y el ETA en la terminal.")
+    args = parser.parse_args()
+
+    metricas.configurar('reprogramacion', archivo=args.metricas, progreso=args.progreso)
+    try:
+        recorrer_y_enviar_reprogramacion(modo=args.modo)
+    finally:
+        metricas.finalizar()
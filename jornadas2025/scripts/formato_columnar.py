@@ -0,0 +1,210 @@
+import os
+import logging
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+# Copias columnares (Arrow/Feather) de los CSV limpios. El CSV sigue siendo el archivo para
+# leer y editar a mano; los scripts leen la copia columnar, que tiene los tipos fijados y se
+# abre mapeada en memoria, sin volver a parsear ni inferir tipos.
+# Se guarda sin comprimir: así las columnas se usan directamente desde el archivo mapeado.
+
+EXTENSION = '.feather'
+
+# Esquema compartido por los scripts. El DNI es entero sin signo de 64 bits (nulos permitidos;
+# limpieza.py solo acepta los que cumplen PATRON_ENTERO, así que nunca se pierde), los valores que se repiten en muchas filas (charla, departamento,
+# dominio) son categorías y el resto del texto queda en columnas respaldadas por Arrow, en lugar de
+# un objeto de Python por celda. El legajo queda como texto: no se valida y va tal cual en el QR.
+TEXTO = pa.string()
+ENTERO = pa.uint64()
+CATEGORIA = pa.dictionary(pa.int32(), pa.string())
+
+# Valores que se guardan como ENTERO: solo dígitos ASCII, hasta 18 (entran en un Int64 de pandas y
+# alcanzan para un CUIL o un documento extranjero escritos en el campo DNI)
+PATRON_ENTERO = r'[0-9]{1,18}'
+
+# Inscripciones limpias (limpieza.py): inscripciones/<depto>/procesadas/<charla>/<charla>.feather
+ESQUEMA_INSCRIPCION = pa.schema([
+    ('Apellido', TEXTO),
+    ('Nombre', TEXTO),
+    ('DNI', ENTERO),
+    ('Legajo', TEXTO),
+    ('Mail', TEXTO),
+])
+
+# Índice global de inscripciones (indice_inscripciones.py)
+ESQUEMA_INDICE = pa.schema([
+    ('Departamento', CATEGORIA),
+    ('Charla', CATEGORIA),
+    *ESQUEMA_INSCRIPCION,
+    ('Dominio', CATEGORIA),
+])
+
+# Asistencias limpias (limpieza-asistencias.py): asistencias/procesadas/<archivo>.feather.
+# El documento queda como texto porque se imprime tal cual en el certificado.
+# Las columnas de asistencia pueden variar entre planillas: las que no están en el esquema se guardan como texto.
+ESQUEMA_ASISTENCIA = pa.schema([
+    ('Apellido y Nombres', TEXTO),
+    ('Documento', TEXTO),
+    ('Mail', TEXTO),
+    ('Mail UTN', TEXTO),
+])
+
+# Tipo de pandas de cada tipo del esquema
+TIPOS_PANDAS = {
+    TEXTO: pd.StringDtype('pyarrow'),
+    ENTERO: pd.UInt64Dtype(),
+    CATEGORIA: 'category',
+}
+
+
+def ruta_columnar(path_csv):
+    """Ruta de la copia columnar de un CSV (mismo nombre, extensión .feather)."""
+    return os.path.splitext(path_csv)[0] + EXTENSION
+
+
+def _como_texto(serie):
+    """Convierte una columna a texto conservando los nulos (los enteros sin '.0')."""
+    if serie.dtype.kind == 'f' and serie.dropna().mod(1).eq(0).all():
+        serie = serie.astype('Int64')
+    return serie.astype(TIPOS_PANDAS[TEXTO])
+
+
+def _como_entero(serie):
+    """
+    Convierte una columna a entero sin signo. Los valores que no cumplen PATRON_ENTERO quedan en
+    nulo (el texto original sigue en el CSV); en los procesados no hay, porque limpieza.py los
+    manda a errores.csv.
+    """
+    texto = _como_texto(serie).str.strip()
+    validos = texto.str.fullmatch(PATRON_ENTERO).fillna(False).astype(bool)
+    numeros = pd.to_numeric(texto.where(validos), errors='coerce').astype('Int64')
+    descartados = int((texto.notna() & (texto != '') & ~validos).sum())
+    if descartados:
+        logging.warning(f"Columna '{serie.name}': {descartados} valores no numéricos quedan en nulo")
+    return numeros.astype(TIPOS_PANDAS[ENTERO])
+
+
+def aplicar_esquema(df, esquema):
+    """
+    Devuelve el DataFrame con los tipos de pandas del esquema (ver TIPOS_PANDAS).
+
+    Las columnas del esquema que falten quedan en nulo y las que sobren se agregan al final como texto.
+
+    Args:
+        df (pandas.DataFrame): Datos como texto o con los tipos que haya inferido pd.read_csv.
+        esquema (pyarrow.Schema): Tipos de las columnas conocidas.
+
+    Returns:
+        pandas.DataFrame
+    """
+    columnas = {}
+    for campo in esquema:
+        serie = df[campo.name] if campo.name in df.columns else pd.Series(None, index=df.index, dtype=object, name=campo.name)
+        tipo = TIPOS_PANDAS[campo.type]
+        if serie.dtype == tipo:
+            columnas[campo.name] = serie
+        elif campo.type == ENTERO:
+            columnas[campo.name] = _como_entero(serie)
+        elif campo.type == CATEGORIA:
+            columnas[campo.name] = _como_texto(serie).astype(tipo)
+        else:
+            columnas[campo.name] = _como_texto(serie)
+    for columna in df.columns:
+        if columna not in esquema.names:
+            columnas[columna] = _como_texto(df[columna])
+    return pd.DataFrame(columnas, index=df.index)
+
+
+def esquema_completo(df, esquema):
+    """Esquema con las columnas extra de df (que no están en 'esquema') agregadas como texto."""
+    extras = [columna for columna in df.columns if columna not in esquema.names]
+    return pa.schema(list(esquema) + [pa.field(str(columna), TEXTO) for columna in extras])
+
+
+def escribir_tabla(df, path, esquema):
+    """
+    Escribe el DataFrame en formato Feather con el esquema dado (ver aplicar_esquema).
+
+    Args:
+        df (pandas.DataFrame): Datos a escribir.
+        path (str): Archivo de salida.
+        esquema (pyarrow.Schema): Tipos de las columnas conocidas.
+    """
+    with EscritorTabla(path, esquema) as escritor:
+        escritor.escribir(df)
+
+
+class EscritorTabla:
+    """
+    Escribe un archivo Feather de a partes (por ejemplo, un bloque de filas por vez), sin tener
+    toda la tabla en memoria. El esquema completo se fija con la primera parte; el archivo
+    aparece en 'path' recién al cerrar el escritor sin errores.
+
+    Uso:
+        with EscritorTabla(path, ESQUEMA_INSCRIPCION) as escritor:
+            for bloque in bloques:
+                escritor.escribir(bloque)
+    """
+
+    def __init__(self, path, esquema):
+        self.path = path
+        self.esquema = esquema
+        self.path_tmp = f"{path}.{os.getpid()}.tmp"
+        self._escritor = None
+
+    def escribir(self, df):
+        if self._escritor is None:
+            self.esquema = esquema_completo(df, self.esquema)
+            # Feather sin comprimir es el formato de archivo IPC de Arrow
+            self._escritor = pa.ipc.new_file(self.path_tmp, self.esquema)
+        tabla = pa.Table.from_pandas(aplicar_esquema(df, self.esquema), preserve_index=False).cast(self.esquema)
+        self._escritor.write_table(tabla)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, error, traza):
+        if self._escritor is None:
+            # Sin partes: tabla vacía con el esquema
+            self._escritor = pa.ipc.new_file(self.path_tmp, self.esquema)
+        self._escritor.close()
+        if error is None:
+            # Escritura atómica: quien lea nunca ve un archivo a medio escribir
+            os.replace(self.path_tmp, self.path)
+        else:
+            os.remove(self.path_tmp)
+
+
+def leer_tabla(path, columnas=None):
+    """
+    Lee una tabla Feather mapeada en memoria, con los tipos de pandas del esquema (ver TIPOS_PANDAS);
+    los nulos son pd.NA.
+
+    Args:
+        path (str): Archivo .feather.
+        columnas (list): Columnas a leer; por defecto, todas.
+
+    Returns:
+        pandas.DataFrame
+    """
+    tabla = feather.read_table(path, columns=columnas, memory_map=True)
+    return tabla.to_pandas(types_mapper={TEXTO: TIPOS_PANDAS[TEXTO], ENTERO: TIPOS_PANDAS[ENTERO]}.get)
+
+
+def leer_limpio(path_csv, esquema=None, **kwargs_csv):
+    """
+    Lee un archivo limpio prefiriendo su copia columnar, si existe y no es más vieja que el CSV.
+    Si no, lee el CSV con pd.read_csv(path_csv, **kwargs_csv) y, si se pasa 'esquema', le aplica sus tipos.
+
+    Returns:
+        pandas.DataFrame
+    """
+    path = ruta_columnar(path_csv)
+    try:
+        if os.stat(path).st_mtime_ns >= os.stat(path_csv).st_mtime_ns:
+            return leer_tabla(path)
+    except FileNotFoundError:
+        pass
+    df = pd.read_csv(path_csv, **kwargs_csv)
+    return df if esquema is None else aplicar_esquema(df, esquema)
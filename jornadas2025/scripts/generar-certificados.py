@@ -7,6 +7,8 @@ import unicodedata
 import json
 from pypdf import PdfReader
 import argparse
+from indice_inscripciones import inscripciones
+from formato_columnar import leer_limpio
 
 # --- Configuración de Rutas y Fuentes ---
 
@@ -172,11 +174,13 @@ def generar_certificado_final(nombre_completo, documento, ruta_salida_pdf):
             os.remove(temp_overlay_pdf)
 
 
-def procesar_csvs_y_generar_certificados(carpeta_csvs='asistencias', subcarpeta_origen='procesadas', carpeta_certificados='certificados', max_registros_test=2):
+def procesar_csvs_y_generar_certificados(carpeta_csvs='asistencias', subcarpeta_origen='procesadas', carpeta_certificados='certificados', max_registros_test=2, mail_de_inscripcion=False):
     """
     Procesa los primeros 'max_registros_test' de cada archivo CSV de la subcarpeta 'procesadas',
     genera certificados y los guarda en la estructura de carpetas deseada.
     Establece max_registros_test=None para procesar todos los registros.
+    Con 'mail_de_inscripcion', a los asistentes sin 'Mail' ni 'Mail UTN' se les envía el certificado
+    al mail de su inscripción con el mismo DNI (índice global); si no, se saltean.
     """
     ruta_origen_csvs = os.path.join(PROYECTO_DIR, carpeta_csvs, subcarpeta_origen)
     ruta_certificados = os.path.join(PROYECTO_DIR, carpeta_certificados)
@@ -223,8 +227,8 @@ def procesar_csvs_y_generar_certificados(carpeta_csvs='asistencias', subcarpeta_
             print(f"Creada subcarpeta para certificados: '{ruta_subcarpeta_certificados}'")
 
         try:
-            # Leo el archivo CSV con delimitador de punto y coma
-            df = pd.read_csv(csv_path, sep=';')
+            # Leo la copia columnar si está al día; si no, el CSV con delimitador de punto y coma
+            df = leer_limpio(csv_path, sep=';')
 
             # Defino los nombres de columnas esperados
             COL_APELLIDO_NOMBRES = 'Apellido y Nombres'
@@ -263,7 +267,17 @@ def procesar_csvs_y_generar_certificados(carpeta_csvs='asistencias', subcarpeta_
                 elif COL_MAIL_UTN in row and pd.notna(row[COL_MAIL_UTN]) and str(row[COL_MAIL_UTN]).strip() != '':
                     correo_electronico = str(row[COL_MAIL_UTN]).strip()
 
-                # Si después de ambas verificaciones el correo sigue siendo nulo, se salta el registro
+                # Solo si se pidió: usa el mail de la inscripción con el mismo DNI (índice global)
+                if not correo_electronico and mail_de_inscripcion:
+                    try:
+                        mails_inscripcion = inscripciones.por_dni(documento)['Mail'].dropna()
+                    except FileNotFoundError:  # Sin carpeta de inscripciones
+                        mails_inscripcion = []
+                    if len(mails_inscripcion):
+                        correo_electronico = str(mails_inscripcion.iloc[0]).strip()
+                        print(f"Aviso: '{apellido_nombre}' (DNI: {documento}) no tiene correo en la asistencia; se usa el de su inscripción: {correo_electronico}")
+
+                # Si después de todas las verificaciones el correo sigue siendo nulo, se salta el registro
                 if not correo_electronico:
                     print(f"Advertencia: No se encontró un correo electrónico válido para '{apellido_nombre}' (DNI: {documento}). Saltando generación de certificado.")
                     continue # Continúa con la siguiente fila en el CSV
@@ -373,6 +387,8 @@ if __name__ == "__main__":
     parser.add_argument('--test', action='store_true', help="Generar certificado de prueba manual")
     parser.add_argument('--todos', action='store_true', help="Procesar todos los registros desde CSVs")
     parser.add_argument('--limite', type=int, help="Procesar solo los primeros N registros de cada CSV.")
+    parser.add_argument('--mail-de-inscripcion', action='store_true',
+                        help="A quien no tenga correo en la asistencia, usar el de su inscripción (mismo DNI) en lugar de saltearlo.")
 
 
     args = parser.parse_args()
@@ -380,9 +396,9 @@ if __name__ == "__main__":
     if args.test:
         generar_certificado_prueba()
     elif args.todos:
-        procesar_csvs_y_generar_certificados(max_registros_test=None)
+        procesar_csvs_y_generar_certificados(max_registros_test=None, mail_de_inscripcion=args.mail_de_inscripcion)
     elif args.limite is not None:
-        procesar_csvs_y_generar_certificados(max_registros_test=args.limite)
+        procesar_csvs_y_generar_certificados(max_registros_test=args.limite, mail_de_inscripcion=args.mail_de_inscripcion)
     else: # Comportamiento por defecto si no se especifican argumentos
         print("No se especificó ninguna opción de ejecución. Procesando los primeros 2 registros por defecto.")
-        procesar_csvs_y_generar_certificados() # Llama a la función que usa su default de max_registros_test=2
+        procesar_csvs_y_generar_certificados(mail_de_inscripcion=args.mail_de_inscripcion) # Usa el default de max_registros_test=2
@@ -1,135 +1,258 @@
+import io
 import os
 import qrcode
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
-import csv
+import numpy as np
+from PIL import Image, ImageDraw
+from functools import lru_cache
+from metricas import metricas
+from maquetado_texto import ajustar_lineas
+from referencias import referencias
+from cache_qr import clave_qr, leer_qr, guardar_qr, huella_disenio
 
-def transformar_codigo_charla_a_nombre_charla(codigo_charla):
+def ajustar_texto(texto, fuente_path, box_width, box_height, font_size):
     """
-    Transforma un código de charla en el nombre legible de la charla, 
-    buscando en el archivo CSV de referencias.
+    Ajusta el texto para que entre en un recuadro con tamaño de fuente fijo.
+    Si el texto no cabe, ajusta el ancho de línea manteniendo el tamaño de fuente
+    (ver maquetado_texto.ajustar_lineas).
     """
-    ruta_csv = os.path.join(os.path.dirname(__file__), '..', 'inscripciones', 'tabla-de-referencias.csv')
+    lines, font = ajustar_lineas(texto, fuente_path, font_size, box_width, box_height)
+    return list(lines), font
+
+# Recursos y disposición de la imagen
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), 'template.jpg')
+FUENTE_PATH = os.path.join(os.path.dirname(__file__), '..', 'fonts', 'Planc-wfx', 'Planc-Bold.otf')
+QR_POSICION = (100, 700)
+QR_TAMANIO = (700, 700)
+TEXTO_CONFIG = {
+    'position': (90, 300),
+    'box_size': (720, 420),
+    'font_size': 55,
+    'color': (44, 78, 254)
+}
+
+# Formato de la imagen adjunta (ver FORMATOS); se puede cambiar con la variable QR_FORMATO
+FORMATO_QR = os.getenv('QR_FORMATO', 'png')
+
+# Formatos de adjunto disponibles: extensión del archivo y subtipo MIME (image/<subtipo>).
+#   png: imagen completa, RGB sin pérdida (el formato original).
+#   png-paleta: imagen completa reducida a COLORES_PALETA colores, con optimize.
+#   jpeg / webp: imagen completa con pérdida, calidad CALIDAD_JPEG / CALIDAD_WEBP.
+#   qr-1bit: solo el QR, en blanco y negro (sin fondo ni título).
+FORMATOS = {
+    'png': {'extension': 'png', 'mime': 'png'},
+    'png-paleta': {'extension': 'png', 'mime': 'png'},
+    'jpeg': {'extension': 'jpg', 'mime': 'jpeg'},
+    'webp': {'extension': 'webp', 'mime': 'webp'},
+    'qr-1bit': {'extension': 'png', 'mime': 'png'},
+}
+COLORES_PALETA = 64
+CALIDAD_JPEG = 85
+CALIDAD_WEBP = 80
+
+def _dibujar_encabezado(imagen, lines, font):
+    """Dibuja las líneas del encabezado centradas en el recuadro de texto. Devuelve la coordenada y inferior."""
+    draw = ImageDraw.Draw(imagen)
+    x, y = TEXTO_CONFIG['position']
+    box_width, _ = TEXTO_CONFIG['box_size']
+
+    # Posicionamiento del texto
+    y_start = y
+    y_inferior = y
+    for line in lines:
+        bbox = font.getbbox(line)
+        text_width = bbox[2] - bbox[0]
+        text_height = bbox[3] - bbox[1]
+        x_position = x + (box_width - text_width) // 2
+        draw.text((x_position, y_start), line, font=font, fill=TEXTO_CONFIG['color'])
+        y_inferior = max(y_inferior, y_start + bbox[3])
+        y_start += text_height + 10
+    return y_inferior
+
+def titulo_charla(codigo_charla):
+    """Nombre de la charla que se dibuja en el fondo (ver referencias.py)."""
+    return referencias.nombre(codigo_charla)
+
+@lru_cache(maxsize=None)
+def _template_base():
     try:
-        with open(ruta_csv, encoding='utf-8') as archivo:
-            lector = csv.reader(archivo, delimiter=';')
-            for fila in lector:
-                if len(fila) < 3:
-                    continue
-                codigo, nombre, _ = fila
-                if codigo.strip() == codigo_charla:
-                    return nombre.strip()
+        return Image.open(TEMPLATE_PATH).convert("RGB")
     except FileNotFoundError:
-        print(f"Archivo no encontrado: {ruta_csv}")
-    except Exception as e:
-        print(f"Error al leer el archivo CSV: {e}")
-    return codigo_charla
+        raise FileNotFoundError("No se encontró el archivo template.jpg en el directorio")
 
-def ajustar_texto(texto, fuente_path, box_width, box_height, font_size):
+def fondo_charla(codigo_charla):
     """
-    Ajusta el texto para que entre en un recuadro con tamaño de fuente fijo.
-    Si el texto no cabe, ajusta el ancho de línea manteniendo el tamaño de fuente.
+    Fondo compuesto de la charla: template.jpg, el área del QR en blanco y el encabezado
+    con el nombre de la charla. Se arma una sola vez por nombre, así que si cambia el
+    nombre en la tabla de referencias se arma de nuevo. Cada asistente solo suma el QR.
+
+    Returns:
+        tuple: (fondo, lines, font, invasion), donde 'invasion' es la cantidad de filas
+        del encabezado que quedan dentro del área del QR.
     """
-    try:
-        font = ImageFont.truetype(fuente_path, font_size)
-    except:
-        font = ImageFont.load_default()
-    
-    # Ajusta el ancho de línea para que el texto quepa
-    wrap_width = 30  # Valor inicial
-    lines = textwrap.wrap(texto, width=wrap_width)
-    
-    # Calcula dimensiones del texto
-    total_height = sum([font.getbbox(line)[3] - font.getbbox(line)[1] + 10 for line in lines])
-    max_line_width = max([font.getbbox(line)[2] - font.getbbox(line)[0] for line in lines])
-    
-    # Ajusta el ancho de línea si es necesario
-    while (total_height > box_height or max_line_width > box_width) and wrap_width > 10:
-        wrap_width -= 1
-        lines = textwrap.wrap(texto, width=wrap_width)
-        total_height = sum([font.getbbox(line)[3] - font.getbbox(line)[1] + 10 for line in lines])
-        max_line_width = max([font.getbbox(line)[2] - font.getbbox(line)[0] for line in lines])
-
-    return lines, font
-
-def generar_qr_asistencia(info, codigo_charla):
+    return _fondo_con_titulo(titulo_charla(codigo_charla))
+
+@lru_cache(maxsize=None)
+def _fondo_con_titulo(nombre_charla):
+    fondo = _template_base().copy()
+
+    # El QR siempre empieza con su margen blanco, por lo que el encabezado se dibuja sobre blanco
+    x_qr, y_qr = QR_POSICION
+    fondo.paste((255, 255, 255), (x_qr, y_qr, x_qr + QR_TAMANIO[0], y_qr + QR_TAMANIO[1]))
+
+    texto_final = f"QR de asistencia a:\n{nombre_charla}"
+
+    # Ajusta texto con tamaño de fuente fijo
+    lines, font = ajustar_texto(
+        texto_final,
+        FUENTE_PATH,
+        TEXTO_CONFIG['box_size'][0],
+        TEXTO_CONFIG['box_size'][1],
+        TEXTO_CONFIG['font_size']
+    )
+    y_inferior = _dibujar_encabezado(fondo, lines, font)
+
+    return fondo, lines, font, max(0, y_inferior - y_qr)
+
+def generar_qr_asistencia(info, codigo_charla, output_path=None):
     """
-    Genera un QR con la info de la inscripcion y un texto personalizado con tamaño de fuente fijo.
+    Genera un QR con la info de la inscripcion y un texto personalizado con tamaño de fuente fijo,
+    y lo guarda en un archivo (útil para depurar). Para adjuntarlo a un correo usar generar_qr_asistencia_bytes.
+    Si no se indica 'output_path', se guarda en scripts/qr_generado.png.
     """
-    try:
-        template_path = os.path.join(os.path.dirname(__file__), 'template.jpg')
-        template = Image.open(template_path).convert("RGB")
-    except FileNotFoundError:
-        raise FileNotFoundError("No se encontró el archivo template.jpg en el directorio")
+    with metricas.medir('qr'):
+        if output_path is None:
+            output_path = os.path.join(os.path.dirname(__file__), 'qr_generado.png')
+        componer_qr_asistencia(info, codigo_charla).save(output_path)
+        return output_path
+
+def generar_qr_asistencia_png(info, codigo_charla):
+    """Genera el QR de asistencia como PNG completo (ver generar_qr_asistencia_bytes)."""
+    return generar_qr_asistencia_bytes(info, codigo_charla, 'png')
 
-    # Generar QR
+def generar_qr_asistencia_bytes(info, codigo_charla, formato=None):
+    """
+    Genera el QR de asistencia en memoria. Si el mismo QR ya fue generado (por lote_qr.py
+    o en un envío anterior) se devuelve el archivo guardado; si no, se genera y se guarda
+    en scripts/qr_generados para los reenvíos y reintentos.
+
+    Args:
+        info (str): Datos del QR, por ejemplo 'charla;legajo;dni;'.
+        codigo_charla (str): Código de la charla (define el título del fondo).
+        formato (str): Uno de FORMATOS; por defecto FORMATO_QR.
+
+    Returns:
+        bytes: Imagen codificada, lista para adjuntar.
+    """
+    formato = formato or FORMATO_QR
+    extension = FORMATOS[formato]['extension']
+    with metricas.medir('qr'):
+        clave = clave_qr_asistencia(info, codigo_charla, formato)
+        datos = leer_qr(clave, extension)
+        if datos is None:
+            datos = renderizar_qr(info, codigo_charla, formato)
+            guardar_qr(clave, datos, extension=extension)
+        return datos
+
+def clave_qr_asistencia(info, codigo_charla, formato='png'):
+    """Clave de contenido del QR: cambia sola si cambian los datos, el título, template.jpg, la fuente, la disposición o el formato."""
+    disposicion = repr((QR_POSICION, QR_TAMANIO, sorted(TEXTO_CONFIG.items()),
+                        formato, COLORES_PALETA, CALIDAD_JPEG, CALIDAD_WEBP))
+    return clave_qr(info, titulo_charla(codigo_charla), huella_disenio((TEMPLATE_PATH, FUENTE_PATH), disposicion))
+
+def renderizar_qr(info, codigo_charla, formato='png'):
+    """Compone y codifica el QR en el formato pedido, sin consultar los QR ya generados."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de QR desconocido: {formato} (disponibles: {', '.join(FORMATOS)})")
+
+    if formato == 'qr-1bit':
+        imagen = imagen_qr(info)[0]
+    else:
+        imagen = componer_qr_asistencia(info, codigo_charla)
+    return codificar_imagen(imagen, formato)
+
+def codificar_imagen(imagen, formato):
+    """Codifica una imagen (PIL) según el formato de adjunto."""
+    buffer = io.BytesIO()
+    if formato == 'png-paleta':
+        imagen = imagen.quantize(colors=COLORES_PALETA, method=Image.Quantize.FASTOCTREE)
+        imagen.save(buffer, format='PNG', optimize=True)
+    elif formato == 'jpeg':
+        # Sin submuestreo de color, para que los bordes de los módulos no se corran
+        imagen.save(buffer, format='JPEG', quality=CALIDAD_JPEG, optimize=True, subsampling=0)
+    elif formato == 'webp':
+        imagen.save(buffer, format='WEBP', quality=CALIDAD_WEBP, method=4)
+    elif formato == 'qr-1bit':
+        imagen.save(buffer, format='PNG', optimize=True)
+    else:
+        imagen.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def armar_info_qr(charla, legajo, dni):
+    """Datos que se codifican en el QR de una inscripción."""
+    return f"{charla};{legajo};{dni};"
+
+def rasterizar_qr(matriz, tamanio, borde):
+    """
+    Convierte la matriz de módulos del QR en una imagen 1-bit de exactamente tamanio x tamanio.
+    Cada módulo ocupa la misma cantidad entera de píxeles (sin interpolar, bordes nítidos) y
+    el sobrante se reparte como margen blanco alrededor.
+
+    Args:
+        matriz (list): Filas de módulos (True = negro), incluido el borde, como devuelve QRCode.get_matrix().
+        tamanio (int): Lado de la imagen en píxeles.
+        borde (int): Módulos de margen blanco incluidos en la matriz.
+
+    Returns:
+        tuple: (imagen, margen_superior), con la cantidad de filas blancas arriba del primer módulo negro.
+    """
+    modulos = np.array(matriz, dtype=bool)
+    lado = modulos.shape[0]
+    px_modulo = tamanio // lado
+    if px_modulo < 1:
+        raise ValueError(f"El QR tiene {lado} módulos y no entra en {tamanio} píxeles")
+
+    # En modo "1" True es blanco: se invierte la matriz y se amplía cada módulo a px_modulo x px_modulo
+    pixeles = np.ones((tamanio, tamanio), dtype=bool)
+    relleno = (tamanio - px_modulo * lado) // 2
+    fin = relleno + px_modulo * lado
+    pixeles[relleno:fin, relleno:fin] = np.repeat(np.repeat(~modulos, px_modulo, axis=0), px_modulo, axis=1)
+
+    return Image.fromarray(pixeles), relleno + px_modulo * borde
+
+def imagen_qr(info):
+    """
+    Genera solo el QR, en blanco y negro y del tamaño de QR_TAMANIO.
+
+    Returns:
+        tuple: (imagen, margen_superior), ver rasterizar_qr.
+    """
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
         border=4,
     )
     qr.add_data(info)
     qr.make(fit=True)
-    img_qr = qr.make_image(fill_color="black", back_color="white")
-
-    if not isinstance(img_qr, Image.Image):
-        img_qr = img_qr.get_image()
+    return rasterizar_qr(qr.get_matrix(), QR_TAMANIO[0], qr.border)
 
-    img_qr = img_qr.resize((700, 700), Image.Resampling.LANCZOS)
-    qr_position = (100, 700)
-    template.paste(img_qr, qr_position)
-
-    # Obtengo nombre de la charla
-    nombre_charla = transformar_codigo_charla_a_nombre_charla(codigo_charla)
-    texto_final = f"QR de asistencia a:\n{nombre_charla}"
-
-    draw = ImageDraw.Draw(template)
-    text_config = {
-        'position': (90, 300),
-        'box_size': (720, 420),
-        'font_size': 55,
-        'color': (44, 78, 254)
-    }
-
-    # Configura fuente
-    fuente_path = os.path.join(os.path.dirname(__file__), '..', 'fonts', 'Planc-wfx', 'Planc-Bold.otf')
-    
-    # Ajusta texto con tamaño de fuente fijo
-    lines, font = ajustar_texto(
-        texto_final, 
-        fuente_path, 
-        text_config['box_size'][0], 
-        text_config['box_size'][1],
-        text_config['font_size']
-    )
+def componer_qr_asistencia(info, codigo_charla):
+    """Devuelve la imagen (PIL) del QR de asistencia sobre el fondo de la charla."""
+    fondo, lines, font, invasion = fondo_charla(codigo_charla)
 
-    x, y = text_config['position']
-    box_width, box_height = text_config['box_size']
-    
-    # Dibuja recuadro rojo (solo para DEBUG)
-    '''draw.rectangle(
-        [text_config['position'], 
-        (text_config['position'][0] + text_config['box_size'][0],
-         text_config['position'][1] + text_config['box_size'][1])],
-        outline="red",
-        width=3
-    )'''
+    img_qr, margen_blanco = imagen_qr(info)
 
-    # Posicionamiento del texto
-    y_start = y
-    for line in lines:
-        bbox = font.getbbox(line)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        x_position = x + (box_width - text_width) // 2
-        draw.text((x_position, y_start), line, font=font, fill=text_config['color'])
-        y_start += text_height + 10
+    # Las filas del margen blanco del QR que el encabezado invade ya están en el fondo
+    x_qr, y_qr = QR_POSICION
+    if invasion <= margen_blanco:
+        template = fondo.copy()
+        template.paste(img_qr.crop((0, invasion, QR_TAMANIO[0], QR_TAMANIO[1])), (x_qr, y_qr + invasion))
+    else:
+        # Encabezado demasiado largo: se dibuja sobre el QR, como antes
+        template = _template_base().copy()
+        template.paste(img_qr, QR_POSICION)
+        _dibujar_encabezado(template, lines, font)
 
-    # Guarda el resultado
-    output_path = os.path.join(os.path.dirname(__file__), 'qr_generado.png')
-    template.save(output_path)
-    return output_path
+    return template
 
 if __name__ == '__main__':
     info_ejemplo = "m-09;311;4423"
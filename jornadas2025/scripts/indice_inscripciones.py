@@ -0,0 +1,223 @@
+import os
+import argparse
+import threading
+import pandas as pd
+from formato_columnar import ESQUEMA_INDICE, ESQUEMA_INSCRIPCION, aplicar_esquema, leer_limpio
+
+# Índice global de inscripciones: todas las inscripciones procesadas de todos los departamentos
+# y charlas en una sola tabla columnar (Parquet), con índices en memoria por DNI, mail y charla.
+# Los scripts consultan el índice en lugar de recorrer inscripciones/<depto>/procesadas/.
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'inscripciones'))
+
+# Archivo del índice, dentro de la carpeta inscripciones
+ARCHIVO_INDICE = 'indice-inscripciones.parquet'
+
+COLUMNAS = ESQUEMA_INDICE.names
+
+
+def normalizar_dni(dni):
+    """DNI como se guarda en el índice (entero), o None si no es un número."""
+    dni = str(dni).strip().replace('.', '')
+    return int(dni) if dni.isascii() and dni.isdigit() else None
+
+
+def normalizar_mail(mail):
+    """Mail en minúsculas y sin espacios, para comparar direcciones."""
+    return str(mail).strip().lower()
+
+
+def recorrer_procesadas(base_dir=BASE_DIR):
+    """
+    Recorre inscripciones/<depto>/procesadas/<charla>/<charla>.csv.
+
+    Yields:
+        tuple: (departamento, charla, path_csv)
+    """
+    for departamento in sorted(os.listdir(base_dir)):
+        procesadas_path = os.path.join(base_dir, departamento, 'procesadas')
+        if not os.path.isdir(procesadas_path):
+            continue
+
+        for charla in sorted(os.listdir(procesadas_path)):
+            path_csv = os.path.join(procesadas_path, charla, f"{charla}.csv")
+            if os.path.exists(path_csv):
+                yield departamento, charla, path_csv
+
+
+def ultima_modificacion(base_dir=BASE_DIR):
+    """
+    Momento (mtime en ns) del último cambio en los procesados de los que se arma el índice: un CSV
+    de charla editado o regenerado, o una charla agregada o borrada (cambia la carpeta procesadas).
+
+    Returns:
+        int: 0 si no hay procesados.
+    """
+    ultima = 0
+    for departamento in os.listdir(base_dir):
+        procesadas_path = os.path.join(base_dir, departamento, 'procesadas')
+        if os.path.isdir(procesadas_path):
+            ultima = max(ultima, os.stat(procesadas_path).st_mtime_ns)
+    for _, _, path_csv in recorrer_procesadas(base_dir):
+        ultima = max(ultima, os.stat(path_csv).st_mtime_ns)
+    return ultima
+
+
+def construir_indice(base_dir=BASE_DIR):
+    """
+    Junta todos los CSV procesados en un único archivo Parquet dentro de la carpeta inscripciones.
+
+    Las columnas tienen los tipos de ESQUEMA_INDICE (DNI entero; departamento, charla y
+    dominio del mail como categorías); las celdas vacías quedan en nulo. De cada charla se lee la
+    copia columnar (formato_columnar.py) si está al día con el CSV.
+
+    Args:
+        base_dir (str): Carpeta 'inscripciones'.
+
+    Returns:
+        tuple: (ruta del índice, cantidad de inscripciones)
+    """
+    tablas = []
+    for departamento, charla, path_csv in recorrer_procesadas(base_dir):
+        df = leer_limpio(path_csv, ESQUEMA_INSCRIPCION, dtype=str)
+        df.insert(0, 'Departamento', departamento)
+        df.insert(1, 'Charla', charla)
+        tablas.append(df)
+
+    indice = pd.concat(tablas, ignore_index=True) if tablas else pd.DataFrame(columns=COLUMNAS)
+    # Dominio del mail, igual que en dominios.csv (limpieza.agrupar_por_dominio)
+    indice['Dominio'] = indice['Mail'].str.split('@').str[1]
+    # Las categorías se arman sobre la tabla completa (cada charla tiene las suyas)
+    indice = aplicar_esquema(indice.reindex(columns=COLUMNAS), ESQUEMA_INDICE)
+
+    path = os.path.join(base_dir, ARCHIVO_INDICE)
+    path_tmp = f"{path}.{os.getpid()}.tmp"
+    indice.to_parquet(path_tmp, index=False)
+    os.replace(path_tmp, path)
+    return path, len(indice)
+
+
+class IndiceInscripciones:
+    """
+    Consultas sobre el índice global de inscripciones.
+
+    El archivo se lee una sola vez y se vuelve a leer solo si cambia (por ejemplo, después de
+    correr limpieza.py). Si todavía no existe, o si algún CSV procesado es más nuevo que el índice
+    (editado a mano o generado por fuera de limpieza.py), se construye a partir de los procesados.
+    Las consultas devuelven DataFrames con las columnas de COLUMNAS.
+    """
+
+    def __init__(self, base_dir=None):
+        self.base_dir = base_dir
+        self.lock = threading.Lock()
+        self.tabla = pd.DataFrame(columns=COLUMNAS)
+        self._por_dni = {}
+        self._por_mail = {}
+        self._por_charla = {}
+        self._firma = None  # (ruta, mtime) de la versión cargada
+
+    def _actualizar(self):
+        base_dir = self.base_dir or BASE_DIR
+        ruta = os.path.join(base_dir, ARCHIVO_INDICE)
+        if self._desactualizado(ruta, base_dir):
+            with self.lock:
+                if self._desactualizado(ruta, base_dir):
+                    construir_indice(base_dir)
+
+        firma = (ruta, os.stat(ruta).st_mtime_ns)
+        if firma == self._firma:
+            return
+
+        with self.lock:
+            if firma == self._firma:
+                return
+            tabla = pd.read_parquet(ruta)
+            # Posiciones de las filas por cada valor (sin nulos)
+            self._por_dni = tabla.groupby('DNI', sort=False).indices
+            self._por_mail = tabla.groupby(tabla['Mail'].str.strip().str.lower(), sort=False).indices
+            self._por_charla = tabla.groupby('Charla', sort=False, observed=True).indices
+            self.tabla = tabla
+            self._firma = firma
+
+    @staticmethod
+    def _desactualizado(ruta, base_dir):
+        try:
+            return os.stat(ruta).st_mtime_ns < ultima_modificacion(base_dir)
+        except FileNotFoundError:
+            return True
+
+    def _filas(self, indice, clave):
+        return self.tabla.iloc[indice.get(clave, [])]
+
+    def todas(self, departamento=None):
+        """Todas las inscripciones, o las de un departamento."""
+        self._actualizar()
+        if departamento is None:
+            return self.tabla
+        return self.tabla[self.tabla['Departamento'] == departamento]
+
+    def por_dni(self, dni):
+        """Inscripciones de un DNI (con o sin puntos)."""
+        self._actualizar()
+        return self._filas(self._por_dni, normalizar_dni(dni))
+
+    def por_mail(self, mail):
+        """Inscripciones de un mail (sin distinguir mayúsculas)."""
+        self._actualizar()
+        return self._filas(self._por_mail, normalizar_mail(mail))
+
+    def por_charla(self, codigo):
+        """Inscripciones de una charla."""
+        self._actualizar()
+        return self._filas(self._por_charla, codigo.strip())
+
+    def charlas(self, departamento=None):
+        """Códigos de charla con inscripciones, ordenados."""
+        return sorted(self.todas(departamento)['Charla'].dropna().unique())
+
+    def charlas_de(self, dni=None, mail=None):
+        """
+        Charlas en las que está inscripta una persona, buscada por DNI o por mail.
+
+        Returns:
+            list: Códigos de charla, ordenados y sin repetidos.
+        """
+        if dni is not None:
+            filas = self.por_dni(dni)
+        elif mail is not None:
+            filas = self.por_mail(mail)
+        else:
+            raise ValueError("Indicar dni o mail")
+        return sorted(filas['Charla'].dropna().unique())
+
+
+# Instancia compartida por todos los módulos del proceso
+inscripciones = IndiceInscripciones()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Construye y consulta el índice global de inscripciones")
+    parser.add_argument('--inscripciones', default=BASE_DIR, help="Carpeta 'inscripciones'.")
+    parser.add_argument('--reconstruir', action='store_true',
+                        help="Vuelve a armar el índice aunque esté al día con los procesados.")
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument('--dni', help="Muestra las inscripciones de un DNI.")
+    grupo.add_argument('--mail', help="Muestra las inscripciones de un mail.")
+    grupo.add_argument('--charla', help="Muestra las inscripciones de una charla.")
+    args = parser.parse_args()
+
+    if args.reconstruir:
+        ruta, cantidad = construir_indice(args.inscripciones)
+        print(f"Índice con {cantidad} inscripciones: {ruta}")
+
+    inscripciones.base_dir = args.inscripciones
+    if args.dni:
+        print(inscripciones.por_dni(args.dni).to_string(index=False))
+    elif args.mail:
+        print(inscripciones.por_mail(args.mail).to_string(index=False))
+    elif args.charla:
+        print(inscripciones.por_charla(args.charla).to_string(index=False))
+    elif not args.reconstruir:
+        tabla = inscripciones.todas()
+        print(f"{len(tabla)} inscripciones en {tabla['Charla'].nunique()} charlas "
+              f"de {tabla['Departamento'].nunique()} departamentos")
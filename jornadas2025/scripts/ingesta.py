@@ -0,0 +1,191 @@
+import csv
+import codecs
+import logging
+from collections import namedtuple
+import pandas as pd
+
+# Lectura de las exportaciones (Google Forms, planillas de asistencia) compartida por los
+# scripts de limpieza. Con los primeros bytes del archivo se detectan una sola vez la
+# codificación, el separador y la fila de encabezados, y después se parsea con el motor
+# pyarrow (o el de C, si se lee por bloques o pyarrow no está instalado), nunca con el de Python.
+
+# Bytes que se leen para detectar el formato
+TAMANIO_MUESTRA = 64 * 1024
+
+# Filas iniciales en las que se busca el encabezado (algunas planillas traen un título arriba)
+FILAS_BUSQUEDA_ENCABEZADO = 20
+
+SEPARADORES = ',;\t|'
+
+# Codificaciones a probar, en orden, si el archivo no tiene BOM
+CODIFICACIONES = ['utf-8', 'cp1252']
+
+# Mapeo de sinónimos a nombres estándar
+SINONIMOS_COLUMNAS = {
+    'correo': 'mail',
+    'email': 'mail',
+    'e-mail': 'mail',
+    'correo electronico': 'mail',
+    'correo electrónico': 'mail',
+    'apellido y nombre': 'nombre',
+    'apellido y  nombre': 'nombre',
+    'Apellido ' : 'apellido',
+}
+
+# Celdas que pd.read_csv toma como vacías (sus na_values por defecto)
+NULOS = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+         '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+FormatoCSV = namedtuple('FormatoCSV', ['codificacion', 'separador', 'fila_encabezado'])
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    MOTOR = 'pyarrow'
+except ImportError:
+    MOTOR = 'c'
+
+
+def normalizar_encabezados(columnas, sinonimos=SINONIMOS_COLUMNAS):
+    """
+    Quita espacios de los encabezados y reemplaza los sinónimos por su nombre estándar.
+    Los sinónimos se buscan en minúsculas; los encabezados que no están quedan como vinieron (sin espacios).
+
+    Returns:
+        list: Encabezados normalizados.
+    """
+    normalizados = []
+    for columna in columnas:
+        limpia = str(columna).strip()
+        normalizados.append(sinonimos.get(limpia.lower(), limpia))
+    return normalizados
+
+
+def _detectar_codificacion(muestra):
+    if muestra.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if muestra.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    for codificacion in CODIFICACIONES:
+        try:
+            # final=False: la muestra puede cortar un carácter de varios bytes al final
+            codecs.getincrementaldecoder(codificacion)().decode(muestra, final=False)
+            return codificacion
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+
+def _detectar_separador(lineas):
+    try:
+        return csv.Sniffer().sniff('\n'.join(lineas), delimiters=SEPARADORES).delimiter
+    except csv.Error:
+        # El que más aparece en el encabezado
+        return max(SEPARADORES, key=lambda separador: lineas[0].count(separador)) if lineas else ','
+
+
+def detectar_formato(path_csv, columnas_conocidas=()):
+    """
+    Detecta codificación, separador y fila de encabezados a partir de los primeros bytes del archivo.
+
+    La fila de encabezados es la primera que tiene al menos dos columnas de 'columnas_conocidas'
+    (en minúsculas); si ninguna las tiene, la primera fila.
+
+    Args:
+        path_csv (str): Archivo a leer.
+        columnas_conocidas (iterable): Encabezados esperables, en minúsculas.
+
+    Returns:
+        FormatoCSV: (codificacion, separador, fila_encabezado)
+    """
+    with open(path_csv, 'rb') as archivo:
+        muestra = archivo.read(TAMANIO_MUESTRA)
+
+    codificacion = _detectar_codificacion(muestra)
+    texto = codecs.getincrementaldecoder(codificacion)(errors='replace').decode(muestra, final=False)
+    lineas = texto.splitlines()[:FILAS_BUSQUEDA_ENCABEZADO + 1]
+    if len(muestra) == TAMANIO_MUESTRA and len(lineas) > 1:
+        lineas = lineas[:-1]  # La última puede estar cortada
+
+    conocidas = {columna.lower() for columna in columnas_conocidas}
+    fila_encabezado = 0
+    for numero, linea in enumerate(lineas[:FILAS_BUSQUEDA_ENCABEZADO]):
+        if not linea.strip():
+            continue
+        campos = next(csv.reader([linea], delimiter=_detectar_separador([linea])))
+        if len({campo.strip().lower() for campo in campos} & conocidas) >= 2:
+            fila_encabezado = numero
+            break
+
+    separador = _detectar_separador([linea for linea in lineas[fila_encabezado:] if linea.strip()])
+    return FormatoCSV(codificacion, separador, fila_encabezado)
+
+
+def leer_csv(path_csv, sinonimos=SINONIMOS_COLUMNAS, columnas_conocidas=None, filas_por_bloque=None, **kwargs):
+    """
+    Lee una exportación CSV detectando su formato (ver detectar_formato) y normaliza los
+    encabezados con 'sinonimos' (ver normalizar_encabezados).
+
+    Args:
+        path_csv (str): Archivo a leer.
+        sinonimos (dict): Sinónimos de encabezados (en minúsculas) y su nombre estándar.
+        columnas_conocidas (iterable): Para buscar la fila de encabezados; por defecto,
+            los sinónimos y sus nombres estándar.
+        filas_por_bloque (int): Si se indica, devuelve un iterador de DataFrames de esa cantidad de filas.
+        **kwargs: Otras opciones de pd.read_csv (por ejemplo dtype=str).
+
+    Returns:
+        pandas.DataFrame, o un iterador de DataFrames si se lee por bloques.
+    """
+    if columnas_conocidas is None:
+        columnas_conocidas = set(sinonimos) | set(sinonimos.values())
+    formato = detectar_formato(path_csv, columnas_conocidas)
+    opciones = dict(sep=formato.separador, encoding=formato.codificacion, skiprows=formato.fila_encabezado, **kwargs)
+
+    if filas_por_bloque:
+        # El motor pyarrow no lee por bloques
+        return _normalizar_bloques(pd.read_csv(path_csv, engine='c', chunksize=filas_por_bloque, **opciones), sinonimos)
+
+    # Con filas antes del encabezado se usa el motor de C: pyarrow no saltea filas igual
+    motor = MOTOR if formato.fila_encabezado == 0 else 'c'
+    try:
+        if motor == 'pyarrow' and kwargs == {'dtype': str}:
+            df = _leer_como_texto(path_csv, formato)
+        else:
+            df = pd.read_csv(path_csv, engine=motor, **opciones)
+    except ValueError as e:
+        # pyarrow es más estricto (por ejemplo, con filas con más columnas que el encabezado)
+        if motor == 'c':
+            raise
+        logging.warning(f"No se pudo leer {path_csv} con pyarrow ({e}); se usa el motor de C")
+        df = pd.read_csv(path_csv, engine='c', **opciones)
+    df.columns = normalizar_encabezados(df.columns, sinonimos)
+    return df
+
+
+def _leer_como_texto(path_csv, formato):
+    """
+    Lee todas las columnas como texto con pyarrow. pd.read_csv(engine='pyarrow', dtype=str) infiere
+    los tipos y recién después convierte a texto: un documento '00123' quedaría '123' (o '123.0'
+    si la columna tiene celdas vacías). Acá las columnas se leen como texto desde el principio.
+    """
+    # Encabezados como los deja pd.read_csv (sin repetidos), para nombrar las columnas
+    encabezados = pd.read_csv(path_csv, engine='c', sep=formato.separador, encoding=formato.codificacion, nrows=0).columns
+    nombres = [f"c{numero}" for numero in range(len(encabezados))]
+    tabla = pa_csv.read_csv(
+        path_csv,
+        read_options=pa_csv.ReadOptions(encoding=formato.codificacion, skip_rows=1, column_names=nombres),
+        parse_options=pa_csv.ParseOptions(delimiter=formato.separador),
+        convert_options=pa_csv.ConvertOptions(column_types={nombre: pa.string() for nombre in nombres},
+                                              null_values=NULOS, strings_can_be_null=True),
+    )
+    df = tabla.to_pandas()
+    df.columns = encabezados
+    return df
+
+
+def _normalizar_bloques(lector, sinonimos):
+    with lector:
+        for bloque in lector:
+            bloque.columns = normalizar_encabezados(bloque.columns, sinonimos)
+            yield bloque
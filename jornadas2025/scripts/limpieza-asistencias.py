@@ -1,14 +1,118 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import os
+import argparse
+from formato_columnar import ESQUEMA_ASISTENCIA, TEXTO as TEXTO_ARROW, TIPOS_PANDAS, EscritorTabla, escribir_tabla, ruta_columnar
+from ingesta import SINONIMOS_COLUMNAS, leer_csv
+
+# Encabezados de las planillas de asistencia (en minúsculas) y su nombre estándar.
+# Los sinónimos de mail son los mismos que en las inscripciones.
+SINONIMOS_ASISTENCIA = {
+    **{sinonimo: 'Mail' for sinonimo, estandar in SINONIMOS_COLUMNAS.items() if estandar == 'mail'},
+    'mail': 'Mail',
+    'apellido y nombres': 'Apellido y Nombres',
+    'documento': 'Documento',
+    'dni': 'Documento',
+    'mail utn': 'Mail UTN',
+    'apellido y nombre legal': 'Apellido y Nombre legal',
+}
+
+# Tipo de las columnas de texto (respaldado por Arrow, con nulos)
+TEXTO = TIPOS_PANDAS[TEXTO_ARROW]
+
+# Espacios que separan palabras, igual que str.split() (RE2: \s solo cubre los ASCII)
+_ESPACIOS = r'[\s\p{Z}\x0b\x1c-\x1f\x85]+'
+
+def capitalizar_palabras(serie):
+    """
+    Pone en mayúscula la primera letra de cada palabra y el resto en minúscula, y deja un solo
+    espacio entre palabras, como ' '.join(p.capitalize() for p in x.split()) pero sobre la
+    columna entera (funciones de texto de Arrow). Respeta los acentos ('ÁNGELES' -> 'Ángeles');
+    los apellidos con apóstrofo o guion quedan igual que con capitalize ("O'brien", 'López-garcía').
+    Los nulos siguen nulos.
+
+    Args:
+        serie (pandas.Series): Columna de texto.
+
+    Returns:
+        pandas.Series: Columna con texto respaldado por Arrow.
+    """
+    texto = pa.array(serie.astype(TEXTO), type=pa.string())
+    if isinstance(texto, pa.ChunkedArray):
+        # Las columnas de Arrow pueden venir en varias partes (por ejemplo, leídas con pyarrow)
+        texto = texto.combine_chunks()
+    texto = pc.utf8_trim(pc.replace_substring_regex(texto, _ESPACIOS, ' '), ' ')
+    palabras = pc.split_pattern(texto, ' ')
+    capitalizadas = pc.utf8_capitalize(palabras.flatten())
+    palabras = pa.ListArray.from_arrays(palabras.offsets, capitalizadas, mask=palabras.is_null())
+    return pd.Series(pd.arrays.ArrowStringArray(pc.binary_join(palabras, ' ')), index=serie.index, name=serie.name)
+
+def formatear_asistencias(df, csv_file, avisar=True):
+    """
+    Aplica los pasos de limpieza a un DataFrame de asistencias (un archivo entero o un bloque).
+
+    Args:
+        df (pandas.DataFrame): Asistencias tal como se leyeron del CSV.
+        csv_file (str): Nombre del archivo, para los mensajes.
+        avisar (bool): Imprime el detalle de cada paso (en modo por bloques, solo el primero).
 
-def limpiar_y_formatear_csv(carpeta_csvs='asistencias', subcarpeta_procesadas='procesadas'):
+    Returns:
+        pandas.DataFrame: Asistencias limpias.
+    """
+    def aviso(mensaje):
+        if avisar:
+            print(mensaje)
+
+    # 1. Limpia espacios en encabezados
+    df.columns = df.columns.str.strip()
+    aviso("  Encabezados limpiados de espacios.")
+
+    # Defino los nombres de columnas esperados para el procesamiento
+    COL_APELLIDO_NOMBRES = 'Apellido y Nombres'
+    COL_DOCUMENTO = 'Documento'
+    COL_MAIL = 'Mail'
+    COL_MAIL_UTN = 'Mail UTN'
+    COL_APELLIDO_NOMBRE_LEGAL = 'Apellido y Nombre legal' # Columna a eliminar
+
+    # 2. Limpia espacios en todas las celdas de texto (las vacías siguen vacías, no 'nan')
+    for col in df.columns:
+        if df[col].dtype == object or isinstance(df[col].dtype, pd.StringDtype):
+            df[col] = df[col].astype(TEXTO).str.strip()
+    aviso("  Espacios en blanco eliminados de todas las celdas de texto.")
+
+    # 3. Aplico formato de capitalización a 'Apellido y Nombres'
+    if COL_APELLIDO_NOMBRES in df.columns:
+        df[COL_APELLIDO_NOMBRES] = capitalizar_palabras(df[COL_APELLIDO_NOMBRES])
+        aviso(f"  Formato de capitalización aplicado a '{COL_APELLIDO_NOMBRES}'.")
+    else:
+        aviso(f"  Advertencia: Columna '{COL_APELLIDO_NOMBRES}' no encontrada. No se aplicó formato de capitalización.")
+
+    # 4. Elimino la columna 'Apellido y Nombre legal'
+    if COL_APELLIDO_NOMBRE_LEGAL in df.columns:
+        df = df.drop(columns=[COL_APELLIDO_NOMBRE_LEGAL])
+        aviso(f"  Columna '{COL_APELLIDO_NOMBRE_LEGAL}' eliminada.")
+    else:
+        aviso(f"  Advertencia: Columna '{COL_APELLIDO_NOMBRE_LEGAL}' no encontrada. No se eliminó.")
+
+
+    # Verifica que las columnas clave existan antes de guardar
+    if not all(col in df.columns for col in [COL_APELLIDO_NOMBRES, COL_DOCUMENTO, COL_MAIL, COL_MAIL_UTN]):
+        aviso(f"  Advertencia: Faltan una o más columnas esenciales ('{COL_APELLIDO_NOMBRES}', '{COL_DOCUMENTO}', '{COL_MAIL}', '{COL_MAIL_UTN}') después del procesamiento. Archivo '{csv_file}' podría no ser apto para certificados.")
+
+    return df
+
+def limpiar_y_formatear_csv(carpeta_csvs='asistencias', subcarpeta_procesadas='procesadas', filas_por_bloque=None):
     """
     Limpia los CSVs en la carpeta especificada y los guarda en una subcarpeta 'procesadas':
     1. Elimina espacios al inicio y final de todas las celdas, incluyendo encabezados.
+       Las celdas vacías quedan vacías (no se escriben como el texto 'nan').
     2. Aplica formato de capitalización (primera letra mayúscula, resto minúsculas)
-       a la columna 'Apellido y Nombres'.
+       a cada palabra de la columna 'Apellido y Nombres'.
     3. Elimina la columna 'Apellido y Nombre legal'.
-    Los archivos limpios se guardan en asistencias/procesadas/.
+    Los archivos limpios se guardan en asistencias/procesadas/, en CSV y en formato columnar (.feather).
+    Con 'filas_por_bloque' cada archivo se procesa de a bloques de esa cantidad de filas, sin
+    cargarlo entero en memoria (para exportaciones muy grandes).
     """
     # directorio base
     base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -45,50 +149,28 @@ def limpiar_y_formatear_csv(carpeta_csvs='asistencias', subcarpeta_procesadas='p
         print(f"\nProcesando archivo: '{csv_file}'")
 
         try:
-            # Lee con delimitador de punto y coma y motor Python
-            df = pd.read_csv(csv_path_original, sep=';', engine='python')
-
-            # 1. Limpia espacios en encabezados
-            df.columns = df.columns.str.strip()
-            print("  Encabezados limpiados de espacios.")
-
-            # Defino los nombres de columnas esperados para el procesamiento
-            COL_APELLIDO_NOMBRES = 'Apellido y Nombres'
-            COL_DOCUMENTO = 'Documento'
-            COL_MAIL = 'Mail'
-            COL_MAIL_UTN = 'Mail UTN'
-            COL_APELLIDO_NOMBRE_LEGAL = 'Apellido y Nombre legal' # Columna a eliminar
-
-            # 2. Limpia espacios en todas las celdas
-            for col in df.columns:
-                if df[col].dtype == 'object':
-                    df[col] = df[col].astype(str).str.strip()
-            print("  Espacios en blanco eliminados de todas las celdas de texto.")
-
-            # 3. Aplico formato de capitalización a 'Apellido y Nombres'
-            if COL_APELLIDO_NOMBRES in df.columns:
-                df[COL_APELLIDO_NOMBRES] = df[COL_APELLIDO_NOMBRES].apply(
-                    lambda x: ' '.join([name.capitalize() for name in x.split()]) if isinstance(x, str) else x
-                )
-                print(f"  Formato de capitalización aplicado a '{COL_APELLIDO_NOMBRES}'.")
-            else:
-                print(f"  Advertencia: Columna '{COL_APELLIDO_NOMBRES}' no encontrada. No se aplicó formato de capitalización.")
-                
-            # 4. Elimino la columna 'Apellido y Nombre legal'
-            if COL_APELLIDO_NOMBRE_LEGAL in df.columns:
-                df = df.drop(columns=[COL_APELLIDO_NOMBRE_LEGAL])
-                print(f"  Columna '{COL_APELLIDO_NOMBRE_LEGAL}' eliminada.")
+            if filas_por_bloque:
+                # Lee de a bloques y agrega cada uno a las salidas: la memoria depende del bloque, no del archivo.
+                # Todo se lee como texto para que todos los bloques tengan los mismos tipos.
+                bloques = leer_csv(csv_path_original, SINONIMOS_ASISTENCIA, filas_por_bloque=filas_por_bloque, dtype=str)
+                # El escritor columnar se cierra último: la copia .feather queda más nueva que el CSV
+                with EscritorTabla(ruta_columnar(csv_path_destino), ESQUEMA_ASISTENCIA) as columnar, \
+                        open(csv_path_destino, 'w', newline='', encoding='utf-8') as destino:
+                    for numero, bloque in enumerate(bloques):
+                        bloque = formatear_asistencias(bloque, csv_file, avisar=numero == 0)
+                        bloque.to_csv(destino, index=False, sep=';', header=numero == 0)
+                        columnar.escribir(bloque)
             else:
-                print(f"  Advertencia: Columna '{COL_APELLIDO_NOMBRE_LEGAL}' no encontrada. No se eliminó.")
-
+                # Detecta separador, codificación y encabezados (ingesta.py). Todo como texto, igual que
+                # por bloques: el documento se imprime tal cual (sin '.0' ni perder ceros a la izquierda)
+                df = leer_csv(csv_path_original, SINONIMOS_ASISTENCIA, dtype=str)
 
-            # Verifica que las columnas clave existan antes de guardar
-            if not all(col in df.columns for col in [COL_APELLIDO_NOMBRES, COL_DOCUMENTO, COL_MAIL, COL_MAIL_UTN]):
-                print(f"  Advertencia: Faltan una o más columnas esenciales ('{COL_APELLIDO_NOMBRES}', '{COL_DOCUMENTO}', '{COL_MAIL}', '{COL_MAIL_UTN}') después del procesamiento. Archivo '{csv_file}' podría no ser apto para certificados.")
+                df = formatear_asistencias(df, csv_file)
 
-
-            # Guardao el DataFrame limpio en la subcarpeta 'procesadas'
-            df.to_csv(csv_path_destino, index=False, sep=';')
+                # Guardao el DataFrame limpio en la subcarpeta 'procesadas'
+                df.to_csv(csv_path_destino, index=False, sep=';')
+                # Copia columnar con tipos fijos, que es la que lee generar-certificados.py
+                escribir_tabla(df, ruta_columnar(csv_path_destino), ESQUEMA_ASISTENCIA)
             print(f"  Archivo '{csv_file}' limpiado y guardado exitosamente en '{ruta_procesadas}'.")
 
         except FileNotFoundError:
@@ -100,5 +182,10 @@ def limpiar_y_formatear_csv(carpeta_csvs='asistencias', subcarpeta_procesadas='p
 
 # --- Ejecución del script ---
 if __name__ == "__main__":
-    limpiar_y_formatear_csv()
+    parser = argparse.ArgumentParser(description="Limpia los CSV de asistencias")
+    parser.add_argument('--filas-por-bloque', type=int, default=None,
+                        help="Procesa cada csv de a bloques de N filas, con memoria acotada (exportaciones muy grandes).")
+    args = parser.parse_args()
+
+    limpiar_y_formatear_csv(filas_por_bloque=args.filas_por_bloque)
     print("\n¡Proceso de limpieza de CSVs finalizado!")
\ No newline at end of file
@@ -1,14 +1,55 @@
 import os
+import json
+import time
+import hashlib
+import argparse
+from collections import Counter
+import numpy as np
 import pandas as pd
-import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from ingesta import SINONIMOS_COLUMNAS, leer_csv
+from indice_inscripciones import ARCHIVO_INDICE, construir_indice
+from formato_columnar import ESQUEMA_INSCRIPCION, PATRON_ENTERO, EscritorTabla, escribir_tabla, ruta_columnar
+
+# Formato de mail válido: algo@algo.algo
+EMAIL_PATTERN = r'^[^@]+@[^@]+\.[^@]+$'
+
+# Subir este número al cambiar las reglas de limpieza: obliga a reprocesar todos los csv
+VERSION_LIMPIEZA = 5
+
+# Manifiesto (dentro de la carpeta inscripciones) con el hash de cada original ya procesado
+MANIFIESTO_LIMPIEZA = 'manifiesto-limpieza.json'
+
+# Encabezados con los que se reconoce la fila de encabezados de una exportación
+COLUMNAS_CONOCIDAS = set(SINONIMOS_COLUMNAS) | {'marca temporal', 'apellido', 'nombre', 'dni', 'legajo', 'mail'}
 
 def validar_y_limpiar_csv(path_csv):
     """
     Lee un CSV, valida y limpia registros.
     Devuelve: df_clean, df_errors.
     """
-    df = pd.read_csv(path_csv, dtype=str).fillna('')
+    # Separador, codificación y encabezados se detectan en ingesta.leer_csv
+    df = leer_csv(path_csv, columnas_conocidas=COLUMNAS_CONOCIDAS, dtype=str).fillna('')
+    return validar_y_limpiar_df(df)
 
+def validar_y_limpiar_por_bloques(path_csv, filas_por_bloque):
+    """
+    Igual que validar_y_limpiar_csv, pero lee el CSV de a 'filas_por_bloque' filas: en memoria
+    hay un solo bloque por vez. La columna 'Fila' de los errores sigue contando desde el
+    principio del archivo.
+
+    Yields:
+        tuple: (df_clean, df_errors) de cada bloque.
+    """
+    for bloque in leer_csv(path_csv, columnas_conocidas=COLUMNAS_CONOCIDAS, filas_por_bloque=filas_por_bloque, dtype=str):
+        yield validar_y_limpiar_df(bloque.fillna(''))
+
+def validar_y_limpiar_df(df):
+    """
+    Valida y limpia los registros de un DataFrame leído como texto (vacíos como '').
+    El índice debe ser la posición de cada registro en el archivo (empezando en 0).
+    Devuelve: df_clean, df_errors.
+    """
     # Eliminar espacios en blanco y convierte a minúsculas los nombres de las columnas
     new_columns = []
     for col in df.columns:
@@ -20,72 +61,64 @@ def validar_y_limpiar_csv(path_csv):
     if 'marca temporal' in df.columns:
         df = df.drop(columns=['marca temporal'])
 
-    # Mapeo de sinónimos a nombres estándar
-    sinonimos_columnas = {
-        'correo': 'mail',
-        'email': 'mail',
-        'e-mail': 'mail',
-        'correo electronico': 'mail',
-        'correo electrónico': 'mail',
-        'apellido y nombre': 'nombre',
-        'apellido y  nombre': 'nombre',
-        'Apellido ' : 'apellido',
-    }
-
-    df.columns = [sinonimos_columnas.get(col, col) for col in df.columns]
-
-    clean_rows = []
-    error_rows = []
-
-    email_pattern = re.compile(r'^[^@]+@[^@]+\.[^@]+$')
-
-    for idx, row in df.iterrows():
-        errors = []
-        # Trim y limpieza
-        apellido = row.get('apellido', '').strip().title()
-        nombre = row.get('nombre', '').strip().title()
-        dni = row.get('dni', '').strip()
-        legajo = row.get('legajo', '').strip()
-        mail = row.get('mail', '').strip()
-
-        # Formateo dni y legajo
-        dni = dni.replace('.', '')  # Elimino puntos del DNI
-
-        legajo = legajo.replace('.', '')  # Elimino puntos del legajo
-
-        # Valido si DNI y legajo son numéricos y el formato del mail
-        if dni and not dni.isnumeric():
-            errors.append("DNI no numérico")
-        
-        # Valido el formato del mail (solo letras, números, guiones y puntos permitidos)
-        if mail and not email_pattern.match(mail):
-            errors.append("Mail formato inválido")
-
-        # Si hubo errores los guardo en error_rows con número de fila y la información del registro
-        if errors:
-            error_rows.append({
-                'Fila': idx + 1,
-                'Apellido': row.get('apellido', ''),
-                'Nombre': row.get('nombre', ''),
-                'DNI': row.get('dni', ''),
-                'Legajo': row.get('legajo', ''),
-                'Mail': row.get('mail', ''),
-                'Errores': "; ".join(errors)
-            })
-        else: # Si no hay errores, guardo el registro limpio
-            clean_rows.append({
-                'Apellido': apellido,
-                'Nombre': nombre,
-                'DNI': dni if dni else None,
-                'Legajo': legajo if legajo else None,
-                'Mail': mail if mail else None,
-            })
-
-    # Creo DataFrames asegurando las columnas
+    df.columns = [SINONIMOS_COLUMNAS.get(col, col) for col in df.columns]
+
+    # Columnas que puede no traer el formulario: se tratan como vacías
+    def columna(nombre):
+        if nombre in df.columns:
+            return df[nombre]
+        return pd.Series('', index=df.index, dtype=object)
+
+    apellido_original = columna('apellido')
+    nombre_original = columna('nombre')
+    dni_original = columna('dni')
+    legajo_original = columna('legajo')
+    mail_original = columna('mail')
+
+    # Trim y limpieza; elimino puntos del DNI y del legajo
+    dni = dni_original.str.strip().str.replace('.', '', regex=False)
+    legajo = legajo_original.str.strip().str.replace('.', '', regex=False)
+    mail = mail_original.str.strip()
+
+    # Valido si el DNI es numérico (la misma regla con la que se guarda como entero) y el formato del mail
+    error_dni = (dni != '') & ~dni.str.fullmatch(PATRON_ENTERO).astype(bool)
+    error_mail = (mail != '') & ~mail.str.match(EMAIL_PATTERN).astype(bool)
+
+    con_errores = error_dni | error_mail
+    limpias = ~con_errores
+
+    # Si hubo errores los guardo con número de fila y la información original del registro
+    if con_errores.any():
+        errores = np.select(
+            [error_dni & error_mail, error_dni, error_mail],
+            ["DNI no numérico; Mail formato inválido", "DNI no numérico", "Mail formato inválido"],
+            default='',
+        )
+        df_errors = pd.DataFrame({
+            'Fila': df.index[con_errores.to_numpy()] + 1,
+            'Apellido': apellido_original[con_errores].to_numpy(),
+            'Nombre': nombre_original[con_errores].to_numpy(),
+            'DNI': dni_original[con_errores].to_numpy(),
+            'Legajo': legajo_original[con_errores].to_numpy(),
+            'Mail': mail_original[con_errores].to_numpy(),
+            'Errores': errores[con_errores.to_numpy()],
+        })
+    else:
+        df_errors = pd.DataFrame([])
+
+    # Registros limpios; DNI, legajo y mail vacíos quedan como nulos
+    def sin_vacios(serie):
+        return serie.where(serie != '', None)
+
     columnas = ['Apellido', 'Nombre', 'DNI', 'Legajo', 'Mail']
-    df_clean = pd.DataFrame(clean_rows, columns=columnas)
-    df_errors = pd.DataFrame(error_rows)
-    
+    df_clean = pd.DataFrame({
+        'Apellido': apellido_original[limpias].str.strip().str.title(),
+        'Nombre': nombre_original[limpias].str.strip().str.title(),
+        'DNI': sin_vacios(dni[limpias]),
+        'Legajo': sin_vacios(legajo[limpias]),
+        'Mail': sin_vacios(mail[limpias]),
+    }, columns=columnas).reset_index(drop=True)
+
     return df_clean, df_errors
 
 def agrupar_por_dominio(df):
@@ -108,8 +141,13 @@ def agrupar_por_dominio(df):
 
     return agrupado
 
-def procesar_csv(departamento_path, archivo_csv):
-    """Procesa un archivo CSV de una charla en un departamento."""
+def procesar_csv(departamento_path, archivo_csv, filas_por_bloque=None):
+    """
+    Procesa un archivo CSV de una charla en un departamento.
+
+    Con 'filas_por_bloque' el CSV se procesa de a bloques (ver procesar_csv_por_bloques),
+    con el mismo resultado pero sin cargar el archivo entero en memoria.
+    """
     # Extrae el código de la charla del nombre del archivo (sin extensión)
     nombre_charla = os.path.splitext(archivo_csv)[0]
     
@@ -124,73 +162,235 @@ def procesar_csv(departamento_path, archivo_csv):
     # Lee el CSV original
     path_csv = os.path.join(originales_dir, archivo_csv)
 
+    archivo_limpio = os.path.join(charla_dir, f'{nombre_charla}.csv')
+    archivo_errores = os.path.join(charla_dir, 'errores.csv')
+    archivo_dominios = os.path.join(charla_dir, 'dominios.csv')
+    # Copia columnar con tipos fijos, que es la que leen los demás scripts (después del CSV: queda más nueva)
+    archivo_columnar = ruta_columnar(archivo_limpio)
+
+    if filas_por_bloque:
+        procesar_csv_por_bloques(path_csv, archivo_limpio, archivo_errores, archivo_dominios,
+                                 archivo_columnar, filas_por_bloque)
+        return archivo_limpio, archivo_errores, archivo_dominios, archivo_columnar
+
     # Limpia y valida los datos
     df_clean, df_errors = validar_y_limpiar_csv(path_csv)
 
     # Guarda los archivos procesados
-    archivo_limpio = os.path.join(charla_dir, f'{nombre_charla}.csv')
     df_clean.to_csv(archivo_limpio, index=False)
+    escribir_tabla(df_clean, archivo_columnar, ESQUEMA_INSCRIPCION)
 
-    archivo_errores = os.path.join(charla_dir, 'errores.csv')
     df_errors.to_csv(archivo_errores, index=False)
 
     agrupacion = agrupar_por_dominio(df_clean)
-    archivo_dominios = os.path.join(charla_dir, 'dominios.csv')
     agrupacion.to_csv(archivo_dominios, index=False)
 
-    return archivo_limpio, archivo_errores, archivo_dominios
+    return archivo_limpio, archivo_errores, archivo_dominios, archivo_columnar
+
+def procesar_csv_por_bloques(path_csv, archivo_limpio, archivo_errores, archivo_dominios,
+                             archivo_columnar, filas_por_bloque):
+    """
+    Limpia el CSV de a 'filas_por_bloque' filas y agrega cada bloque a los archivos de salida,
+    por lo que la memoria depende del tamaño del bloque y no del archivo. Los archivos quedan
+    iguales a los de procesar_csv sin bloques; el conteo de dominios se acumula entre bloques.
 
-def procesar_inscripciones(directorio_base):
-    """Procesa todos los archivos CSV en el directorio base."""
+    Args:
+        path_csv (str): CSV original.
+        archivo_limpio, archivo_errores, archivo_dominios, archivo_columnar (str): Salidas.
+        filas_por_bloque (int): Filas leídas por vez.
+    """
+    conteo_dominios = Counter()
+    hay_errores = False
+
+    # El escritor columnar se abre primero para que se cierre último: la copia .feather tiene que
+    # quedar más nueva que el CSV (ver formato_columnar.leer_limpio)
+    with EscritorTabla(archivo_columnar, ESQUEMA_INSCRIPCION) as columnar, \
+            open(archivo_limpio, 'w', newline='', encoding='utf-8') as limpio, \
+            open(archivo_errores, 'w', newline='', encoding='utf-8') as errores:
+        for numero, (df_clean, df_errors) in enumerate(validar_y_limpiar_por_bloques(path_csv, filas_por_bloque)):
+            df_clean.to_csv(limpio, index=False, header=numero == 0)
+            columnar.escribir(df_clean)
+
+            if not df_errors.empty:
+                df_errors.to_csv(errores, index=False, header=not hay_errores)
+                hay_errores = True
+
+            # Igual que agrupar_por_dominio, sumando los bloques
+            mails = df_clean['Mail']
+            mails = mails[mails.notna() & (mails != '')]
+            conteo_dominios.update(mails.str.split('@').str[1].value_counts().to_dict())
+
+        if not hay_errores:
+            # Sin errores queda igual que al guardar un DataFrame vacío
+            pd.DataFrame([]).to_csv(errores, index=False)
+
+    agrupacion = pd.DataFrame(sorted(conteo_dominios.items()), columns=['Dominio', 'Conteo'])
+    agrupacion.to_csv(archivo_dominios, index=False)
+
+def hash_archivo(path):
+    """Hash sha256 del contenido de un archivo."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+def leer_manifiesto(directorio_base):
+    """Devuelve el manifiesto de la última limpieza: {ruta relativa del original: entrada}."""
+    path = os.path.join(directorio_base, MANIFIESTO_LIMPIEZA)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        print(f"⚠️ Manifiesto de limpieza dañado, se procesa todo: {path}")
+        return {}
+
+def escribir_manifiesto(directorio_base, manifiesto):
+    """Escribe el manifiesto de forma atómica."""
+    path = os.path.join(directorio_base, MANIFIESTO_LIMPIEZA)
+    path_tmp = f"{path}.{os.getpid()}.tmp"
+    with open(path_tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(path_tmp, path)
+
+def buscar_originales(directorio_base):
+    """
+    Recorre la carpeta inscripciones y crea las carpetas 'procesadas' que falten.
+
+    Returns:
+        list: (departamento, departamento_path, archivo_csv) por cada csv original.
+    """
+    originales = []
     # Recorro carpeta inscripciones
-    for departamento in os.listdir(directorio_base):
+    for departamento in sorted(os.listdir(directorio_base)):
         # Construye la ruta completa al directorio del departamento
         departamento_path = os.path.join(directorio_base, departamento)
-        
-
-        if os.path.isdir(departamento_path):
-            # Construye la ruta al directorio 'originales' dentro del departamento
-            originales_dir = os.path.join(departamento_path, 'originales')
-            # Verifica si existe el directorio 'originales'
-            if not os.path.exists(originales_dir):
-                print(f"⚠️ No se encontró la carpeta 'originales' en {departamento}")
-                continue # Pasa al siguiente departamento si no existe 'originales'
-            
-            # Construye la ruta al directorio 'procesadas' dentro del departamento
-            procesadas_dir = os.path.join(departamento_path, 'procesadas')
-            # Crea el directorio 'procesadas' si no existe
-            os.makedirs(procesadas_dir, exist_ok=True)
-            
-            # Recorro los csv originales
-            for archivo_csv in os.listdir(originales_dir):
-                if archivo_csv.endswith('.csv'):
-                    try:
-                        # Procesa el archivo CSV y obtiene las rutas de los archivos generados
-                        archivo_limpio, archivo_errores, archivo_dominios = procesar_csv(departamento_path, archivo_csv)
-                        
-                        print(f"✅ Procesado {archivo_csv} en {departamento}")
-                        print(f"  - Datos limpios: {archivo_limpio}")
-                        
-                        # Obtiene el tamaño del archivo de errores
-                        errores_size = os.path.getsize(archivo_errores) if os.path.exists(archivo_errores) else 0
-                        # Imprime la ruta del archivo de errores si su tamaño es mayor a 50 bytes (umbral para considerar que contiene errores)
-                        if errores_size > 50:  # Umbral mayor que solo headers
-                            print(f"  - Errores encontrados: {archivo_errores}")
-                        else:
-                            print("  - No se encontraron errores")
-                        
-                        # Ruta de dominios procesados
-                        print(f"  - Dominios procesados: {archivo_dominios}")
-                        
-                    # Captura cualquier excepción que ocurra durante el procesamiento del archivo
-                    except Exception as e:
-                        # Imprime un mensaje de error con la descripción de la excepción
-                        print(f"❌ Error procesando {archivo_csv} en {departamento}: {str(e)}")
+        if not os.path.isdir(departamento_path):
+            continue
+
+        # Construye la ruta al directorio 'originales' dentro del departamento
+        originales_dir = os.path.join(departamento_path, 'originales')
+        # Verifica si existe el directorio 'originales'
+        if not os.path.exists(originales_dir):
+            print(f"⚠️ No se encontró la carpeta 'originales' en {departamento}")
+            continue # Pasa al siguiente departamento si no existe 'originales'
+
+        # Crea el directorio 'procesadas' si no existe
+        os.makedirs(os.path.join(departamento_path, 'procesadas'), exist_ok=True)
+
+        # Recorro los csv originales
+        for archivo_csv in sorted(os.listdir(originales_dir)):
+            if archivo_csv.endswith('.csv'):
+                originales.append((departamento, departamento_path, archivo_csv))
+    return originales
+
+def _procesar_en_proceso(departamento_path, archivo_csv, hash_original, filas_por_bloque):
+    """Procesa un csv en un proceso del pool y devuelve sus salidas y el hash con el que se procesó."""
+    return procesar_csv(departamento_path, archivo_csv, filas_por_bloque), hash_original
+
+def procesar_inscripciones(directorio_base, procesos=None, procesar_todos=False, filas_por_bloque=None):
+    """
+    Procesa los archivos CSV del directorio base que cambiaron desde la última ejecución,
+    repartiéndolos entre varios procesos.
+
+    Un original se saltea si su contenido (hash) y la versión de la limpieza coinciden con
+    los del manifiesto y sus archivos procesados siguen existiendo. Al final se actualiza el
+    índice global de inscripciones (indice_inscripciones.py) si algo cambió.
+
+    Args:
+        directorio_base (str): Carpeta 'inscripciones'.
+        procesos (int): Cantidad de procesos; por defecto, uno por núcleo.
+        procesar_todos (bool): Ignora el manifiesto y procesa todos los originales.
+        filas_por_bloque (int): Procesa cada CSV de a bloques de esta cantidad de filas
+            (para exportaciones muy grandes); por defecto, cada CSV entero en memoria.
+
+    Returns:
+        tuple: (procesados, salteados, con_error)
+    """
+    manifiesto = {} if procesar_todos else leer_manifiesto(directorio_base)
+    nuevo_manifiesto = {}
+    pendientes = []
+    salteados = 0
+
+    for departamento, departamento_path, archivo_csv in buscar_originales(directorio_base):
+        clave = f"{departamento}/originales/{archivo_csv}"
+        hash_original = hash_archivo(os.path.join(departamento_path, 'originales', archivo_csv))
+        entrada = manifiesto.get(clave)
+        if (entrada and entrada['hash'] == hash_original and entrada['version'] == VERSION_LIMPIEZA
+                and all(os.path.exists(os.path.join(directorio_base, salida)) for salida in entrada['salidas'])):
+            nuevo_manifiesto[clave] = entrada
+            salteados += 1
+            continue
+        pendientes.append((clave, departamento, departamento_path, archivo_csv, hash_original))
+
+    procesados = con_error = 0
+    if pendientes:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            futuros = {
+                pool.submit(_procesar_en_proceso, departamento_path, archivo_csv, hash_original, filas_por_bloque):
+                    (clave, departamento, archivo_csv)
+                for clave, departamento, departamento_path, archivo_csv, hash_original in pendientes
+            }
+            for futuro in as_completed(futuros):
+                clave, departamento, archivo_csv = futuros[futuro]
+                try:
+                    # Procesa el archivo CSV y obtiene las rutas de los archivos generados
+                    salidas, hash_original = futuro.result()
+                # Captura cualquier excepción que ocurra durante el procesamiento del archivo
+                except Exception as e:
+                    # Imprime un mensaje de error con la descripción de la excepción
+                    print(f"❌ Error procesando {archivo_csv} en {departamento}: {str(e)}")
+                    con_error += 1
+                    continue
+
+                procesados += 1
+                nuevo_manifiesto[clave] = {
+                    'hash': hash_original,
+                    'version': VERSION_LIMPIEZA,
+                    'salidas': [os.path.relpath(salida, directorio_base).replace(os.sep, '/')
+                                for salida in salidas],
+                }
+                archivo_limpio, archivo_errores, archivo_dominios, _ = salidas
+
+                print(f"✅ Procesado {archivo_csv} en {departamento}")
+                print(f"  - Datos limpios: {archivo_limpio}")
+
+                # Obtiene el tamaño del archivo de errores
+                errores_size = os.path.getsize(archivo_errores) if os.path.exists(archivo_errores) else 0
+                # Imprime la ruta del archivo de errores si su tamaño es mayor a 50 bytes (umbral para considerar que contiene errores)
+                if errores_size > 50:  # Umbral mayor que solo headers
+                    print(f"  - Errores encontrados: {archivo_errores}")
+                else:
+                    print("  - No se encontraron errores")
+
+                # Ruta de dominios procesados
+                print(f"  - Dominios procesados: {archivo_dominios}")
+
+    escribir_manifiesto(directorio_base, nuevo_manifiesto)
+
+    # El índice global se vuelve a armar solo si cambió algún procesado
+    if (procesados or nuevo_manifiesto.keys() != manifiesto.keys()
+            or not os.path.exists(os.path.join(directorio_base, ARCHIVO_INDICE))):
+        ruta_indice, cantidad = construir_indice(directorio_base)
+        print(f"📇 Índice de inscripciones actualizado ({cantidad} inscripciones): {ruta_indice}")
+
+    return procesados, salteados, con_error
 
 
 if __name__ == '__main__':
-    # Directorio base donde se encuentran las carpetas de departamentos
-    directorio_base = os.path.join(os.path.dirname(__file__), '..', 'inscripciones')
+    parser = argparse.ArgumentParser(description="Limpia los csv de inscripciones que cambiaron desde la última ejecución")
+    parser.add_argument('--inscripciones', default=os.path.join(os.path.dirname(__file__), '..', 'inscripciones'),
+                        help="Carpeta 'inscripciones' a procesar.")
+    parser.add_argument('--procesos', type=int, default=None, help="Cantidad de procesos (por defecto, todos los núcleos).")
+    parser.add_argument('--todos', action='store_true', help="Vuelve a procesar todos los csv, aunque no hayan cambiado.")
+    parser.add_argument('--filas-por-bloque', type=int, default=None,
+                        help="Procesa cada csv de a bloques de N filas, con memoria acotada (exportaciones muy grandes).")
+    args = parser.parse_args()
 
     # Procesa las inscripciones
-    procesar_inscripciones(directorio_base)
\ No newline at end of file
+    inicio = time.perf_counter()
+    procesados, salteados, con_error = procesar_inscripciones(args.inscripciones, args.procesos, args.todos, args.filas_por_bloque)
+    print(f"Procesados: {procesados} | sin cambios: {salteados} | con error: {con_error} "
+          f"| {time.perf_counter() - inicio:.1f} s")
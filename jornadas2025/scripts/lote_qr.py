@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import logging
+import argparse
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cache_qr
+from referencias import NOMBRE_TABLA, referencias
+from indice_inscripciones import IndiceInscripciones
+from cache_qr import MANIFIESTO, ruta_qr, guardar_qr, podar_cache
+import generar_qr_asistencia
+from generar_qr_asistencia import FORMATOS, clave_qr_asistencia, renderizar_qr, armar_info_qr
+
+# Genera por adelantado, en paralelo, los QR de todo el árbol de inscripciones.
+# Los scripts de envío adjuntan directamente los archivos ya generados.
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'inscripciones'))
+
+# Cantidad de QR por tarea del pool: cada proceso reutiliza el fondo de la charla dentro del lote
+TAMANIO_LOTE = 250
+
+
+def recorrer_inscripciones(base_dir=BASE_DIR):
+    """
+    Recorre las inscripciones procesadas de la carpeta 'base_dir' (índice global).
+
+    Yields:
+        tuple: (codigo_charla, [info_qr, ...]) por cada charla, sin repetidos.
+    """
+    for charla, df in IndiceInscripciones(base_dir).todas().groupby('Charla', observed=True):
+        infos = {}
+        for fila in df.to_dict('records'):
+            # Igual que en los envíos: las filas sin email no reciben QR
+            email = fila.get('Mail')
+            if pd.isna(email) or not email:
+                continue
+            legajo, dni = fila.get('Legajo'), fila.get('DNI')
+            info = armar_info_qr(charla, '' if pd.isna(legajo) else legajo, '' if pd.isna(dni) else dni)
+            infos[info] = None
+        yield charla, list(infos)
+
+
+def _renderizar_lote(qr_dir, ruta_referencias, codigo_charla, infos, formato):
+    """Renderiza (en un proceso del pool) los QR de una parte de una charla que todavía no existen."""
+    cache_qr.QR_DIR = qr_dir
+    referencias.ruta = ruta_referencias
+    extension = FORMATOS[formato]['extension']
+
+    resultados = []
+    for info in infos:
+        clave = clave_qr_asistencia(info, codigo_charla, formato)
+        ruta = ruta_qr(clave, extension)
+        nuevo = not os.path.exists(ruta)
+        if not nuevo:
+            # Marca el QR como usado, para que la poda borre primero los de inscripciones viejas
+            os.utime(ruta)
+        else:
+            # Se poda una sola vez al final, con el tamaño total
+            guardar_qr(clave, renderizar_qr(info, codigo_charla, formato), podar=False, extension=extension)
+        resultados.append((info, clave, nuevo))
+    return codigo_charla, resultados
+
+
+def generar_lote(base_dir=BASE_DIR, procesos=None, formato=None, ruta_referencias=None):
+    """
+    Genera los QR de todas las inscripciones usando un proceso por núcleo y escribe
+    el manifiesto (charla, info, archivo) en el directorio de QR generados.
+
+    Args:
+        base_dir (str): Carpeta 'inscripciones' a recorrer.
+        procesos (int): Cantidad de procesos; por defecto, uno por núcleo.
+        formato (str): Formato de las imágenes (ver FORMATOS); por defecto el de los envíos.
+        ruta_referencias (str): Tabla de referencias con los títulos de las charlas; por defecto,
+            la de la carpeta 'base_dir'.
+
+    Returns:
+        tuple: (generados, reutilizados)
+    """
+    formato = formato or generar_qr_asistencia.FORMATO_QR
+    extension = FORMATOS[formato]['extension']
+    qr_dir = cache_qr.QR_DIR
+    os.makedirs(qr_dir, exist_ok=True)
+    # Los títulos salen de la tabla del mismo árbol de inscripciones (también en los procesos del pool)
+    ruta_referencias = os.path.abspath(ruta_referencias or os.path.join(base_dir, NOMBRE_TABLA))
+    referencias.ruta = ruta_referencias
+
+    generados = reutilizados = 0
+    entradas = []
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = []
+        for charla, infos in recorrer_inscripciones(base_dir):
+            # Sin la charla en la tabla de referencias no hay título: se corta antes de generar
+            referencias.charla(charla)
+            for inicio in range(0, len(infos), TAMANIO_LOTE):
+                futuros.append(pool.submit(_renderizar_lote, qr_dir, ruta_referencias, charla, infos[inicio:inicio + TAMANIO_LOTE], formato))
+
+        for futuro in as_completed(futuros):
+            try:
+                charla, resultados = futuro.result()
+            except Exception as e:
+                logging.error(f"Error generando un lote de QR: {e}")
+                continue
+            for info, clave, nuevo in resultados:
+                if nuevo:
+                    generados += 1
+                else:
+                    reutilizados += 1
+                entradas.append({
+                    'charla': charla,
+                    'info': info,
+                    'archivo': os.path.relpath(ruta_qr(clave, extension), qr_dir),
+                })
+
+    with open(os.path.join(qr_dir, MANIFIESTO), 'w', encoding='utf-8') as f:
+        for entrada in sorted(entradas, key=lambda e: (e['charla'], e['info'])):
+            f.write(json.dumps(entrada, ensure_ascii=False) + '\n')
+
+    # Los QR de este lote son los usados más recientemente: solo se borran si no entran en el máximo
+    podar_cache()
+    faltantes = sum(1 for entrada in entradas if not os.path.exists(os.path.join(qr_dir, entrada['archivo'])))
+    if faltantes:
+        logging.warning(f"{faltantes} QR no entran en el tamaño máximo del directorio (QR_CACHE_MAXIMO_MB); "
+                        f"se generarán al enviar")
+
+    return generados, reutilizados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Genera en paralelo los QR de todas las inscripciones")
+    parser.add_argument('--inscripciones', default=BASE_DIR, help="Carpeta 'inscripciones' a recorrer.")
+    parser.add_argument('--referencias', default=None,
+                        help="Tabla de referencias (por defecto, la de la carpeta --inscripciones).")
+    parser.add_argument('--salida', default=cache_qr.QR_DIR, help="Carpeta de QR generados.")
+    parser.add_argument('--procesos', type=int, default=None, help="Cantidad de procesos (por defecto, todos los núcleos).")
+    parser.add_argument('--formato', choices=list(FORMATOS), default=generar_qr_asistencia.FORMATO_QR,
+                        help="Formato de las imágenes; debe coincidir con el de los envíos.")
+    args = parser.parse_args()
+
+    cache_qr.QR_DIR = os.path.abspath(args.salida)
+    inicio = time.perf_counter()
+    generados, reutilizados = generar_lote(args.inscripciones, args.procesos, args.formato, args.referencias)
+    duracion = time.perf_counter() - inicio
+    print(f"QR generados: {generados} | ya existentes: {reutilizados} | {duracion:.1f} s "
+          f"({generados / duracion if duracion else 0:.1f} QR/s)")
@@ -2,7 +2,7 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
 from smtplib import SMTP
-from jinja2 import Template
+from plantillas import renderizar_muchos
 import pandas as pd
 import qrcode
 #from certificado import generar_certificado
@@ -59,6 +59,15 @@ j = len(registros)  # cantidad de registros
 k = 0  # contador de envios por ciclo
 k_max = 10  # maximo de envios por ciclo
 
+# Cuerpos de todos los mensajes con jinja desde el template (se van renderizando a medida que se usan)
+cuerpos = renderizar_muchos(archivo_template, (
+    {
+        'nombre': str(nombre).title().strip(),
+        # 'apellido': apellido
+    }
+    for nombre in registros['Nombre']
+))
+
 while i < j:
     if k == 0:
         print('abrir coneccion')
@@ -88,12 +97,7 @@ while i < j:
     msg['Subject'] = asunto
     msg['From'] = alias
     # Armado del mensjae con jinga desde el template
-    temp = open(archivo_template, encoding="utf-8").read()
-    dic = {
-        'nombre': nombre,
-        # 'apellido': apellido
-    }
-    mensage = Template(temp).render(dic)
+    mensage = next(cuerpos)
 
     # Esta es la parte textual:
     part = MIMEText(mensage, 'html')
@@ -0,0 +1,159 @@
+import textwrap
+from functools import lru_cache
+from PIL import ImageFont
+
+# Maquetado de textos en recuadros, compartido por el QR de asistencia y los certificados.
+# Las medidas de cada glifo se guardan por (fuente, tamaño), por lo que medir una línea
+# no vuelve a pasar por FreeType, y el resultado de cada maquetado se memoriza por texto.
+
+# Texto con pares de letras que suelen tener kerning, para comprobar que medir sumando glifos sea exacto
+_TEXTO_PRUEBA = "AV To Wa LT Yo fi ff 'A' 1.7"
+
+
+@lru_cache(maxsize=None)
+def cargar_fuente(ruta, tamanio):
+    """Carga la fuente una sola vez por (ruta, tamaño). Si no se puede abrir, usa la fuente por defecto."""
+    try:
+        return ImageFont.truetype(ruta, tamanio)
+    except OSError:
+        return ImageFont.load_default()
+
+
+class MedidorFuente:
+    """
+    Mide líneas de texto con una fuente a partir de las medidas de cada glifo (avance y caja),
+    que se calculan una sola vez. Si la fuente aplica kerning o ligaduras, sumar glifos no
+    coincide con lo que dibuja Pillow y se mide cada línea con getbbox (memorizado por línea).
+    """
+
+    def __init__(self, fuente):
+        self.fuente = fuente
+        self.glifos = {}
+        self.lineas = {}
+        self.por_glifos = self._caja_por_glifos(_TEXTO_PRUEBA) == tuple(fuente.getbbox(_TEXTO_PRUEBA))
+
+    def _glifo(self, caracter):
+        glifo = self.glifos.get(caracter)
+        if glifo is None:
+            glifo = (self.fuente.getlength(caracter), self.fuente.getbbox(caracter))
+            self.glifos[caracter] = glifo
+        return glifo
+
+    def _caja_por_glifos(self, linea):
+        posicion = 0.0
+        x0 = y0 = float('inf')
+        x1 = y1 = float('-inf')
+        for caracter in linea:
+            avance, (izquierda, arriba, derecha, abajo) = self._glifo(caracter)
+            if derecha > izquierda:
+                x0 = min(x0, posicion + izquierda)
+                x1 = max(x1, posicion + derecha)
+            y0 = min(y0, arriba)
+            y1 = max(y1, abajo)
+            posicion += avance
+        if x0 == float('inf'):
+            x0 = x1 = 0
+        return (round(x0), y0, round(x1), y1)
+
+    def caja(self, linea):
+        """Caja (x0, y0, x1, y1) de la línea, igual a fuente.getbbox(linea)."""
+        caja = self.lineas.get(linea)
+        if caja is None:
+            caja = self._caja_por_glifos(linea) if self.por_glifos else tuple(self.fuente.getbbox(linea))
+            self.lineas[linea] = caja
+        return caja
+
+    def ancho(self, linea):
+        x0, _, x1, _ = self.caja(linea)
+        return x1 - x0
+
+    def alto(self, linea):
+        _, y0, _, y1 = self.caja(linea)
+        return y1 - y0
+
+    def medir_lineas(self, lineas, interlineado):
+        """
+        Returns:
+            tuple: (ancho de la línea más ancha, alto total sumando el interlineado después de cada línea)
+        """
+        if not lineas:
+            return 0, 0
+        return (max(self.ancho(linea) for linea in lineas),
+                sum(self.alto(linea) + interlineado for linea in lineas))
+
+
+@lru_cache(maxsize=None)
+def medidor(ruta, tamanio):
+    """MedidorFuente compartido para (ruta, tamaño)."""
+    return MedidorFuente(cargar_fuente(ruta, tamanio))
+
+
+@lru_cache(maxsize=4096)
+def ajustar_lineas(texto, ruta_fuente, tamanio, ancho_caja, alto_caja, interlineado=10,
+                   ancho_inicial=30, ancho_minimo=10):
+    """
+    Parte el texto en líneas con un tamaño de fuente fijo, usando el mayor ancho de línea,
+    en caracteres, con el que el texto entra en el recuadro. Si no entra con ningún ancho,
+    se usa ancho_minimo.
+
+    El ancho en píxeles no siempre baja al bajar el ancho en caracteres (cambia dónde se
+    corta cada línea), así que se prueban los anchos de mayor a menor; cada prueba es
+    barata porque las líneas se miden con los glifos ya medidos.
+
+    Args:
+        texto (str): Texto a maquetar.
+        ruta_fuente (str): Archivo de la fuente.
+        tamanio (int): Tamaño de la fuente.
+        ancho_caja (int): Ancho del recuadro en píxeles.
+        alto_caja (int): Alto del recuadro en píxeles.
+        interlineado (int): Píxeles agregados después de cada línea.
+        ancho_inicial (int): Mayor ancho de línea, en caracteres, a probar.
+        ancho_minimo (int): Menor ancho de línea, en caracteres.
+
+    Returns:
+        tuple: (lineas, fuente)
+    """
+    medida = medidor(ruta_fuente, tamanio)
+
+    lineas = None
+    for ancho in range(ancho_inicial, ancho_minimo - 1, -1):
+        # Anchos que producen el mismo corte que el anterior ya se descartaron
+        candidatas = tuple(textwrap.wrap(texto, width=ancho))
+        if candidatas == lineas:
+            continue
+        lineas = candidatas
+        ancho_px, alto_px = medida.medir_lineas(lineas, interlineado)
+        if ancho_px <= ancho_caja and alto_px <= alto_caja:
+            break
+    return lineas, medida.fuente
+
+
+@lru_cache(maxsize=4096)
+def ajustar_tamanio(texto, ruta_fuente, ancho_caja, alto_caja, tamanio_maximo, tamanio_minimo,
+                    ancho_linea=40, interlineado=5):
+    """
+    Busca (por bisección) el mayor tamaño de fuente con el que el texto, partido cada
+    'ancho_linea' caracteres, entra en el recuadro.
+
+    Returns:
+        tuple: (lineas, fuente, alto_total), o ((), None, 0) si no entra con ningún tamaño.
+    """
+    lineas = tuple(textwrap.wrap(texto, width=ancho_linea))
+
+    def medir(tamanio):
+        return medidor(ruta_fuente, tamanio).medir_lineas(lineas, interlineado)
+
+    menor, mayor = tamanio_minimo, tamanio_maximo
+    mejor = None
+    while menor <= mayor:
+        medio = (menor + mayor) // 2
+        ancho, alto_total = medir(medio)
+        if ancho <= ancho_caja and alto_total <= alto_caja:
+            mejor = medio
+            menor = medio + 1
+        else:
+            mayor = medio - 1
+
+    if mejor is None:
+        return (), None, 0
+    return lineas, cargar_fuente(ruta_fuente, mejor), medir(mejor)[1]
@@ -0,0 +1,189 @@
+import os
+import sys
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+
+# Límites (en segundos) de los buckets de los histogramas
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Etapas medidas: render del QR, render del template, transacción SMTP y (re)conexión SMTP
+ETAPAS = ('qr', 'plantilla', 'smtp', 'reconexion')
+
+# Resultados contados
+RESULTADOS = ('enviados', 'fallidos', 'salteados', 'reintentados')
+
+# Cada cuántos segundos se actualiza la línea de progreso y el archivo de métricas
+INTERVALO_PROGRESO = 1.0
+INTERVALO_ARCHIVO = 10.0
+
+_SIN_MEDICION = nullcontext()
+
+
+class _Histograma:
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # el último es +Inf
+        self.suma = 0.0
+        self.cantidad = 0
+
+    def observar(self, segundos):
+        self.buckets[bisect_left(BUCKETS, segundos)] += 1
+        self.suma += segundos
+        self.cantidad += 1
+
+
+class Metricas:
+    """
+    Contadores e histogramas de un envío masivo. Desactivadas por defecto: en ese caso
+    medir(), contar() y observar() no hacen nada, por lo que el costo en los scripts es despreciable.
+
+    Al activarlas se escribe un archivo de texto en formato Prometheus (para el textfile
+    collector de node_exporter) y, opcionalmente, una línea de progreso con ETA en la terminal.
+    """
+
+    def __init__(self):
+        self.activo = False
+        self.lock = threading.Lock()
+        self.campania = None
+        self.archivo = None
+        self.progreso = False
+        self.inicio = None
+        self.encolados = 0
+        self.contadores = dict.fromkeys(RESULTADOS, 0)
+        self.histogramas = {etapa: _Histograma() for etapa in ETAPAS}
+        self._fin = threading.Event()
+        self._hilo = None
+
+    def configurar(self, campania, archivo=None, progreso=False):
+        """
+        Activa las métricas si se pide un archivo o la línea de progreso.
+
+        Args:
+            campania (str): Se agrega como etiqueta a todas las métricas.
+            archivo (str): Ruta del archivo .prom a escribir (por ejemplo, en el directorio del textfile collector).
+            progreso (bool): Muestra una línea de progreso en la terminal (stderr).
+        """
+        self.campania = campania
+        self.archivo = archivo
+        self.progreso = progreso
+        self.activo = bool(archivo or progreso)
+        if not self.activo:
+            return
+
+        self.inicio = time.monotonic()
+        self._fin.clear()
+        self._hilo = threading.Thread(target=self._actualizar_periodicamente, name='metricas', daemon=True)
+        self._hilo.start()
+
+    def contar(self, resultado, cantidad=1):
+        if self.activo:
+            with self.lock:
+                self.contadores[resultado] += cantidad
+
+    def encolar(self, cantidad=1):
+        """Suma tareas al total esperado (usado para el porcentaje y el ETA)."""
+        if self.activo:
+            with self.lock:
+                self.encolados += cantidad
+
+    def observar(self, etapa, segundos):
+        if self.activo:
+            with self.lock:
+                self.histogramas[etapa].observar(segundos)
+
+    def medir(self, etapa):
+        """Context manager que registra la duración del bloque en el histograma de 'etapa'."""
+        if not self.activo:
+            return _SIN_MEDICION
+        return self._medir(etapa)
+
+    @contextmanager
+    def _medir(self, etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(etapa, time.perf_counter() - inicio)
+
+    def finalizar(self):
+        """Escribe los valores finales y cierra la línea de progreso."""
+        if not self.activo:
+            return
+        self._fin.set()
+        self._hilo.join()
+        self._escribir_archivo()
+        if self.progreso:
+            sys.stderr.write(f"\r{self.linea_progreso()}\n")
+            sys.stderr.flush()
+        self.activo = False
+
+    def _actualizar_periodicamente(self):
+        ultimo_archivo = time.monotonic()
+        while not self._fin.wait(INTERVALO_PROGRESO):
+            if self.progreso:
+                sys.stderr.write(f"\r{self.linea_progreso()}\033[K")
+                sys.stderr.flush()
+            if self.archivo and time.monotonic() - ultimo_archivo >= INTERVALO_ARCHIVO:
+                self._escribir_archivo()
+                ultimo_archivo = time.monotonic()
+
+    def linea_progreso(self):
+        with self.lock:
+            c = dict(self.contadores)
+            encolados = self.encolados
+
+        procesados = c['enviados'] + c['fallidos']
+        transcurrido = time.monotonic() - self.inicio
+        velocidad = procesados / transcurrido if transcurrido > 0 else 0.0
+
+        linea = f"[{self.campania}] {procesados}/{encolados}"
+        if encolados:
+            linea += f" ({procesados * 100 / encolados:.1f}%)"
+        linea += (f" | enviados {c['enviados']} fallidos {c['fallidos']} salteados {c['salteados']}"
+                  f" reintentos {c['reintentados']} | {velocidad:.1f} msg/s")
+        if velocidad > 0 and encolados > procesados:
+            restante = int((encolados - procesados) / velocidad)
+            linea += f" | ETA {restante // 3600:d}h{restante % 3600 // 60:02d}m{restante % 60:02d}s"
+        return linea
+
+    def formato_prometheus(self):
+        etiqueta = f'campania="{self.campania}"'
+        lineas = [
+            "# HELP jornadas_envios_total Correos procesados por resultado.",
+            "# TYPE jornadas_envios_total counter",
+        ]
+        with self.lock:
+            for resultado, valor in self.contadores.items():
+                lineas.append(f'jornadas_envios_total{{{etiqueta},resultado="{resultado}"}} {valor}')
+
+            lineas += [
+                "# HELP jornadas_envios_encolados Correos encolados en esta ejecución.",
+                "# TYPE jornadas_envios_encolados gauge",
+                f"jornadas_envios_encolados{{{etiqueta}}} {self.encolados}",
+                "# HELP jornadas_etapa_duracion_segundos Duración de cada etapa del envío.",
+                "# TYPE jornadas_etapa_duracion_segundos histogram",
+            ]
+            for etapa, histograma in self.histogramas.items():
+                acumulado = 0
+                for limite, cantidad in zip(BUCKETS + ('+Inf',), histograma.buckets):
+                    acumulado += cantidad
+                    lineas.append(f'jornadas_etapa_duracion_segundos_bucket{{{etiqueta},etapa="{etapa}",le="{limite}"}} '
+                                  f'{acumulado}')
+                lineas.append(f'jornadas_etapa_duracion_segundos_sum{{{etiqueta},etapa="{etapa}"}} {histograma.suma:.6f}')
+                lineas.append(f'jornadas_etapa_duracion_segundos_count{{{etiqueta},etapa="{etapa}"}} {histograma.cantidad}')
+        return '\n'.join(lineas) + '\n'
+
+    def _escribir_archivo(self):
+        if not self.archivo:
+            return
+        # Escritura atómica: el collector nunca lee un archivo a medio escribir
+        ruta_tmp = f"{self.archivo}.{os.getpid()}.tmp"
+        with open(ruta_tmp, 'w', encoding='utf-8') as f:
+            f.write(self.formato_prometheus())
+        os.replace(ruta_tmp, self.archivo)
+
+
+# Instancia compartida por todos los módulos del proceso
+metricas = Metricas()
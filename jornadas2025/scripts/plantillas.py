@@ -0,0 +1,49 @@
+import os
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+from metricas import metricas
+
+# Directorio de los templates HTML (scripts/)
+TEMPLATES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Entorno único: cada template se compila una sola vez por proceso y el bytecode
+# se guarda en el directorio temporal del sistema para las próximas ejecuciones.
+entorno = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR, encoding='utf-8'),
+    bytecode_cache=FileSystemBytecodeCache(),
+    auto_reload=False,
+)
+
+
+def renderizar(nombre_template, **contexto):
+    """
+    Renderiza un template de scripts/ con las variables dadas.
+
+    Args:
+        nombre_template (str): Nombre del archivo, por ejemplo 'template.html'.
+        **contexto: Variables del template.
+
+    Returns:
+        str: HTML renderizado.
+    """
+    with metricas.medir('plantilla'):
+        return entorno.get_template(nombre_template).render(**contexto)
+
+
+def renderizar_muchos(nombre_template, filas):
+    """
+    Renderiza el mismo template para cada fila, devolviendo los cuerpos a medida que se generan
+    (render_many: la versión en lote de renderizar). El template se busca una sola vez para todas
+    las filas; lo usan la fase "construir" del spool y main.py.
+
+    Args:
+        nombre_template (str): Nombre del archivo, por ejemplo 'template.html'.
+        filas (iterable): Diccionarios con las variables de cada mensaje.
+
+    Yields:
+        str: HTML renderizado de cada fila, en el mismo orden.
+    """
+    template = entorno.get_template(nombre_template)
+    for fila in filas:
+        with metricas.medir('plantilla'):
+            html = template.render(fila)
+        yield html
@@ -0,0 +1,175 @@
+import logging
+import queue
+import threading
+from conexion_smtp import CupoDiarioAgotado
+from registro_envios import ENVIADO, FALLIDO
+from metricas import metricas
+
+
+class ColaEnvios:
+    """
+    Cola de tareas compartida por los workers. Lleva la cuenta de las tareas sin
+    terminar, incluidos los reintentos programados que todavía no volvieron a la cola.
+    """
+
+    def __init__(self):
+        self.cola = queue.Queue()
+        self.condicion = threading.Condition()
+        self.pendientes = 0
+        self.detenida = False
+
+    def agregar(self, tarea):
+        self.reservar()
+        self.cola.put(tarea)
+
+    def reservar(self):
+        """Cuenta una tarea que se va a encolar más adelante (un reintento programado)."""
+        with self.condicion:
+            self.pendientes += 1
+
+    def reencolar(self, tarea):
+        """Encola una tarea reservada previamente con reservar()."""
+        self.cola.put(tarea)
+
+    def obtener(self):
+        return self.cola.get()
+
+    def terminar(self):
+        """Marca como terminada la tarea que el worker acaba de procesar."""
+        with self.condicion:
+            self.pendientes -= 1
+            if self.pendientes <= 0:
+                self.condicion.notify_all()
+
+    def detener(self):
+        """Deja de esperar las tareas pendientes (por ejemplo, al agotarse el cupo diario)."""
+        with self.condicion:
+            self.detenida = True
+            self.condicion.notify_all()
+
+    def esperar(self):
+        """Bloquea hasta que no queden tareas ni reintentos pendientes."""
+        with self.condicion:
+            self.condicion.wait_for(lambda: self.pendientes <= 0 or self.detenida)
+
+    def cerrar(self, cantidad_workers):
+        # Una marca de fin por worker
+        for _ in range(cantidad_workers):
+            self.cola.put(None)
+
+
+def _worker(numero, cola, enviar, conectar):
+    """
+    Consume tareas de la cola compartida usando una conexión SMTP propia,
+    que se mantiene abierta durante todo el envío.
+    """
+    conexion = conectar()
+
+    try:
+        while True:
+            tarea = cola.obtener()
+            if tarea is None:
+                break
+
+            try:
+                enviar(tarea, conexion)
+            except CupoDiarioAgotado as e:
+                # Las tareas pendientes quedan sin registrar, por lo que se envían en la próxima ejecución
+                logging.warning(f"[worker {numero}] {e}. Deteniendo envios")
+                cola.detener()
+                break
+            except Exception as e:
+                logging.error(f"[worker {numero}] Error inesperado procesando una tarea: {e}")
+            finally:
+                cola.terminar()
+    finally:
+        logging.info(f"[worker {numero}] Cerrando conexion SMTP final")
+        conexion.cerrar()
+
+
+def enviar_mensaje(tarea, conexion, construir, registro, reintentos=None):
+    """
+    Arma y envía el mensaje de una tarea y registra el resultado por cada clave que cubre.
+
+    Args:
+        tarea (dict): Con 'destinatario', 'clave', 'descripcion' y opcionalmente 'claves'.
+        conexion (ConexionSMTP): Conexión del worker.
+        construir (callable): construir(tarea) -> (remitente, mensaje); el mensaje puede ser un Message o bytes.
+        registro (RegistroEnvios): Registro de la campaña.
+        reintentos (PlanificadorReintentos): Decide si un fallo se reintenta o se guarda en fallidos.
+
+    Returns:
+        bool: True si el correo se envió correctamente, False en caso contrario.
+    """
+    destinatario = tarea['destinatario']
+    claves = tarea.get('claves', [tarea['clave']])
+    remitente, mensaje = None, None
+
+    try:
+        remitente, mensaje = tarea.pop('mensaje_armado', None) or construir(tarea)
+        conexion.enviar(mensaje, remitente, [destinatario])
+        logging.info(f"Correo enviado a {destinatario} {tarea['descripcion']}")
+        for clave in claves:
+            registro.registrar(destinatario, clave, ENVIADO)
+        metricas.contar('enviados')
+        return True
+    except CupoDiarioAgotado:
+        raise
+    except Exception as e:
+        logging.error(f"Error al enviar correo a {destinatario} {tarea['descripcion']}: {e}")
+        for clave in claves:
+            registro.registrar(destinatario, clave, FALLIDO, str(e))
+        if reintentos is not None and reintentos.fallo(tarea, e, remitente, mensaje):
+            metricas.contar('reintentados')
+        else:
+            metricas.contar('fallidos')
+        return False
+
+
+def enviar_en_paralelo(tareas, enviar, conectar, cantidad_conexiones=4, reintentos=None):
+    """
+    Distribuye las tareas de envío entre varias conexiones SMTP concurrentes.
+
+    Args:
+        tareas (iterable): Tareas a enviar (cualquier objeto que entienda 'enviar').
+        enviar (callable): enviar(tarea, conexion) -> bool. Registra el resultado en el log.
+        conectar (callable): Devuelve una ConexionSMTP (se conecta en el primer envío).
+        cantidad_conexiones (int): Cantidad de conexiones (y workers) simultáneos.
+        reintentos (PlanificadorReintentos): Si se indica, los reintentos vuelven a esta misma cola.
+
+    Returns:
+        int: Cantidad de tareas encoladas.
+    """
+    cantidad_conexiones = max(1, cantidad_conexiones)
+    cola = ColaEnvios()
+    if reintentos is not None:
+        reintentos.iniciar(cola)
+
+    workers = []
+    for numero in range(cantidad_conexiones):
+        worker = threading.Thread(
+            target=_worker,
+            args=(numero, cola, enviar, conectar),
+            name=f"smtp-{numero}",
+            daemon=True,
+        )
+        worker.start()
+        workers.append(worker)
+
+    total = 0
+    for tarea in tareas:
+        if cola.detenida:
+            break
+        cola.agregar(tarea)
+        metricas.encolar()
+        total += 1
+
+    cola.esperar()
+    if reintentos is not None:
+        reintentos.detener()
+    cola.cerrar(len(workers))
+
+    for worker in workers:
+        worker.join()
+
+    return total
@@ -0,0 +1,99 @@
+import os
+import csv
+import threading
+
+# Tabla de referencias de las charlas: codigo;nombre;aula[;horario], dentro de la carpeta inscripciones
+NOMBRE_TABLA = 'tabla-de-referencias.csv'
+RUTA_TABLA = os.path.join(os.path.dirname(__file__), '..', 'inscripciones', NOMBRE_TABLA)
+
+
+class CharlaDesconocida(KeyError):
+    """El código de charla no está en la tabla de referencias."""
+
+    def __init__(self, codigo, ruta):
+        super().__init__(codigo)
+        self.codigo = codigo
+        self.ruta = ruta
+
+    def __str__(self):
+        return f"La charla '{self.codigo}' no está en la tabla de referencias ({self.ruta})"
+
+
+class TablaReferencias:
+    """
+    Índice en memoria de la tabla de referencias, por código de charla.
+
+    El archivo se lee una sola vez y se vuelve a leer solo si cambia su fecha de
+    modificación, por lo que se puede editar la tabla sin reiniciar un envío largo.
+    Si la tabla no existe se lanza FileNotFoundError, y si falta un código, CharlaDesconocida.
+    """
+
+    def __init__(self, ruta=None):
+        self.ruta = ruta
+        self.lock = threading.Lock()
+        self.charlas = {}
+        self._firma = None  # (ruta, mtime) de la versión cargada
+
+    def _actualizar(self):
+        ruta = self.ruta or RUTA_TABLA
+        # Un stat por consulta: mucho más barato que volver a leer el CSV
+        firma = (ruta, os.stat(ruta).st_mtime_ns)
+        if firma == self._firma:
+            return
+
+        with self.lock:
+            if firma == self._firma:
+                return
+            charlas = {}
+            with open(ruta, encoding='utf-8') as archivo:
+                for fila in csv.reader(archivo, delimiter=';'):
+                    if len(fila) < 3:
+                        continue
+                    codigo = fila[0].strip()
+                    charlas[codigo] = {
+                        'codigo': codigo,
+                        'nombre': fila[1].strip(),
+                        'aula': fila[2].strip(),
+                        'horario': fila[3].strip() if len(fila) > 3 else None,
+                    }
+            self.charlas = charlas
+            self._firma = firma
+
+    def charla(self, codigo):
+        """
+        Devuelve los datos de una charla.
+
+        Returns:
+            dict: Con 'codigo', 'nombre', 'aula' y 'horario' (None si la tabla no tiene esa columna).
+        """
+        self._actualizar()
+        codigo = codigo.strip()
+        try:
+            return self.charlas[codigo]
+        except KeyError:
+            raise CharlaDesconocida(codigo, self.ruta or RUTA_TABLA) from None
+
+    def nombre(self, codigo):
+        return self.charla(codigo)['nombre']
+
+    def aula(self, codigo):
+        return self.charla(codigo)['aula']
+
+    def horario(self, codigo):
+        return self.charla(codigo)['horario']
+
+    def verificar(self, codigos):
+        """
+        Verifica que todos los códigos estén en la tabla.
+
+        Raises:
+            CharlaDesconocida: Con todos los códigos que faltan, separados por coma.
+        """
+        self._actualizar()
+        faltantes = sorted({codigo.strip() for codigo in codigos} - self.charlas.keys())
+        if faltantes:
+            raise CharlaDesconocida(', '.join(faltantes), self.ruta or RUTA_TABLA)
+
+
+# Instancia compartida por todos los módulos del proceso
+referencias = TablaReferencias()
@@ -0,0 +1,165 @@
+import os
+import re
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+
+# Base de datos compartida por todos los scripts de envío
+RUTA_REGISTRO = os.path.join(os.path.dirname(__file__), 'logs', 'envios.sqlite3')
+
+ENVIADO = 'enviado'
+FALLIDO = 'fallido'
+
+
+def normalizar_email(email):
+    return str(email).strip().lower()
+
+
+class RegistroEnvios:
+    """
+    Registro persistente de envíos en SQLite (modo WAL), indexado por
+    (destinatario, clave, campaña). La clave es el código de charla o la
+    subcarpeta de certificados, según el script.
+
+    Cada hilo usa su propia conexión, por lo que es seguro usarlo desde
+    varios workers (o procesos) a la vez.
+    """
+
+    def __init__(self, campania, ruta=None):
+        self.campania = campania
+        self.ruta = ruta or RUTA_REGISTRO
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+
+        conexion = self._conexion()
+        conexion.execute("""
+            CREATE TABLE IF NOT EXISTS envios (
+                destinatario TEXT NOT NULL,
+                clave TEXT NOT NULL,
+                campania TEXT NOT NULL,
+                estado TEXT NOT NULL,
+                detalle TEXT,
+                actualizado TEXT NOT NULL,
+                PRIMARY KEY (destinatario, clave, campania)
+            ) WITHOUT ROWID
+        """)
+        conexion.execute("""
+            CREATE TABLE IF NOT EXISTS logs_importados (
+                campania TEXT PRIMARY KEY,
+                importado TEXT NOT NULL
+            )
+        """)
+
+    def _conexion(self):
+        conexion = getattr(self.local, 'conexion', None)
+        if conexion is None:
+            # isolation_level=None: cada sentencia se confirma de forma atómica
+            conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self.local.conexion = conexion
+        return conexion
+
+    def ya_enviado(self, destinatario, clave):
+        """Indica si el envío (destinatario, clave) ya se realizó con éxito en esta campaña."""
+        fila = self._conexion().execute(
+            "SELECT 1 FROM envios WHERE destinatario = ? AND clave = ? AND campania = ? AND estado = ?",
+            (normalizar_email(destinatario), clave, self.campania, ENVIADO),
+        ).fetchone()
+        return fila is not None
+
+    def registrar(self, destinatario, clave, estado, detalle=None):
+        """Guarda (o actualiza) el estado de un envío."""
+        self._conexion().execute(
+            """
+            INSERT INTO envios (destinatario, clave, campania, estado, detalle, actualizado)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (destinatario, clave, campania)
+            DO UPDATE SET estado = excluded.estado, detalle = excluded.detalle, actualizado = excluded.actualizado
+            """,
+            (normalizar_email(destinatario), clave, self.campania, estado, detalle,
+             datetime.now().isoformat(timespec='seconds')),
+        )
+
+    def enviados_en_el_dia(self, dia):
+        """
+        Cantidad de envíos exitosos registrados en un día calendario, en todas las campañas de la
+        base (el cupo diario del proveedor es de la cuenta, no de cada script). No cuenta lo
+        importado de los logs de texto, que tiene la fecha de la importación.
+
+        Args:
+            dia (datetime.date): Día a contar.
+
+        Returns:
+            int
+        """
+        fila = self._conexion().execute(
+            """
+            SELECT COUNT(*) FROM envios
+            WHERE estado = ? AND actualizado >= ? AND actualizado < ? AND detalle IS NOT 'importado del log'
+            """,
+            (ENVIADO, dia.isoformat(), (dia + timedelta(days=1)).isoformat()),
+        ).fetchone()
+        return fila[0]
+
+    def importar_log(self, log_path, patron_ok, patron_error, armar_clave):
+        """
+        Migra una única vez el historial de un log de texto anterior al registro.
+
+        Args:
+            log_path (str): Ruta al log de texto.
+            patron_ok (str): Regex de las líneas de envío exitoso.
+            patron_error (str): Regex de las líneas de envío fallido.
+            armar_clave (callable): Recibe el match y devuelve (destinatario, clave).
+        """
+        conexion = self._conexion()
+        ya_importado = conexion.execute(
+            "SELECT 1 FROM logs_importados WHERE campania = ?", (self.campania,)
+        ).fetchone()
+        if ya_importado or not os.path.exists(log_path):
+            return
+
+        regex_ok = re.compile(patron_ok)
+        regex_error = re.compile(patron_error)
+        estados = {}
+
+        try:
+            with open(log_path, 'rb') as log_file:
+                for linea_bytes in log_file:
+                    # Los logs viejos pueden tener líneas en distintas codificaciones
+                    try:
+                        linea = linea_bytes.decode('utf-8')
+                    except UnicodeDecodeError:
+                        linea = linea_bytes.decode('cp1252', errors='replace')
+
+                    match_ok = regex_ok.search(linea)
+                    if match_ok:
+                        estados[armar_clave(match_ok)] = ENVIADO
+                        continue
+                    match_error = regex_error.search(linea)
+                    if match_error:
+                        # Un error posterior a un éxito no invalida el envío exitoso
+                        clave = armar_clave(match_error)
+                        if estados.get(clave) != ENVIADO:
+                            estados[clave] = FALLIDO
+        except Exception as e:
+            logging.error(f"Error al leer el archivo de log '{log_path}': {e}")
+            return
+
+        ahora = datetime.now().isoformat(timespec='seconds')
+        with conexion:
+            conexion.execute("BEGIN")
+            conexion.executemany(
+                """
+                INSERT INTO envios (destinatario, clave, campania, estado, detalle, actualizado)
+                VALUES (?, ?, ?, ?, 'importado del log', ?)
+                ON CONFLICT (destinatario, clave, campania) DO NOTHING
+                """,
+                [(normalizar_email(dest), clave, self.campania, estado, ahora)
+                 for (dest, clave), estado in estados.items()],
+            )
+            conexion.execute(
+                "INSERT INTO logs_importados (campania, importado) VALUES (?, ?)", (self.campania, ahora)
+            )
+        logging.info(f"Importados {len(estados)} envios del log '{log_path}' al registro")
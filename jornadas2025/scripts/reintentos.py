@@ -0,0 +1,215 @@
+import os
+import json
+import random
+import socket
+import logging
+import smtplib
+import argparse
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+from conexion_smtp import ConexionSMTP, LimitadorEnvios, es_throttling
+from registro_envios import RegistroEnvios
+from spool import MANIFIESTO, nombre_archivo, mensaje_a_bytes, leer_manifiesto, escribir_manifiesto, entregar_directorio
+
+# Correos descartados (errores permanentes o reintentos agotados), una subcarpeta por campaña.
+# Tienen el mismo formato que el spool, por lo que se pueden reenviar sin volver a los datos de origen.
+FALLIDOS_DIR = os.path.join(os.path.dirname(__file__), 'fallidos')
+
+# Reintentos en la misma ejecución ante errores transitorios o pérdida de conexión
+REINTENTOS_MAXIMOS = 3
+ESPERA_REINTENTO = 30  # segundos antes del primer reintento (se duplica en cada intento)
+ESPERA_MAXIMA_REINTENTO = 600
+
+TRANSITORIO = 'transitorio'
+PERMANENTE = 'permanente'
+CONEXION = 'conexion'
+
+
+def directorio_fallidos(campania):
+    return os.path.join(FALLIDOS_DIR, campania)
+
+
+def clasificar_error(error):
+    """
+    Clasifica un error de envío.
+
+    Returns:
+        str: CONEXION si se perdió la conexión, TRANSITORIO ante respuestas 4xx
+        y PERMANENTE ante respuestas 5xx o cualquier otro error (por ejemplo, al armar el correo).
+    """
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError,
+                          ConnectionError, TimeoutError, socket.gaierror)):
+        return CONEXION
+    if es_throttling(error):
+        return TRANSITORIO
+    return PERMANENTE
+
+
+def calcular_espera(intento, espera_inicial):
+    """Backoff exponencial con jitter para el intento indicado (empezando en 1)."""
+    espera = min(ESPERA_MAXIMA_REINTENTO, espera_inicial * 2 ** (intento - 1))
+    return espera + random.uniform(0, espera / 2)
+
+
+class PlanificadorReintentos:
+    """
+    Decide qué hacer con cada envío fallido: los errores transitorios y las pérdidas
+    de conexión vuelven a la cola del pool tras una espera, sin bloquear a los workers;
+    los permanentes (o con los reintentos agotados) se guardan en fallidos/<campania>/.
+    """
+
+    def __init__(self, campania, intentos=None, espera=None):
+        self.campania = campania
+        self.intentos = REINTENTOS_MAXIMOS if intentos is None else intentos
+        self.espera = ESPERA_REINTENTO if espera is None else espera
+        self.cola = None
+        self.timers = set()
+        self.lock = threading.Lock()
+
+    def iniciar(self, cola):
+        """Asocia el planificador a la cola del pool de envío (ColaEnvios)."""
+        self.cola = cola
+
+    def detener(self):
+        """Cancela los reintentos que todavía no volvieron a la cola."""
+        with self.lock:
+            for timer in self.timers:
+                timer.cancel()
+            self.timers.clear()
+        self.cola = None
+
+    def _reencolar(self, timer, tarea):
+        with self.lock:
+            if timer not in self.timers:
+                return
+            self.timers.discard(timer)
+            cola = self.cola
+        if cola is not None:
+            cola.reencolar(tarea)
+
+    def fallo(self, tarea, error, remitente=None, mensaje=None):
+        """
+        Procesa el fallo de una tarea.
+
+        Args:
+            tarea (dict): Tarea del pool ('destinatario', 'clave', 'descripcion', ...).
+            error (Exception): Error producido.
+            remitente (str): Remitente del sobre, si el mensaje llegó a armarse.
+            mensaje: Message o bytes del mensaje, si llegó a armarse.
+
+        Returns:
+            bool: True si se programó un reintento, False si fue a fallidos.
+        """
+        tipo = clasificar_error(error)
+        intento = tarea.get('intento', 0) + 1
+
+        if tipo != PERMANENTE and self.cola is not None and intento <= self.intentos:
+            tarea['intento'] = intento
+            if mensaje is not None:
+                # El reintento reutiliza el mensaje ya armado
+                tarea['mensaje_armado'] = (remitente, mensaje)
+            pausa = calcular_espera(intento, self.espera)
+
+            # La tarea se cuenta como pendiente antes de que termine el intento actual,
+            # para que el pool no cierre mientras espera el reintento
+            self.cola.reservar()
+            timer = threading.Timer(pausa, lambda: self._reencolar(timer, tarea))
+            timer.daemon = True
+            with self.lock:
+                self.timers.add(timer)
+            timer.start()
+            logging.warning(f"Reintento {intento}/{self.intentos} para {tarea['destinatario']} "
+                            f"{tarea['descripcion']} en {pausa:.0f} segundos ({tipo}: {error})")
+            return True
+
+        tarea.pop('mensaje_armado', None)
+        self.descartar(tarea, error, tipo, remitente, mensaje)
+        return False
+
+    def descartar(self, tarea, error, tipo, remitente, mensaje):
+        """Guarda el mensaje en fallidos/<campania>/ para reenviarlo más tarde."""
+        destinatario = tarea['destinatario']
+        if mensaje is None:
+            logging.error(f"No se guarda en fallidos el correo a {destinatario} {tarea['descripcion']}: "
+                          f"el mensaje no llegó a armarse ({error})")
+            return
+
+        directorio = directorio_fallidos(self.campania)
+        os.makedirs(directorio, exist_ok=True)
+
+        archivo = nombre_archivo(destinatario, tarea['clave'])
+        ruta = os.path.join(directorio, archivo)
+        ruta_tmp = f"{ruta}.{os.getpid()}.tmp"
+        with open(ruta_tmp, 'wb') as f:
+            f.write(mensaje_a_bytes(mensaje))
+        os.replace(ruta_tmp, ruta)
+
+        entrada = {
+            'archivo': archivo,
+            'remitente': remitente,
+            'destinatario': destinatario,
+            'clave': tarea['clave'],
+            'claves': tarea.get('claves', [tarea['clave']]),
+            'descripcion': tarea['descripcion'],
+            'tipo': tipo,
+            'error': str(error),
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+        }
+        with self.lock:
+            with open(os.path.join(directorio, MANIFIESTO), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entrada, ensure_ascii=False) + '\n')
+        logging.warning(f"Correo a {destinatario} {tarea['descripcion']} guardado en fallidos ({tipo})")
+
+
+def reenviar_fallidos(campania, conectar, registro, cantidad_conexiones=1):
+    """
+    Reenvía los correos guardados en fallidos/<campania>/ tal cual están.
+    Los que se envían se quitan de fallidos; los que vuelven a fallar quedan para otro intento.
+
+    Returns:
+        int: Cantidad de correos que siguen fallidos.
+    """
+    directorio = directorio_fallidos(campania)
+    if not leer_manifiesto(directorio):
+        logging.info(f"No hay correos fallidos en '{directorio}'")
+        return 0
+    entregar_directorio(directorio, conectar, registro, cantidad_conexiones)
+
+    restantes = {}
+    for archivo, entrada in leer_manifiesto(directorio).items():
+        if all(registro.ya_enviado(entrada['destinatario'], clave) for clave in entrada['claves']):
+            os.remove(os.path.join(directorio, archivo))
+        else:
+            restantes[archivo] = entrada
+    escribir_manifiesto(directorio, restantes)
+
+    logging.info(f"Fallidos '{campania}': {len(restantes)} correos siguen pendientes")
+    return len(restantes)
+
+
+if __name__ == '__main__':
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Reenvío de los correos guardados en fallidos/")
+    parser.add_argument('campania', choices=['qr', 'certificados', 'reprogramacion'],
+                        help="Campaña cuyos correos fallidos se reenvían.")
+    parser.add_argument('--conexiones', type=int, default=1, help="Cantidad de conexiones SMTP simultáneas.")
+    args = parser.parse_args()
+
+    log_dir = os.path.join(os.path.dirname(__file__), 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    logging.basicConfig(
+        filename=os.path.join(log_dir, 'reenviar_fallidos.log'),
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        encoding='utf-8',
+    )
+
+    email_sender = os.getenv('EMAIL_SENDER')
+    email_password = os.getenv('EMAIL_PASSWORD')
+    registro = RegistroEnvios(args.campania)
+    limitador = LimitadorEnvios(registro=registro)
+    restantes = reenviar_fallidos(args.campania, lambda: ConexionSMTP(email_sender, email_password, limitador),
+                                  registro, args.conexiones)
+    print(f"Correos que siguen fallidos: {restantes}")
@@ -0,0 +1,109 @@
+import io
+import time
+import argparse
+import numpy as np
+import qrcode
+from PIL import Image
+from referencias import referencias
+from generar_qr_asistencia import FORMATOS, QR_POSICION, QR_TAMANIO, renderizar_qr
+
+# Compara el tamaño de los formatos de adjunto del QR y verifica que sigan siendo legibles:
+# se decodifica cada imagen, se toma el píxel central de cada módulo del QR y se compara
+# con la matriz original.
+
+# Umbral de gris para decidir si un módulo es negro
+UMBRAL = 128
+
+
+def _matriz(info):
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, border=4)
+    qr.add_data(info)
+    qr.make(fit=True)
+    return np.array(qr.get_matrix(), dtype=bool)
+
+
+def leer_modulos(datos, formato, matriz):
+    """
+    Decodifica la imagen y devuelve el gris del píxel central de cada módulo del QR.
+
+    Returns:
+        numpy.ndarray: Matriz de grises (0-255) del mismo tamaño que 'matriz'.
+    """
+    imagen = Image.open(io.BytesIO(datos)).convert('L')
+    if formato != 'qr-1bit':
+        x, y = QR_POSICION
+        imagen = imagen.crop((x, y, x + QR_TAMANIO[0], y + QR_TAMANIO[1]))
+
+    lado = matriz.shape[0]
+    px_modulo = QR_TAMANIO[0] // lado
+    relleno = (QR_TAMANIO[0] - px_modulo * lado) // 2
+    centros = relleno + np.arange(lado) * px_modulo + px_modulo // 2
+    return np.array(imagen)[np.ix_(centros, centros)]
+
+
+def evaluar_formato(formato, muestras):
+    """
+    Codifica las muestras en un formato y verifica los módulos de cada una.
+
+    Args:
+        formato (str): Uno de FORMATOS.
+        muestras (list): Lista de (info, codigo_charla).
+
+    Returns:
+        dict: bytes promedio, ms promedio por imagen, errores de módulos y contraste mínimo.
+    """
+    tamanios, tiempos = [], []
+    errores = 0
+    contraste = 255
+    for info, charla in muestras:
+        inicio = time.perf_counter()
+        datos = renderizar_qr(info, charla, formato)
+        tiempos.append(time.perf_counter() - inicio)
+        tamanios.append(len(datos))
+
+        matriz = _matriz(info)
+        grises = leer_modulos(datos, formato, matriz)
+        errores += int(np.count_nonzero((grises < UMBRAL) != matriz))
+        # Distancia al umbral del módulo más dudoso (negro más claro o blanco más oscuro)
+        contraste = min(contraste, int(UMBRAL - grises[matriz].max()), int(grises[~matriz].min() - UMBRAL))
+
+    return {
+        'bytes': sum(tamanios) / len(tamanios),
+        'ms': sum(tiempos) / len(tiempos) * 1000,
+        'errores': errores,
+        'contraste': contraste,
+    }
+
+
+def tamanio_base64(cantidad_bytes):
+    """Tamaño del adjunto en el correo: base64 (4/3) con saltos de línea cada 76 caracteres."""
+    codificado = 4 * ((cantidad_bytes + 2) // 3)
+    return codificado + 2 * (codificado // 76)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compara tamaño y legibilidad de los formatos de adjunto del QR")
+    parser.add_argument('--charlas', nargs='+', default=['civ-01'], help="Códigos de charla a usar como fondo.")
+    parser.add_argument('--referencias', help="Tabla de referencias a usar (por defecto, la de inscripciones).")
+    parser.add_argument('--muestras', type=int, default=20, help="QR distintos por charla.")
+    parser.add_argument('--destinatarios', type=int, default=5000,
+                        help="Cantidad de correos para estimar el volumen total enviado.")
+    parser.add_argument('--formatos', nargs='+', choices=list(FORMATOS), default=list(FORMATOS))
+    args = parser.parse_args()
+    referencias.ruta = args.referencias
+
+    muestras = [(f"{charla};{10000 + i};{30000000 + i};", charla)
+                for charla in args.charlas for i in range(args.muestras)]
+    # Arma los fondos antes de medir
+    renderizar_qr(*muestras[0])
+
+    resultados = {formato: evaluar_formato(formato, muestras) for formato in args.formatos}
+    referencia = resultados.get('png', next(iter(resultados.values())))['bytes']
+
+    print(f"{'formato':>11} {'KB':>8} {'KB base64':>10} {'vs png':>7} {'ms/img':>7} "
+          f"{'MB x' + str(args.destinatarios):>10} {'legible':>8} {'contraste':>9}")
+    for formato, r in resultados.items():
+        en_correo = tamanio_base64(int(r['bytes']))
+        legible = 'sí' if r['errores'] == 0 else f"NO ({r['errores']})"
+        print(f"{formato:>11} {r['bytes'] / 1024:8.1f} {en_correo / 1024:10.1f} {r['bytes'] / referencia:7.2f} "
+              f"{r['ms']:7.1f} {en_correo * args.destinatarios / 1024 / 1024:10.1f} {legible:>8} {r['contraste']:9d}")
@@ -0,0 +1,70 @@
+import os
+import shutil
+import argparse
+import tempfile
+import pandas as pd
+from indice_inscripciones import BASE_DIR, IndiceInscripciones
+
+# Compara la memoria que ocupan las inscripciones con el esquema de formato_columnar.py
+# (enteros, categorías y texto respaldado por Arrow) contra la representación anterior:
+# todas las columnas como objetos str de Python, como las dejaba pd.read_csv(dtype=str).
+
+
+def como_objetos(df):
+    """Misma tabla con un objeto str de Python por celda (None en los nulos)."""
+    return pd.DataFrame({
+        columna: pd.Series([None if pd.isna(valor) else str(valor) for valor in df[columna]], dtype=object)
+        for columna in df.columns
+    })
+
+
+def memoria_por_columna(df):
+    """Bytes por columna, contando el contenido de los objetos (memory_usage con deep=True)."""
+    return df.memory_usage(deep=True, index=False)
+
+
+def generar_inscripciones(directorio, filas, charlas_por_departamento=4):
+    """Arma un árbol de inscripciones sintético con exportaciones de prueba y lo limpia con limpieza.py."""
+    from benchmark_limpieza import generar_exportacion
+    from limpieza import procesar_inscripciones
+
+    encabezados = ['Marca temporal', 'Apellido', 'Nombre', 'DNI', 'Legajo', 'Mail']
+    departamentos = ['sistemas', 'quimica', 'civil', 'electrica', 'mecanica']
+    por_charla = max(1, filas // (len(departamentos) * charlas_por_departamento))
+    for numero_depto, departamento in enumerate(departamentos):
+        originales = os.path.join(directorio, departamento, 'originales')
+        os.makedirs(originales, exist_ok=True)
+        for numero in range(charlas_por_departamento):
+            generar_exportacion(os.path.join(originales, f"{departamento[:3]}-{numero + 1:02d}.csv"),
+                                por_charla, numero_depto * 100 + numero, encabezados)
+    procesar_inscripciones(directorio)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Memoria de las inscripciones con el esquema tipado vs. texto")
+    parser.add_argument('--inscripciones', default=BASE_DIR, help="Carpeta 'inscripciones' a medir.")
+    parser.add_argument('--sintetico', type=int, metavar='FILAS',
+                        help="Mide un árbol sintético de FILAS inscripciones en lugar de --inscripciones.")
+    args = parser.parse_args()
+
+    directorio = args.inscripciones
+    if args.sintetico:
+        directorio = tempfile.mkdtemp(prefix='reporte_memoria_')
+        generar_inscripciones(directorio, args.sintetico)
+
+    try:
+        tipada = IndiceInscripciones(directorio).todas()
+        anterior = memoria_por_columna(como_objetos(tipada))
+        actual = memoria_por_columna(tipada)
+
+        print(f"{len(tipada)} inscripciones en {tipada['Charla'].nunique()} charlas\n")
+        print(f"{'columna':>13} {'tipo':>16} {'texto MB':>9} {'esquema MB':>11} {'reducción':>10}")
+        for columna in tipada.columns:
+            tipo = 'category' if isinstance(tipada[columna].dtype, pd.CategoricalDtype) else str(tipada[columna].dtype)
+            print(f"{columna:>13} {tipo:>16} {anterior[columna] / 1e6:9.2f} {actual[columna] / 1e6:11.2f} "
+                  f"{anterior[columna] / actual[columna]:9.1f}x")
+        print(f"{'total':>13} {'':>16} {anterior.sum() / 1e6:9.2f} {actual.sum() / 1e6:11.2f} "
+              f"{anterior.sum() / actual.sum():9.1f}x")
+    finally:
+        if args.sintetico:
+            shutil.rmtree(directorio, ignore_errors=True)
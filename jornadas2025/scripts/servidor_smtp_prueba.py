@@ -0,0 +1,166 @@
+import time
+import random
+import socketserver
+import threading
+import argparse
+
+# Servidor SMTP mínimo para pruebas locales: acepta todo, no entrega nada.
+# Permite simular la latencia, el throttling y las desconexiones de Office 365.
+
+
+class EstadisticasServidor:
+    """Contadores y latencias por mensaje compartidos por todas las sesiones."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self.lock:
+            self.aceptados = 0
+            self.throttling = 0
+            self.rechazos = 0
+            self.desconexiones = 0
+            self.sesiones = 0
+            self.bytes_recibidos = 0
+            self.latencias = []
+
+    def registrar_mensaje(self, latencia, tamanio):
+        with self.lock:
+            self.aceptados += 1
+            self.bytes_recibidos += tamanio
+            self.latencias.append(latencia)
+
+
+class _SesionSMTP(socketserver.StreamRequestHandler):
+
+    def responder(self, linea):
+        self.wfile.write(f"{linea}\r\n".encode('ascii'))
+
+    def _demorar(self):
+        if self.server.latencia:
+            time.sleep(self.server.latencia)
+
+    def handle(self):
+        servidor = self.server
+        estadisticas = servidor.estadisticas
+        with estadisticas.lock:
+            estadisticas.sesiones += 1
+
+        # La latencia de cada mensaje se mide desde el final del anterior en la misma sesión
+        ultimo = time.monotonic()
+        self.responder("220 localhost ESMTP servidor de prueba")
+
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            comando = linea.decode('utf-8', errors='replace').strip()
+            verbo = comando.split(' ', 1)[0].upper()
+
+            if verbo in ('EHLO', 'HELO'):
+                self.responder("250-localhost")
+                self.responder("250-AUTH PLAIN")
+                self.responder("250-8BITMIME")
+                self.responder("250 SIZE 52428800")
+            elif verbo == 'AUTH':
+                self.responder("235 2.7.0 Authentication successful")
+                ultimo = time.monotonic()
+            elif verbo == 'MAIL':
+                if servidor.prob_desconexion and random.random() < servidor.prob_desconexion:
+                    with estadisticas.lock:
+                        estadisticas.desconexiones += 1
+                    return
+                if servidor.prob_throttling and random.random() < servidor.prob_throttling:
+                    with estadisticas.lock:
+                        estadisticas.throttling += 1
+                    self.responder("451 4.7.500 Server busy. Please try again later")
+                    continue
+                self.responder("250 2.1.0 OK")
+            elif verbo == 'RCPT':
+                if servidor.prob_rechazo and random.random() < servidor.prob_rechazo:
+                    with estadisticas.lock:
+                        estadisticas.rechazos += 1
+                    self.responder("550 5.1.10 Recipient not found")
+                    continue
+                self.responder("250 2.1.5 OK")
+            elif verbo == 'DATA':
+                self.responder("354 Start mail input; end with <CRLF>.<CRLF>")
+                tamanio = 0
+                while True:
+                    dato = self.rfile.readline()
+                    if not dato:
+                        return
+                    if dato in (b".\r\n", b".\n"):
+                        break
+                    tamanio += len(dato)
+                self._demorar()
+                self.responder("250 2.0.0 OK queued")
+                ahora = time.monotonic()
+                estadisticas.registrar_mensaje(ahora - ultimo, tamanio)
+                ultimo = ahora
+            elif verbo in ('RSET', 'NOOP'):
+                self.responder("250 2.0.0 OK")
+            elif verbo == 'QUIT':
+                self.responder("221 2.0.0 Bye")
+                return
+            else:
+                self.responder("502 5.5.2 Command not implemented")
+
+
+class ServidorSMTPPrueba(socketserver.ThreadingTCPServer):
+    """
+    Sumidero SMTP multi-hilo (una sesión por hilo) sin TLS.
+
+    Args:
+        host (str): Dirección de escucha.
+        puerto (int): Puerto de escucha (0 elige uno libre).
+        latencia (float): Segundos de demora antes de aceptar cada mensaje.
+        prob_throttling (float): Probabilidad de responder 451 a un MAIL FROM.
+        prob_desconexion (float): Probabilidad de cortar la sesión al recibir un MAIL FROM.
+        prob_rechazo (float): Probabilidad de rechazar en forma permanente (550) un destinatario.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', puerto=0, latencia=0.0, prob_throttling=0.0, prob_desconexion=0.0,
+                 prob_rechazo=0.0):
+        super().__init__((host, puerto), _SesionSMTP)
+        self.latencia = latencia
+        self.prob_throttling = prob_throttling
+        self.prob_desconexion = prob_desconexion
+        self.prob_rechazo = prob_rechazo
+        self.estadisticas = EstadisticasServidor()
+
+    @property
+    def puerto(self):
+        return self.server_address[1]
+
+    def iniciar_en_segundo_plano(self):
+        hilo = threading.Thread(target=self.serve_forever, name='smtp-prueba', daemon=True)
+        hilo.start()
+        return hilo
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Servidor SMTP local de prueba (no entrega los correos)")
+    parser.add_argument('--puerto', type=int, default=2525)
+    parser.add_argument('--latencia', type=float, default=0.0, help="Segundos de demora por mensaje.")
+    parser.add_argument('--prob-throttling', type=float, default=0.0, help="Probabilidad de responder 451.")
+    parser.add_argument('--prob-desconexion', type=float, default=0.0, help="Probabilidad de cortar la sesión.")
+    parser.add_argument('--prob-rechazo', type=float, default=0.0, help="Probabilidad de responder 550.")
+    args = parser.parse_args()
+
+    servidor = ServidorSMTPPrueba(puerto=args.puerto, latencia=args.latencia,
+                                  prob_throttling=args.prob_throttling, prob_desconexion=args.prob_desconexion,
+                                  prob_rechazo=args.prob_rechazo)
+    print(f"Servidor SMTP de prueba escuchando en 127.0.0.1:{servidor.puerto} (Ctrl+C para detener)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        e = servidor.estadisticas
+        print(f"Aceptados: {e.aceptados} | 451: {e.throttling} | 550: {e.rechazos} | desconexiones: {e.desconexiones} | sesiones: {e.sesiones}")
+        servidor.server_close()
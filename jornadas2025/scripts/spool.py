@@ -0,0 +1,194 @@
+import os
+import json
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pool_envio import enviar_en_paralelo, enviar_mensaje
+from plantillas import renderizar_muchos
+from metricas import metricas
+
+# Directorio con los mensajes ya armados (.eml), una subcarpeta por campaña
+SPOOL_DIR = os.path.join(os.path.dirname(__file__), 'spool')
+
+MANIFIESTO = 'manifiesto.jsonl'
+
+# Tareas que arma cada proceso del pool por vez en la fase "construir"
+TAMANIO_LOTE = 100
+
+
+def directorio_spool(campania):
+    return os.path.join(SPOOL_DIR, campania)
+
+
+def nombre_archivo(destinatario, clave):
+    """Nombre determinístico del .eml, para reutilizarlo entre ejecuciones."""
+    digest = hashlib.sha1(f"{destinatario.strip().lower()}|{clave}".encode('utf-8')).hexdigest()
+    return f"{digest}.eml"
+
+
+def mensaje_a_bytes(mensaje):
+    """Bytes del mensaje con fin de línea CRLF, listos para enviarse a SMTP sin transformarlos."""
+    if isinstance(mensaje, bytes):
+        return mensaje
+    return mensaje.as_bytes(policy=mensaje.policy.clone(linesep='\r\n'))
+
+
+def _construir_uno(campania, tarea, construir):
+    """
+    Arma un mensaje y lo guarda en el spool (se ejecuta en un proceso del pool).
+    """
+    archivo = nombre_archivo(tarea['destinatario'], tarea['clave'])
+    ruta = os.path.join(directorio_spool(campania), archivo)
+
+    remitente, msg = construir(tarea)
+
+    # Escritura atómica: un .eml a medio escribir nunca queda en el spool
+    ruta_tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(ruta_tmp, 'wb') as f:
+        f.write(mensaje_a_bytes(msg))
+    os.replace(ruta_tmp, ruta)
+
+    return {
+        'archivo': archivo,
+        'remitente': remitente,
+        'destinatario': tarea['destinatario'],
+        'clave': tarea['clave'],
+        # Un mensaje puede cubrir varias claves del registro (modo resumen)
+        'claves': tarea.get('claves', [tarea['clave']]),
+        'descripcion': tarea['descripcion'],
+    }
+
+
+def _construir_lote(campania, lote, construir, plantilla=None):
+    """
+    Arma un lote de mensajes (se ejecuta en un proceso del pool). Con 'plantilla' los cuerpos
+    del lote se renderizan juntos con renderizar_muchos y cada tarea llega a construir() con
+    su HTML en 'cuerpo_html'.
+
+    Returns:
+        list: (entrada del manifiesto, None) o (None, error) por cada tarea, en el mismo orden.
+    """
+    cuerpos = None
+    if plantilla is not None:
+        nombre_template, contexto = plantilla
+        cuerpos = renderizar_muchos(nombre_template, (contexto(tarea) for tarea in lote))
+
+    resultados = []
+    for tarea in lote:
+        try:
+            if cuerpos is not None:
+                try:
+                    tarea = dict(tarea, cuerpo_html=next(cuerpos))
+                except Exception:
+                    # El generador termina con el error: el resto del lote se renderiza de a uno
+                    cuerpos = None
+            resultados.append((_construir_uno(campania, tarea, construir), None))
+        except Exception as e:
+            resultados.append((None, e))
+    return resultados
+
+
+def leer_manifiesto(directorio):
+    entradas = {}
+    ruta = os.path.join(directorio, MANIFIESTO)
+    if os.path.exists(ruta):
+        with open(ruta, encoding='utf-8') as f:
+            for linea in f:
+                if linea.strip():
+                    entrada = json.loads(linea)
+                    entrada.setdefault('claves', [entrada['clave']])
+                    entradas[entrada['archivo']] = entrada
+    return entradas
+
+
+def escribir_manifiesto(directorio, entradas):
+    with open(os.path.join(directorio, MANIFIESTO), 'w', encoding='utf-8') as f:
+        for entrada in entradas.values():
+            f.write(json.dumps(entrada, ensure_ascii=False) + '\n')
+
+
+def construir_spool(campania, tareas, construir, procesos=None, plantilla=None):
+    """
+    Fase "construir": arma todos los mensajes en paralelo (un proceso por núcleo, de a lotes
+    de TAMANIO_LOTE) y los guarda como .eml en spool/<campania>/, junto con un manifiesto.
+
+    Args:
+        campania (str): Nombre de la campaña (subcarpeta del spool).
+        tareas (iterable): dicts con al menos 'destinatario', 'clave' y 'descripcion'
+            (y opcionalmente 'claves', si el mensaje cubre varias claves del registro).
+        construir (callable): Función de nivel módulo construir(tarea) -> (remitente, msg).
+        procesos (int): Cantidad de procesos (por defecto, todos los núcleos).
+        plantilla (tuple): (nombre_template, contexto), con contexto(tarea) -> dict una función
+            de nivel módulo. Si se indica, los cuerpos de cada lote se renderizan juntos y
+            construir() los recibe en tarea['cuerpo_html'].
+
+    Returns:
+        int: Cantidad de mensajes en el spool.
+    """
+    os.makedirs(directorio_spool(campania), exist_ok=True)
+    entradas = leer_manifiesto(directorio_spool(campania))
+
+    pendientes = []
+    for tarea in tareas:
+        archivo = nombre_archivo(tarea['destinatario'], tarea['clave'])
+        if archivo in entradas and os.path.exists(os.path.join(directorio_spool(campania), archivo)):
+            continue
+        pendientes.append(tarea)
+
+    logging.info(f"Spool '{campania}': {len(pendientes)} mensajes a construir, {len(entradas)} ya construidos")
+
+    lotes = [pendientes[inicio:inicio + TAMANIO_LOTE] for inicio in range(0, len(pendientes), TAMANIO_LOTE)]
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = [pool.submit(_construir_lote, campania, lote, construir, plantilla) for lote in lotes]
+        for lote, futuro in zip(lotes, futuros):
+            try:
+                resultados = futuro.result()
+            except Exception as e:
+                resultados = [(None, e)] * len(lote)
+            for tarea, (entrada, error) in zip(lote, resultados):
+                if error is not None:
+                    logging.error(f"Error al construir el mensaje para {tarea['destinatario']} {tarea['descripcion']}: {error}")
+                else:
+                    entradas[entrada['archivo']] = entrada
+
+    escribir_manifiesto(directorio_spool(campania), entradas)
+    return len(entradas)
+
+
+def entregar_directorio(directorio, conectar, registro, cantidad_conexiones=1, reintentar_todos=False,
+                        reintentos=None):
+    """
+    Envía los .eml de un directorio con manifiesto (el spool o fallidos/) tal cual están.
+    Los mensajes ya enviados con éxito según el registro se saltean.
+    """
+    entradas = leer_manifiesto(directorio)
+    if not entradas:
+        logging.warning(f"No hay mensajes en el spool '{directorio}'")
+        return 0
+
+    def pendientes():
+        for entrada in entradas.values():
+            if reintentar_todos or not all(registro.ya_enviado(entrada['destinatario'], clave)
+                                           for clave in entrada['claves']):
+                yield entrada
+            else:
+                metricas.contar('salteados')
+
+    def leer_eml(entrada):
+        with open(os.path.join(directorio, entrada['archivo']), 'rb') as f:
+            return entrada['remitente'], f.read()
+
+    def enviar(entrada, conexion):
+        return enviar_mensaje(entrada, conexion, leer_eml, registro, reintentos)
+
+    return enviar_en_paralelo(pendientes(), enviar, conectar, cantidad_conexiones=cantidad_conexiones,
+                              reintentos=reintentos)
+
+
+def entregar_spool(campania, conectar, registro, cantidad_conexiones=1, reintentar_todos=False, reintentos=None):
+    """
+    Fase "entregar": envía los .eml del spool tal cual están, sin volver a armarlos.
+    Los mensajes ya enviados con éxito según el registro se saltean.
+    """
+    return entregar_directorio(directorio_spool(campania), conectar, registro, cantidad_conexiones,
+                               reintentar_todos, reintentos)